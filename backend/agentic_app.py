@@ -2,14 +2,34 @@ import argparse
 import json
 import logging
 from models import model
-from sentence_segmentor import segment
-from task_mapper import classify
-from xpath_extractor import extract_xpath_pattern
+from sentence_segmentor import segment, PROMPT_VERSION as SEGMENT_PROMPT_VERSION
+from task_mapper import classify, PROMPT_VERSION as CLASSIFY_PROMPT_VERSION
+from rule_classifier import RULES_VERSION
+from planner import plan, plan_stream, aplan, aplan_stream, PROMPT_VERSION as PLANNER_PROMPT_VERSION
+from plan_cache import PlanCache
+from utils import model_id
+from compiled_plan import compile_step, compiled_path, save_compiled
+from xpath_extractor import extract_xpath_pattern, aextract_xpath_pattern, PROMPT_VERSION as XPATH_PROMPT_VERSION
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 from rag_html import process_html_query 
+from xpath_cache import XPathCache, dom_fingerprint, skeleton_fingerprint
+from heuristic_locator import ElementIndex, resolve_locally
+from speculation import SpeculationStats, should_speculate
+from token_usage import TokenUsage, summarize as summarize_usage
+from frame_stream import capture_options
+from readiness import READINESS_CEILING_MS, READINESS_MODE, SCRIPT_HELPER, ReadinessReport, settle, asettle
+from collections import Counter, deque
 from rich.logging import RichHandler
 from utils import *
 import os
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, ExitStack
+import queue
+import threading
+import time
 
 # ------------------------
 # Setup Logging with Emojis
@@ -21,38 +41,451 @@ logging.basicConfig(
 )
 log = logging.getLogger("rich")
 
-def run_agent(instruction_text: str, callback=None):
-    """
-    Run the agent with the given instruction.
-    callback: function(step_data) -> None
-    """
-    # Wrap input in JSON structure
-    user_data = {"user_inputs": instruction_text}
-    log.info(f"🗃️  User Input as JSON:\n{json.dumps(user_data, indent=2)}")
+xpath_cache = XPathCache(prompt_version=XPATH_PROMPT_VERSION, model_name=model_id(model))
+
+# "fused": one planner call segments and classifies; "two-call": segment() then classify()
+PLANNER_MODE = os.getenv("PLANNER_MODE", "fused")
+# Execute fused-planner steps while the rest of the plan is still being generated
+STREAM_PLAN = os.getenv("STREAM_PLAN", "true").lower() == "true"
+# Reuse the plan of an instruction text seen before instead of calling the planner
+PLAN_CACHE = os.getenv("PLAN_CACHE", "true").lower() == "true"
+
+plan_cache = PlanCache()
+
+
+def plan_version(planner_mode: str) -> str:
+    """Prompt version of a planner mode, part of the plan cache key."""
+    if planner_mode == "fused":
+        return f"fused-{PLANNER_PROMPT_VERSION}"
+    # classify() labels obvious lines with rule_classifier before the LLM sees the rest
+    return f"{planner_mode}-{SEGMENT_PROMPT_VERSION}-{CLASSIFY_PROMPT_VERSION}-rules-{RULES_VERSION}"
+
+
+def build_plan(instruction_text: str, planner_mode: str = None) -> tuple:
+    """Turn NL input into ({"instructions": [...]}, [TokenUsage]) using the selected planner."""
+    planner_mode = planner_mode or PLANNER_MODE
+    if planner_mode == "fused":
+        output, usage = plan(instruction_text, model)
+        log.info("🗺️ Planner Output:\n" + str(output))
+        return output, usage
+    if planner_mode != "two-call":
+        raise ValueError(f"Unknown planner mode '{planner_mode}'. Choose 'fused' or 'two-call'.")
 
     # Convert NL to structured instructions
-    output = segment(instruction_text, model)
-    log.info("🧩 Sentence Segmentor Output:\n" + str(output))
+    segmented, segment_usage = segment(instruction_text, model)
+    log.info("🧩 Sentence Segmentor Output:\n" + str(segmented))
 
     # Classify the instructions
-    output = classify(output, model)
+    output, classify_usage = classify(segmented, model)
     log.info("🧠 Task Mapper Output:\n" + str(output))
+    return output, segment_usage + classify_usage
+
+
+def collect(usage: list, calls: list) -> None:
+    """Add the TokenUsage returned with an LLM result to the run's total, when there is one."""
+    if usage is not None:
+        usage.extend(calls)
+
+
+def cached_plan(instruction_text: str, planner_mode: str):
+    """The stored plan for this text, planner prompt version and model, or None."""
+    if not PLAN_CACHE:
+        return None
+    cached = plan_cache.get(instruction_text, plan_version(planner_mode), model_id(model))
+    if cached is not None:
+        log.info("📦 Plan cache hit: skipping the planner")
+    return cached
+
+
+def store_plan(instruction_text: str, planner_mode: str, steps: list) -> None:
+    if PLAN_CACHE and steps:
+        plan_cache.put(instruction_text, plan_version(planner_mode), model_id(model), {"instructions": steps})
+
+
+def forget_plan(instruction_text: str, planner_mode: str) -> None:
+    """Drop the stored plan of a run that failed, so the next run plans afresh."""
+    if PLAN_CACHE:
+        plan_cache.invalidate(instruction_text, plan_version(planner_mode), model_id(model))
+        log.info("📦 Plan cache entry dropped after a failed run")
+
+
+def plan_exit_hook(instruction_text: str, planner_mode: str):
+    """ExitStack callback that forgets the plan when the run ends in an error (not a cancellation)."""
+    def on_exit(exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception) and not issubclass(exc_type, RunCancelled):
+            forget_plan(instruction_text, planner_mode)
+        return False
+    return on_exit
+
+
+def iter_plan(instruction_text: str, planner_mode: str = None):
+    """Yield plan steps, from the plan cache or streamed from the fused planner when enabled.
+
+    The TokenUsage of the planner calls is yielded after the steps.
+    """
+    planner_mode = planner_mode or PLANNER_MODE
+    cached = cached_plan(instruction_text, planner_mode)
+    if cached is not None:
+        yield from cached["instructions"]
+        return
+
+    if planner_mode == "fused" and STREAM_PLAN:
+        yield from plan_stream(instruction_text, model)
+    else:
+        output, usage = build_plan(instruction_text, planner_mode)
+        yield from output["instructions"]
+        yield from usage
+
+
+class PlanStream:
+    """Iterator over planner steps arriving on a queue, with a non-blocking peek.
+
+    The steps handed out are kept in `planned`; `complete` is set once the
+    planner finished, so the run can store a plan it executed to the end.
+    """
+
+    def __init__(self, steps: queue.Queue, done):
+        self._steps = steps
+        self._done = done
+        self._buffer = deque()
+        self.planned = []
+        self.complete = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        step = self._buffer.popleft() if self._buffer else self._steps.get()
+        if step is self._done:
+            self._buffer.appendleft(step)
+            self.complete = True
+            raise StopIteration
+        if isinstance(step, Exception):
+            raise step
+        self.planned.append(step)
+        return step
+
+    def peek(self):
+        """The next step if the planner has produced it already, else None."""
+        if not self._buffer:
+            try:
+                self._buffer.append(self._steps.get_nowait())
+            except queue.Empty:
+                return None
+        step = self._buffer[0]
+        return step if isinstance(step, dict) else None
+
+
+def plan_in_background(instruction_text: str, planner_mode: str = None, usage: list = None) -> PlanStream:
+    """Start planning on a worker thread and return an iterator over its steps.
+
+    Steps are handed over as soon as the planner produces them, so the caller
+    can launch the browser and run early steps while later ones are generated.
+    Planner errors are re-raised in the consuming thread; the planner's
+    TokenUsage goes to the run's `usage`.
+    """
+    steps = queue.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for step in iter_plan(instruction_text, planner_mode):
+                if isinstance(step, TokenUsage):
+                    collect(usage, [step])
+                    continue
+                steps.put(step)
+        except Exception as e:
+            steps.put(e)
+        finally:
+            steps.put(done)
+
+    threading.Thread(target=produce, name="planner", daemon=True).start()
+    return PlanStream(steps, done)
+
+
+def matches_once(page, xpath: str) -> bool:
+    """True when the XPath resolves to exactly one element on the page."""
+    try:
+        return page.locator(xpath).count() == 1
+    except Exception:
+        return False
+
+
+def read_page(html: str) -> tuple:
+    """Parse a page once per step: its interactive-element index and structural fingerprint.
+
+    The heuristic locator, the XPath cache key and the pruned LLM prompt all
+    work from these rows, so a step never parses the same HTML twice.
+    """
+    skeleton = []
+    index = ElementIndex.from_html(html, skeleton)
+    return index, skeleton_fingerprint(skeleton)
+
+
+def resolve_step(instruction_text: str, page, classification: str = None, usage: list = None):
+    """Resolve an instruction to {"action", "xpath", "fill"} against the current page.
+
+    Tries, in order, the rule-based locator, the XPath cache and finally the
+    LLM. Returns (result, source) where source is "heuristic", "cache" or "llm".
+    Results are cached per (instruction, page structure); a cached XPath is
+    only reused while it still matches exactly one element.
+    """
+    html = page.content()
+    index, fingerprint = read_page(html)
+    result = resolve_locally(instruction_text, classification=classification, index=index)
+    if result is not None and matches_once(page, result["xpath"]):
+        source = "heuristic"
+        log.info("🎯 Resolved locally (heuristic)")
+    else:
+        result = xpath_cache.get(
+            instruction_text, fingerprint,
+            validate=lambda xpath: matches_once(page, xpath),
+        )
+        if result is not None:
+            source = "cache"
+            log.info("♻️ XPath cache hit")
+        else:
+            source = "llm"
+            result, calls = extract_xpath_pattern(instruction_text, html, model, rows=index.rows)
+            collect(usage, calls)
+            if matches_once(page, result["xpath"]):
+                xpath_cache.put(instruction_text, fingerprint, result)
+
+    print(" " * 30 + "🖨️  Extracted XPath result (print):")
+    for key, value in result.items():
+        print(" " * 30 + f"{key}: {value}")
+    return result, source
+
+def with_planned_value(item: dict, result: dict) -> dict:
+    """Apply the fill text precedence to a resolved fill step.
+
+    The fused planner extracts each step's "value" straight from the
+    instruction, so a non-empty value wins. Two-call plans carry no value,
+    and for them (or an empty value) the locator's "fill" is used.
+    """
+    value = item.get("value")
+    return {**result, "fill": value} if value else result
 
-    page_commands = [
-        "from playwright.sync_api import sync_playwright",
-        "",
+
+def resolve_offline(instruction_text: str, html: str, classification: str = None, usage: list = None):
+    """Resolve against an HTML snapshot without touching the page.
+
+    Safe to run off the Playwright thread; the caller must still check the
+    XPath against the live page before using it. Returns (result, source,
+    fingerprint), the fingerprint being that of the snapshot.
+    """
+    index, fingerprint = read_page(html)
+    result = resolve_locally(instruction_text, classification=classification, index=index)
+    if result is not None:
+        return result, "heuristic", fingerprint
+    result = xpath_cache.get(instruction_text, fingerprint)
+    if result is not None:
+        return result, "cache", fingerprint
+    result, calls = extract_xpath_pattern(instruction_text, html, model, rows=index.rows)
+    collect(usage, calls)
+    return result, "llm", fingerprint
+
+
+class Speculator:
+    """Resolve the next step's locator on a worker thread while the current step settles.
+
+    The look-ahead works on a snapshot taken right after the current action,
+    before the page settles. Its result is used only if the settled page has
+    the same structure (dom_fingerprint) as that snapshot and the XPath still
+    matches exactly one element; otherwise it is discarded without waiting
+    for it and counted as waste.
+    """
+
+    def __init__(self, usage: list = None):
+        self.stats = SpeculationStats()
+        self.usage = usage
+        # Two workers, so a fresh look-ahead never queues behind a discarded one still in flight
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculate")
+        self._pending = None
+
+    def start(self, upcoming, page) -> None:
+        if self._pending is not None or not should_speculate(upcoming):
+            return
+        try:
+            html = page.content()
+        except Exception:
+            # The page is mid-navigation; there is nothing stable to resolve against
+            return
+        self.stats.launched += 1
+        future = self._executor.submit(
+            resolve_offline, upcoming["original instruction"], html, upcoming["classification"], self.usage
+        )
+        self._pending = (upcoming, dom_fingerprint(html), future)
+
+    def claim(self, item, page):
+        """The speculative (result, source) for item if it still holds on the page, else None."""
+        if self._pending is None:
+            return None
+        upcoming, snapshot, future = self._pending
+        self._pending = None
+        try:
+            live = dom_fingerprint(page.content())
+        except Exception:
+            live = None
+        if upcoming is not item or live != snapshot:
+            # Computed against a different DOM: drop it (a running call finishes unobserved)
+            future.cancel()
+            self.stats.record_waste("stale")
+            log.info("🔮 Speculation discarded: the page changed since its snapshot")
+            return None
+        try:
+            result, source, fingerprint = future.result()
+        except Exception as e:
+            log.warning(f"Speculative resolution failed: {e}")
+            self.stats.record_waste(None)
+            return None
+
+        if matches_once(page, result["xpath"]):
+            self.stats.record_hit(source)
+            if source == "llm":
+                # The element fingerprint of the snapshot the answer was computed against
+                xpath_cache.put(item["original instruction"], fingerprint, result)
+            log.info(f"🔮 Speculative {source} result confirmed: {result}")
+            return result, source
+        self.stats.record_waste(source)
+        return None
+
+    def target(self, page):
+        """XPath of a finished look-ahead that matches exactly one element on the page, else None.
+
+        Passed to settle() so readiness can wait for the next step's target to become visible.
+        """
+        if self._pending is None:
+            return None
+        future = self._pending[-1]
+        if not future.done() or future.exception() is not None:
+            return None
+        xpath = future.result()[0]["xpath"]
+        return xpath if matches_once(page, xpath) else None
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RunCancelled(Exception):
+    """Raised by run_agent when its cancel_event is set mid-run."""
+
+
+def screenshot_update(step: int, instruction_text: str, classification: str, screenshot_bytes: bytes) -> dict:
+    """The step_data passed to callbacks after a step.
+
+    The raw capture is handed over as-is; downscaling and encoding happen on the
+    sending side (frame_stream.FrameSender) so they never add to step latency.
+    """
+    return {
+        "step": step,
+        "instruction": instruction_text,
+        "classification": classification,
+        "frame": screenshot_bytes,
+    }
+
+
+def finish_run(started: float, resolution_counts: Counter, page_commands: list, readiness: ReadinessReport,
+               speculation: SpeculationStats, usage: list) -> list:
+    """Log the run summary and close off the generated script."""
+    log.info(f"⏱️ Run finished after {time.perf_counter() - started:.2f}s")
+    log.info(f"⏳ Readiness ({READINESS_MODE}): {readiness.summary()}")
+    log.info(f"🔮 Speculation: {speculation.summary()}")
+    located = sum(resolution_counts.values())
+    if located:
+        avoided = located - resolution_counts["llm"]
+        log.info(f"📊 Locator paths: {dict(resolution_counts)} — LLM avoided for {avoided}/{located} steps ({avoided / located:.0%})")
+    log.info(f"📊 XPath cache: {xpath_cache.stats()}")
+    log.info(f"📊 Plan cache: {plan_cache.stats()}")
+    if usage:
+        log.info(f"🪙 LLM usage by stage: {summarize_usage(usage)}")
+
+    # Add final line to close browser context if not closed explicitly
+    if not any("browser.close()" in cmd for cmd in page_commands):
+        page_commands.append("    browser.close()")
+    return page_commands
+
+
+def script_header() -> list:
+    """Opening lines of the generated Playwright script."""
+    header = ["from playwright.sync_api import sync_playwright", ""]
+    if READINESS_MODE != "fixed":
+        header += SCRIPT_HELPER
+    return header + [
         "with sync_playwright() as p:",
         "    browser = p.chromium.launch(headless=False)",
         "    page = browser.new_page()",
         ""
     ]
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+
+def settle_command(budget_ms: int = 5000) -> str:
+    """The generated-script line that waits for the page after an action."""
+    if READINESS_MODE == "fixed":
+        return f"    page.wait_for_timeout({budget_ms})"
+    return f"    settle(page, {min(budget_ms, READINESS_CEILING_MS)})"
+
+
+def hover_commands(xpath: str) -> list:
+    """The generated-script lines for a hover: move the mouse to the element's centre, then click it."""
+    return [
+        f"    box = page.locator({repr(xpath)}).bounding_box()",
+        "    page.mouse.move(box['x'] + box['width'] / 2, box['y'] + box['height'] / 2)",
+        f"    page.locator({repr(xpath)}).click()",
+        settle_command(3000),
+    ]
+
+
+def run_agent(instruction_text: str, callback=None, planner_mode: str = None, headless: bool = False,
+              compiled_steps: list = None, cancel_event: threading.Event = None, context=None,
+              token_usage: list = None):
+    """
+    Run the agent with the given instruction.
+    callback: function(step_data) -> None
+    planner_mode: "fused" or "two-call" (defaults to PLANNER_MODE)
+    context: a BrowserContext on an already running browser to use instead of launching one
+    compiled_steps: if given, every executed step is appended as a resolved step for replay.py
+    cancel_event: when set, the run stops before its next step and closes the browser (raises RunCancelled)
+    token_usage: if given, the token usage of every LLM call of the run is appended (see token_usage.record)
+    """
+    # Wrap input in JSON structure
+    user_data = {"user_inputs": instruction_text}
+    log.info(f"🗃️  User Input as JSON:\n{json.dumps(user_data, indent=2)}")
+
+    started = time.perf_counter()
+    usage = token_usage if token_usage is not None else []
+    planner_mode = planner_mode or PLANNER_MODE
+    plan_text = instruction_text
+    plan_steps = plan_in_background(plan_text, planner_mode, usage)
+
+    page_commands = script_header()
+    readiness = ReadinessReport()
+    speculator = Speculator(usage)
+    compiled = compiled_steps if compiled_steps is not None else []
+
+    # How each locator step was resolved: heuristic / cache / llm
+    resolution_counts = Counter()
+
+    with ExitStack() as stack:
+        # A plan whose run fails is not served again
+        stack.push(plan_exit_hook(plan_text, planner_mode))
+        # Closed on every exit, including a failed step, so no look-ahead thread is left behind
+        stack.callback(speculator.close)
+        if context is None:
+            p = stack.enter_context(sync_playwright())
+            browser = p.chromium.launch(headless=headless)
+        else:
+            # A context on a warm browser stands in for the browser: new_page() and close() act on it alone
+            browser = context
         page = browser.new_page()
+        log.info(f"🚀 Browser ready after {time.perf_counter() - started:.2f}s")
 
-        instructions = output.get("instructions", [])
-        for i, item in enumerate(instructions):
+        for i, item in enumerate(plan_steps):
+            if cancel_event is not None and cancel_event.is_set():
+                log.info("🛑 Run cancelled")
+                raise RunCancelled(f"cancelled before step {i}")
+            if i == 0:
+                log.info(f"⚡ First step planned after {time.perf_counter() - started:.2f}s")
             classification = item.get("classification")
             instruction_text = item.get("original instruction")
             waiting_time = item.get("waiting_time")
@@ -62,37 +495,35 @@ def run_agent(instruction_text: str, callback=None):
             log.info(f"⏱️ Waiting_time: {waiting_time}")
 
             if classification == "page.goto":
-                url = extract_url(instruction_text)
+                url = item.get("url") or extract_url(instruction_text)
                 log.info(f"🌍 Navigating to: {url}")
                 page.goto(url)
                 page_commands.append(f"    page.goto({repr(url)})")
+                compiled.append(compile_step(instruction_text, classification, url=url))
 
             elif classification == "page.fill":
-                html = page.content()
-                result = extract_xpath_pattern(instruction_text, html, model)
-                print(" " * 30 + "🖨️  Extracted XPath result (print):")
-                for key, value in result.items():
-                    print(" " * 30 + f"{key}: {value}")
+                result, source = speculator.claim(item, page) or resolve_step(instruction_text, page, classification, usage)
+                resolution_counts[source] += 1
+                result = with_planned_value(item, result)
                 page.locator(result["xpath"]).fill(result["fill"])
+                speculator.start(plan_steps.peek(), page)
                 page_commands.append(f'    page.locator({repr(result["xpath"])}).fill({repr(result["fill"])})')
+                compiled.append(compile_step(instruction_text, classification, result=result))
 
             elif classification == "page.click":
-                html = page.content()
-                result = extract_xpath_pattern(instruction_text, html, model)
-                print(" " * 30 + "🖨️  Extracted XPath result (print):")
-                for key, value in result.items():
-                    print(" " * 30 + f"{key}: {value}")
+                result, source = speculator.claim(item, page) or resolve_step(instruction_text, page, classification, usage)
+                resolution_counts[source] += 1
                 page.locator(result["xpath"]).click()
-                page.wait_for_timeout(5000)
+                # Resolve the next step against the current DOM while this one settles
+                speculator.start(plan_steps.peek(), page)
+                settle(page, 5000, readiness, xpath=lambda: speculator.target(page))
                 page_commands.append(f'    page.locator({repr(result["xpath"])}).click()')
-                page_commands.append(f"    page.wait_for_timeout(5000)")
+                compiled.append(compile_step(instruction_text, classification, result=result))
+                page_commands.append(settle_command(5000))
 
             elif classification == "page.hover":
-                html = page.content()
-                result = extract_xpath_pattern(instruction_text, html, model)
-                print(" " * 30 + "🖨️  Extracted XPath result (print):")
-                for key, value in result.items():
-                    print(" " * 30 + f"{key}: {value}")
+                result, source = speculator.claim(item, page) or resolve_step(instruction_text, page, classification, usage)
+                resolution_counts[source] += 1
                 xpath = result["xpath"]
                 # Wait for element to ensure it's present and visible
                 page.wait_for_selector(xpath, state='visible', timeout=10000)
@@ -101,6 +532,7 @@ def run_agent(instruction_text: str, callback=None):
                 # Verify element is visible
                 if not element.is_visible():
                     print("Error: Element is not visible!")
+                    forget_plan(plan_text, planner_mode)
                     browser.close()
                     return
                 
@@ -122,62 +554,432 @@ def run_agent(instruction_text: str, callback=None):
                     page.mouse.move(x, y)  # Explicit mouse movement for visibility
                     # Perform click to select the element
                     element.click()
-                    # Add delay to observe effect
-                    page.wait_for_timeout(3000)
+                    speculator.start(plan_steps.peek(), page)
+                    # Let the page react before the next step
+                    settle(page, 3000, readiness, xpath=lambda: speculator.target(page))
                 
-                page_commands.append(f'    page.locator({repr(result["xpath"])}).hover()')
-                page_commands.append(f"    page.wait_for_timeout(5000)")
+                page_commands.extend(hover_commands(result["xpath"]))
+                compiled.append(compile_step(instruction_text, classification, result=result))
 
             elif classification == "page.wait":
                 log.info(f"⏳ Waiting for {waiting_time} seconds...")
                 if waiting_time is None:
                     waiting_time = 5
+                speculator.start(plan_steps.peek(), page)
                 page.wait_for_timeout(waiting_time * 1000)
                 page_commands.append(f"    page.wait_for_timeout({waiting_time * 1000})")
+                compiled.append(compile_step(instruction_text, classification, waiting_time=waiting_time))
 
             elif classification == "browser.close":
                 log.info("🚪 Closing browser...")
                 # Take screenshot before closing
-                import base64
                 try:
-                    screenshot_bytes = page.screenshot(timeout=5000)
-                    screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
-                    
+                    screenshot_bytes = page.screenshot(timeout=5000, **capture_options())
                     if callback:
-                        callback({
-                            "step": i,
-                            "instruction": instruction_text,
-                            "classification": classification,
-                            "image": f"data:image/png;base64,{screenshot_b64}"
-                        })
+                        callback(screenshot_update(i, instruction_text, classification, screenshot_bytes))
                 except Exception as e:
                     log.warning(f"Failed to capture screenshot: {e}")
                 
                 browser.close()
                 page_commands.append("    browser.close()")
+                compiled.append(compile_step(instruction_text, classification))
                 continue  # Skip the screenshot code below
 
             # Capture screenshot after every step (except browser.close)
-            import base64
             try:
-                screenshot_bytes = page.screenshot(timeout=5000)
-                screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
-                
+                screenshot_bytes = page.screenshot(timeout=5000, **capture_options())
                 if callback:
-                    callback({
-                        "step": i,
-                        "instruction": instruction_text,
-                        "classification": classification,
-                        "image": f"data:image/png;base64,{screenshot_b64}"
-                    })
+                    callback(screenshot_update(i, instruction_text, classification, screenshot_bytes))
             except Exception as e:
                 log.warning(f"Failed to capture screenshot: {e}")
 
-    # Add final line to close browser context if not closed explicitly
-    if not any("browser.close()" in cmd for cmd in page_commands):
-        page_commands.append("    browser.close()")
-    
-    return page_commands
+    # Only a plan that was generated to the end and ran without errors is stored
+    if plan_steps.complete:
+        store_plan(plan_text, planner_mode, plan_steps.planned)
+    return finish_run(started, resolution_counts, page_commands, readiness, speculator.stats, usage)
+
+
+# ------------------------
+# Asyncio runner (playwright.async_api)
+# ------------------------
+
+async def amatches_once(page, xpath: str) -> bool:
+    """Async matches_once for an async Playwright page."""
+    try:
+        return await page.locator(xpath).count() == 1
+    except Exception:
+        return False
+
+
+async def aresolve_step(instruction_text: str, page, classification: str = None, usage: list = None):
+    """Async resolve_step: same heuristic -> cache -> LLM order, awaiting the page and the model.
+
+    Parsing the page and the cache's sqlite calls run on worker threads, so
+    a large page never stalls the other sessions on the loop.
+    """
+    html = await page.content()
+    index, fingerprint = await asyncio.to_thread(read_page, html)
+    result = resolve_locally(instruction_text, classification=classification, index=index)
+    if result is not None and await amatches_once(page, result["xpath"]):
+        source = "heuristic"
+        log.info("🎯 Resolved locally (heuristic)")
+    else:
+        result = await xpath_cache.aget(
+            instruction_text, fingerprint,
+            validate=lambda xpath: amatches_once(page, xpath),
+        )
+        if result is not None:
+            source = "cache"
+            log.info("♻️ XPath cache hit")
+        else:
+            source = "llm"
+            result, calls = await aextract_xpath_pattern(instruction_text, html, model, rows=index.rows)
+            collect(usage, calls)
+            if await amatches_once(page, result["xpath"]):
+                await xpath_cache.aput(instruction_text, fingerprint, result)
+
+    print(" " * 30 + "🖨️  Extracted XPath result (print):")
+    for key, value in result.items():
+        print(" " * 30 + f"{key}: {value}")
+    return result, source
+
+
+async def aiter_plan(instruction_text: str, planner_mode: str = None):
+    """Async iter_plan. The two-call planner has no async variant, so it runs on a worker thread,
+    as do the plan cache's sqlite calls."""
+    planner_mode = planner_mode or PLANNER_MODE
+    cached = await asyncio.to_thread(cached_plan, instruction_text, planner_mode)
+    if cached is not None:
+        for step in cached["instructions"]:
+            yield step
+        return
+
+    if planner_mode == "fused" and STREAM_PLAN:
+        async for step in aplan_stream(instruction_text, model):
+            yield step
+    else:
+        if planner_mode == "fused":
+            output, usage = await aplan(instruction_text, model)
+            log.info("🗺️ Planner Output:\n" + str(output))
+        else:
+            output, usage = await asyncio.to_thread(build_plan, instruction_text, planner_mode)
+        for step in output["instructions"] + usage:
+            yield step
+
+
+class AsyncPlanStream:
+    """Async PlanStream over an asyncio.Queue fed by a planner task."""
+
+    def __init__(self, steps: asyncio.Queue, done, task):
+        self._steps = steps
+        self._done = done
+        self._task = task
+        self._buffer = deque()
+        self.planned = []
+        self.complete = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        step = self._buffer.popleft() if self._buffer else await self._steps.get()
+        if step is self._done:
+            self._buffer.appendleft(step)
+            self.complete = True
+            raise StopAsyncIteration
+        if isinstance(step, Exception):
+            raise step
+        self.planned.append(step)
+        return step
+
+    def peek(self):
+        """The next step if the planner has produced it already, else None."""
+        if not self._buffer:
+            try:
+                self._buffer.append(self._steps.get_nowait())
+            except asyncio.QueueEmpty:
+                return None
+        step = self._buffer[0]
+        return step if isinstance(step, dict) else None
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+def aplan_in_background(instruction_text: str, planner_mode: str = None, usage: list = None) -> AsyncPlanStream:
+    """Async plan_in_background: plan on a task and return an async iterator over its steps."""
+    steps = asyncio.Queue()
+    done = object()
+
+    async def produce():
+        try:
+            async for step in aiter_plan(instruction_text, planner_mode):
+                if isinstance(step, TokenUsage):
+                    collect(usage, [step])
+                    continue
+                await steps.put(step)
+        except Exception as e:
+            await steps.put(e)
+        finally:
+            await steps.put(done)
+
+    return AsyncPlanStream(steps, done, asyncio.create_task(produce()))
+
+
+async def aresolve_offline(instruction_text: str, html: str, classification: str = None, usage: list = None):
+    """Async resolve_offline."""
+    index, fingerprint = await asyncio.to_thread(read_page, html)
+    result = resolve_locally(instruction_text, classification=classification, index=index)
+    if result is not None:
+        return result, "heuristic", fingerprint
+    result = await xpath_cache.aget(instruction_text, fingerprint)
+    if result is not None:
+        return result, "cache", fingerprint
+    result, calls = await aextract_xpath_pattern(instruction_text, html, model, rows=index.rows)
+    collect(usage, calls)
+    return result, "llm", fingerprint
+
+
+class AsyncSpeculator:
+    """Speculator for the async runner: the look-ahead runs as a task on the same loop.
+
+    A look-ahead whose snapshot no longer matches the settled page is cancelled.
+    """
+
+    def __init__(self, usage: list = None):
+        self.stats = SpeculationStats()
+        self.usage = usage
+        self._pending = None
+
+    async def start(self, upcoming, page) -> None:
+        if self._pending is not None or not should_speculate(upcoming):
+            return
+        try:
+            html = await page.content()
+        except Exception:
+            return
+        self.stats.launched += 1
+        task = asyncio.create_task(
+            aresolve_offline(upcoming["original instruction"], html, upcoming["classification"], self.usage)
+        )
+        self._pending = (upcoming, asyncio.create_task(asyncio.to_thread(dom_fingerprint, html)), task)
+
+    async def claim(self, item, page):
+        """The speculative (result, source) for item if it still holds on the page, else None."""
+        if self._pending is None:
+            return None
+        upcoming, snapshot, task = self._pending
+        self._pending = None
+        try:
+            live = await asyncio.to_thread(dom_fingerprint, await page.content())
+        except Exception:
+            live = None
+        if upcoming is not item or live != await snapshot:
+            task.cancel()
+            self.stats.record_waste("stale")
+            log.info("🔮 Speculation discarded: the page changed since its snapshot")
+            return None
+        try:
+            result, source, fingerprint = await task
+        except Exception as e:
+            log.warning(f"Speculative resolution failed: {e}")
+            self.stats.record_waste(None)
+            return None
+
+        if await amatches_once(page, result["xpath"]):
+            self.stats.record_hit(source)
+            if source == "llm":
+                await xpath_cache.aput(item["original instruction"], fingerprint, result)
+            log.info(f"🔮 Speculative {source} result confirmed: {result}")
+            return result, source
+        self.stats.record_waste(source)
+        return None
+
+    async def target(self, page):
+        """Async Speculator.target."""
+        if self._pending is None:
+            return None
+        task = self._pending[-1]
+        if not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        xpath = task.result()[0]["xpath"]
+        return xpath if await amatches_once(page, xpath) else None
+
+    def close(self) -> None:
+        if self._pending is not None:
+            for task in self._pending[1:]:
+                task.cancel()
+            self._pending = None
+
+
+async def notify(callback, step_data: dict) -> None:
+    """Call a sync or async callback."""
+    if callback:
+        result = callback(step_data)
+        if inspect.isawaitable(result):
+            await result
+
+
+async def run_agent_async(instruction_text: str, callback=None, planner_mode: str = None, headless: bool = False,
+                          context=None, compiled_steps: list = None, token_usage: list = None):
+    """
+    Asyncio-native run_agent: same steps, callback payloads and generated
+    script, but built on playwright.async_api and async model calls so many
+    sessions can share one event loop.
+    callback: function(step_data) -> None, or an async function
+    context: a BrowserContext to run in (e.g. from BrowserPool) instead of launching a browser
+    compiled_steps: if given, every executed step is appended as a resolved step for replay.py
+    token_usage: if given, the token usage of every LLM call of the run is appended
+    """
+    user_data = {"user_inputs": instruction_text}
+    log.info(f"🗃️  User Input as JSON:\n{json.dumps(user_data, indent=2)}")
+
+    started = time.perf_counter()
+    usage = token_usage if token_usage is not None else []
+    planner_mode = planner_mode or PLANNER_MODE
+    plan_text = instruction_text
+    plan_steps = aplan_in_background(plan_text, planner_mode, usage)
+
+    page_commands = script_header()
+    readiness = ReadinessReport()
+    speculator = AsyncSpeculator(usage)
+    compiled = compiled_steps if compiled_steps is not None else []
+
+    # How each locator step was resolved: heuristic / cache / llm
+    resolution_counts = Counter()
+
+    async with AsyncExitStack() as stack:
+        stack.push(plan_exit_hook(plan_text, planner_mode))
+        stack.callback(plan_steps.cancel)
+        stack.callback(speculator.close)
+        if context is None:
+            p = await stack.enter_async_context(async_playwright())
+            browser = await p.chromium.launch(headless=headless)
+        else:
+            # A pooled context stands in for the browser: new_page() and close() act on it alone
+            browser = context
+        page = await browser.new_page()
+        log.info(f"🚀 Browser ready after {time.perf_counter() - started:.2f}s")
+
+        i = -1
+        async for item in plan_steps:
+            i += 1
+            if i == 0:
+                log.info(f"⚡ First step planned after {time.perf_counter() - started:.2f}s")
+            classification = item.get("classification")
+            instruction_text = item.get("original instruction")
+            waiting_time = item.get("waiting_time")
+
+            log.info(f"✏️ Instruction: {instruction_text}")
+            log.info(f"🏷️ Class: {classification}")
+            log.info(f"⏱️ Waiting_time: {waiting_time}")
+
+            if classification == "page.goto":
+                url = item.get("url") or extract_url(instruction_text)
+                log.info(f"🌍 Navigating to: {url}")
+                await page.goto(url)
+                page_commands.append(f"    page.goto({repr(url)})")
+                compiled.append(compile_step(instruction_text, classification, url=url))
+
+            elif classification == "page.fill":
+                result, source = await speculator.claim(item, page) or await aresolve_step(instruction_text, page, classification, usage)
+                resolution_counts[source] += 1
+                result = with_planned_value(item, result)
+                await page.locator(result["xpath"]).fill(result["fill"])
+                await speculator.start(plan_steps.peek(), page)
+                page_commands.append(f'    page.locator({repr(result["xpath"])}).fill({repr(result["fill"])})')
+                compiled.append(compile_step(instruction_text, classification, result=result))
+
+            elif classification == "page.click":
+                result, source = await speculator.claim(item, page) or await aresolve_step(instruction_text, page, classification, usage)
+                resolution_counts[source] += 1
+                await page.locator(result["xpath"]).click()
+                await speculator.start(plan_steps.peek(), page)
+                await asettle(page, 5000, readiness, xpath=lambda: speculator.target(page))
+                page_commands.append(f'    page.locator({repr(result["xpath"])}).click()')
+                compiled.append(compile_step(instruction_text, classification, result=result))
+                page_commands.append(settle_command(5000))
+
+            elif classification == "page.hover":
+                result, source = await speculator.claim(item, page) or await aresolve_step(instruction_text, page, classification, usage)
+                resolution_counts[source] += 1
+                xpath = result["xpath"]
+                await page.wait_for_selector(xpath, state='visible', timeout=10000)
+                element = page.locator(xpath)
+
+                if not await element.is_visible():
+                    print("Error: Element is not visible!")
+                    await asyncio.to_thread(forget_plan, plan_text, planner_mode)
+                    await browser.close()
+                    return
+
+                await page.evaluate(
+                    """() => {
+                        const style = document.createElement('style');
+                        style.innerHTML = 'th:active, th:focus { background-color: yellow !important; outline: 2px solid blue !important; }';
+                        document.head.appendChild(style);
+                    }"""
+                )
+
+                bounding_box = await element.bounding_box()
+                if bounding_box:
+                    x = bounding_box['x'] + bounding_box['width'] / 2
+                    y = bounding_box['y'] + bounding_box['height'] / 2
+                    print(" " * 30 + f"Moving mouse to: ({x}, {y})")
+                    await page.mouse.move(x, y)
+                    await element.click()
+                    await speculator.start(plan_steps.peek(), page)
+                    await asettle(page, 3000, readiness, xpath=lambda: speculator.target(page))
+
+                page_commands.extend(hover_commands(result["xpath"]))
+                compiled.append(compile_step(instruction_text, classification, result=result))
+
+            elif classification == "page.wait":
+                log.info(f"⏳ Waiting for {waiting_time} seconds...")
+                if waiting_time is None:
+                    waiting_time = 5
+                await speculator.start(plan_steps.peek(), page)
+                await page.wait_for_timeout(waiting_time * 1000)
+                page_commands.append(f"    page.wait_for_timeout({waiting_time * 1000})")
+                compiled.append(compile_step(instruction_text, classification, waiting_time=waiting_time))
+
+            elif classification == "browser.close":
+                log.info("🚪 Closing browser...")
+                try:
+                    screenshot_bytes = await page.screenshot(timeout=5000, **capture_options())
+                    await notify(callback, screenshot_update(i, instruction_text, classification, screenshot_bytes))
+                except Exception as e:
+                    log.warning(f"Failed to capture screenshot: {e}")
+
+                await browser.close()
+                page_commands.append("    browser.close()")
+                compiled.append(compile_step(instruction_text, classification))
+                continue
+
+            try:
+                screenshot_bytes = await page.screenshot(timeout=5000, **capture_options())
+                await notify(callback, screenshot_update(i, instruction_text, classification, screenshot_bytes))
+            except Exception as e:
+                log.warning(f"Failed to capture screenshot: {e}")
+
+    if plan_steps.complete:
+        await asyncio.to_thread(store_plan, plan_text, planner_mode, plan_steps.planned)
+    return finish_run(started, resolution_counts, page_commands, readiness, speculator.stats, usage)
+
+def save_artifacts(instruction_file: str, page_commands: list, compiled_steps: list) -> None:
+    """Write the generated script (.py) and the compiled plan (.plan.json) next to the instruction file."""
+    # Save page commands as .py file with same base name as input
+    py_path = instruction_file.rsplit('.', 1)[0] + ".py"
+    with open(py_path, "w") as f:
+        f.write("\n".join(page_commands))
+
+    log.info(f"💾 Saved browser commands to {py_path}")
+
+    # Save the resolved steps so replay.py can rerun them without the planner or the LLM
+    plan_path = compiled_path(instruction_file)
+    save_compiled(plan_path, compiled_steps)
+    log.info(f"💾 Saved compiled plan to {plan_path}")
+
 
 if __name__ == "__main__":
     # ------------------------
@@ -185,6 +987,10 @@ if __name__ == "__main__":
     # ------------------------
     parser = argparse.ArgumentParser(description="Run browser instructions from a file.")
     parser.add_argument("instruction_file", help="Path to the instruction text file.")
+    parser.add_argument("--planner", choices=["fused", "two-call"], default=None,
+                        help="Planner to use (default: PLANNER_MODE env var, else fused).")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run with the asyncio runner (run_agent_async).")
     args = parser.parse_args()
 
     # ------------------------
@@ -193,11 +999,10 @@ if __name__ == "__main__":
     with open(args.instruction_file, "r") as f:
         instruction = f.read().strip()
 
-    page_commands = run_agent(instruction)
+    compiled_steps = []
+    if args.use_async:
+        page_commands = asyncio.run(run_agent_async(instruction, planner_mode=args.planner, compiled_steps=compiled_steps))
+    else:
+        page_commands = run_agent(instruction, planner_mode=args.planner, compiled_steps=compiled_steps)
 
-    # Save page commands as .py file with same base name as input
-    py_path = args.instruction_file.rsplit('.', 1)[0] + ".py"
-    with open(py_path, "w") as f:
-        f.write("\n".join(page_commands))
-
-    log.info(f"💾 Saved browser commands to {py_path}")
+    save_artifacts(args.instruction_file, page_commands, compiled_steps)
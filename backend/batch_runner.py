@@ -0,0 +1,128 @@
+"""Run many instruction files in parallel, one warm browser per worker process.
+
+Each worker launches Chromium once and gives every case a fresh
+BrowserContext on it, so cases pay neither a browser launch nor each
+other's LLM latency. Artifacts are written exactly as the agentic_app CLI
+writes them.
+
+    python backend/batch_runner.py                      # resources/test_cases/*.txt
+    python backend/batch_runner.py --workers 6 resources/test_cases/1.txt resources/test_cases/2.txt
+"""
+import argparse
+import atexit
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from rich.console import Console
+from rich.table import Table
+
+DEFAULT_CASES = os.path.join(os.path.dirname(__file__), "..", "resources", "test_cases", "*.txt")
+
+# Per worker process: the Playwright driver and its warm browser
+_playwright = None
+_browser = None
+_headless = False
+
+
+def init_worker(headless: bool) -> None:
+    global _headless
+    _headless = headless
+    _launch()
+    atexit.register(_shutdown)
+
+
+def _launch() -> None:
+    global _playwright, _browser
+    from playwright.sync_api import sync_playwright
+    if _playwright is None:
+        _playwright = sync_playwright().start()
+    _browser = _playwright.chromium.launch(headless=_headless)
+
+
+def _shutdown() -> None:
+    if _browser is not None and _browser.is_connected():
+        _browser.close()
+    if _playwright is not None:
+        _playwright.stop()
+
+
+def run_case(instruction_file: str, planner_mode: str = None) -> dict:
+    """Run one instruction file in a fresh context on this worker's browser and save its artifacts."""
+    # Imported here so the parent process never loads the models or opens the caches
+    from agentic_app import run_agent, save_artifacts
+
+    if not _browser.is_connected():
+        _launch()
+
+    started = time.perf_counter()
+    with open(instruction_file, "r") as f:
+        instruction = f.read().strip()
+
+    compiled_steps = []
+    context = _browser.new_context()
+    try:
+        page_commands = run_agent(instruction, planner_mode=planner_mode, compiled_steps=compiled_steps,
+                                  context=context)
+        save_artifacts(instruction_file, page_commands, compiled_steps)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        context.close()
+
+    return {
+        "case": instruction_file,
+        "ok": error is None,
+        "steps": len(compiled_steps),
+        "seconds": time.perf_counter() - started,
+        "worker": os.getpid(),
+        "error": error,
+    }
+
+
+def run_batch(cases: list, workers: int, planner_mode: str = None, headless: bool = True) -> list:
+    # spawn, not fork: workers must not inherit the parent's threads or sqlite handles
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker, initargs=(headless,)) as pool:
+        futures = [pool.submit(run_case, case, planner_mode) for case in cases]
+        return [future.result() for future in as_completed(futures)]
+
+
+def print_report(results: list, wall_seconds: float, workers: int) -> None:
+    table = Table(title="Batch run")
+    for column in ("case", "status", "steps", "seconds", "worker"):
+        table.add_column(column, justify="left" if column in ("case", "status") else "right")
+    for result in sorted(results, key=lambda r: r["case"]):
+        status = "ok" if result["ok"] else f"[red]failed[/red] {result['error']}"
+        table.add_row(os.path.relpath(result["case"]), status, str(result["steps"]),
+                      f"{result['seconds']:.2f}", str(result["worker"]))
+
+    serial_seconds = sum(result["seconds"] for result in results)
+    passed = sum(result["ok"] for result in results)
+    table.caption = (
+        f"{passed}/{len(results)} passed on {workers} workers — wall {wall_seconds:.2f}s, "
+        f"sum of cases {serial_seconds:.2f}s, speedup {serial_seconds / wall_seconds:.1f}x"
+    )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run instruction files in parallel with warm browsers.")
+    parser.add_argument("cases", nargs="*", help=f"Instruction files (default: {os.path.relpath(DEFAULT_CASES)}).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: number of CPUs, at most one per case).")
+    parser.add_argument("--planner", choices=["fused", "two-call"], default=None,
+                        help="Planner to use (default: PLANNER_MODE env var, else fused).")
+    parser.add_argument("--headed", action="store_true", help="Show the browser windows.")
+    args = parser.parse_args()
+
+    cases = args.cases or sorted(glob.glob(DEFAULT_CASES))
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(cases)))
+
+    started = time.perf_counter()
+    results = run_batch(cases, workers, planner_mode=args.planner, headless=not args.headed)
+    print_report(results, time.perf_counter() - started, workers)
+    if not all(result["ok"] for result in results):
+        raise SystemExit(1)
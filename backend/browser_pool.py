@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+
+class PooledBrowser:
+    """One warm Chromium process and the bookkeeping the pool needs for it."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+        self.served = 0
+        self.crashed = False
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, *_):
+        self.crashed = True
+
+
+class BrowserPool:
+    """Keep `size` Chromium instances warm and lease a fresh BrowserContext per session.
+
+    Each browser hosts at most `contexts_per_browser` sessions at once; when
+    every slot is taken callers wait. A browser is replaced once it has served
+    `max_sessions` sessions (after its last session ends) or when it crashes.
+    Replacements are launched in the background and retried with exponential
+    backoff; while launches keep failing and no healthy browser is left,
+    callers get the launch error instead of waiting forever.
+    """
+
+    def __init__(self, size: int = 2, max_sessions: int = 50, contexts_per_browser: int = 4, headless: bool = False,
+                 launch_backoff: float = 1.0, max_launch_backoff: float = 30.0):
+        self.size = size
+        self.max_sessions = max_sessions
+        self.contexts_per_browser = contexts_per_browser
+        self.headless = headless
+        self.launch_backoff = launch_backoff
+        self.max_launch_backoff = max_launch_backoff
+        self._playwright = None
+        self._browsers = []
+        self._condition = asyncio.Condition()
+        self._waits = deque(maxlen=1000)
+        # Background replacement tasks; referenced here so they are not garbage-collected
+        self._tasks = set()
+        self._launching = 0
+        self.launch_error = None
+        self.waiting = 0
+        self.sessions = 0
+        self.recycles = 0
+        self.crashes = 0
+        self.launch_failures = 0
+
+    async def start(self) -> None:
+        self._playwright = await async_playwright().start()
+        self._browsers = list(await asyncio.gather(*(self._launch() for _ in range(self.size))))
+
+    async def close(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        async with self._condition:
+            browsers, self._browsers = self._browsers, []
+        for pooled in browsers:
+            await self._close_browser(pooled)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _launch(self) -> PooledBrowser:
+        return PooledBrowser(await self._playwright.chromium.launch(headless=self.headless))
+
+    async def _close_browser(self, pooled: PooledBrowser) -> None:
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    def _pick(self):
+        """Least-loaded healthy browser with a free slot that is not due for recycling."""
+        candidates = [
+            pooled for pooled in self._browsers
+            if not pooled.crashed and pooled.active < self.contexts_per_browser and pooled.served < self.max_sessions
+        ]
+        return min(candidates, key=lambda pooled: pooled.active, default=None)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Browser pool task failed: {task.exception()!r}")
+
+    async def _launch_with_backoff(self) -> PooledBrowser:
+        """Launch a browser, retrying with exponential backoff until it succeeds."""
+        delay = self.launch_backoff
+        while True:
+            try:
+                fresh = await self._launch()
+            except Exception as e:
+                self.launch_failures += 1
+                print(f"Browser launch failed, retrying in {delay:.1f}s: {e}")
+                async with self._condition:
+                    self.launch_error = e
+                    # Waiters with no healthy browser left re-check and fail fast
+                    self._condition.notify_all()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_launch_backoff)
+            else:
+                self.launch_error = None
+                return fresh
+
+    async def _replace(self, pooled: PooledBrowser, crashed: bool) -> None:
+        """Swap a crashed or worn-out browser for a fresh one."""
+        async with self._condition:
+            if pooled not in self._browsers:
+                return
+            self._browsers.remove(pooled)
+            self._launching += 1
+            if crashed:
+                self.crashes += 1
+            else:
+                self.recycles += 1
+        fresh = None
+        try:
+            await self._close_browser(pooled)
+            fresh = await self._launch_with_backoff()
+        finally:
+            async with self._condition:
+                self._launching -= 1
+                if fresh is not None:
+                    self._browsers.append(fresh)
+                self._condition.notify_all()
+
+    async def _acquire(self) -> PooledBrowser:
+        started = time.perf_counter()
+        async with self._condition:
+            self.waiting += 1
+            try:
+                while True:
+                    # Crashed browsers with no sessions left are replaced before picking
+                    for pooled in list(self._browsers):
+                        if pooled.crashed and not pooled.active:
+                            self._spawn(self._replace(pooled, crashed=True))
+                    pooled = self._pick()
+                    if pooled is not None:
+                        break
+                    if self.launch_error is not None and all(pooled.crashed for pooled in self._browsers):
+                        raise RuntimeError("No browser available: relaunching failed") from self.launch_error
+                    await self._condition.wait()
+            finally:
+                self.waiting -= 1
+            pooled.active += 1
+            pooled.served += 1
+            self.sessions += 1
+        self._waits.append(time.perf_counter() - started)
+        return pooled
+
+    async def _release(self, pooled: PooledBrowser) -> None:
+        async with self._condition:
+            pooled.active -= 1
+            retire = not pooled.active and (pooled.crashed or pooled.served >= self.max_sessions)
+            self._condition.notify_all()
+        if retire:
+            self._spawn(self._replace(pooled, crashed=pooled.crashed))
+
+    @asynccontextmanager
+    async def session(self):
+        """Lease an isolated BrowserContext on a warm browser for one agent run."""
+        pooled = await self._acquire()
+        try:
+            context = await pooled.browser.new_context()
+        except Exception:
+            pooled.crashed = pooled.crashed or not pooled.browser.is_connected()
+            await self._release(pooled)
+            raise
+        try:
+            yield context
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+            await self._release(pooled)
+
+    def stats(self) -> dict:
+        """Occupancy, queueing and lifecycle counters, with wait times in ms."""
+        capacity = len(self._browsers) * self.contexts_per_browser
+        active = sum(pooled.active for pooled in self._browsers)
+        waits = sorted(self._waits)
+
+        def percentile(q):
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "browsers": len(self._browsers),
+            "launching": self._launching,
+            "capacity": capacity,
+            "active_sessions": active,
+            "occupancy": round(active / capacity, 3) if capacity else 0.0,
+            "waiting": self.waiting,
+            "sessions": self.sessions,
+            "recycles": self.recycles,
+            "crashes": self.crashes,
+            "launch_failures": self.launch_failures,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+        }
@@ -0,0 +1,39 @@
+import json
+import os
+
+# Bump when the step layout changes; older files are recompiled from the .txt
+COMPILED_FORMAT_VERSION = 1
+
+
+def compile_step(instruction_text: str, classification: str, url: str = "", result: dict = None,
+                 waiting_time=0) -> dict:
+    """A fully resolved step: what replay needs to run it without the planner or the LLM."""
+    return {
+        "original instruction": instruction_text,
+        "classification": classification,
+        "url": url or "",
+        "xpath": result["xpath"] if result else "",
+        "fill": (result.get("fill") or "") if result and classification == "page.fill" else "",
+        "waiting_time": waiting_time or 0,
+    }
+
+
+def compiled_path(instruction_file: str) -> str:
+    """resources/test_cases/1.txt -> resources/test_cases/1.plan.json"""
+    return instruction_file.rsplit(".", 1)[0] + ".plan.json"
+
+
+def load_compiled(path: str):
+    """The compiled steps stored at path, or None if missing or in an older format."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != COMPILED_FORMAT_VERSION:
+        return None
+    return data["instructions"]
+
+
+def save_compiled(path: str, steps: list) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": COMPILED_FORMAT_VERSION, "instructions": steps}, f, indent=4)
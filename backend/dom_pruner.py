@@ -0,0 +1,146 @@
+import time
+from collections import Counter
+from bs4 import BeautifulSoup, Tag
+from utils import count_tokens
+
+# Subtrees that never hold anything a step can act on
+SKIP_TAGS = {"script", "style", "svg", "noscript", "template", "head", "meta", "link", "canvas", "iframe"}
+
+INTERACTIVE_TAGS = {"a", "button", "input", "select", "textarea", "summary"}
+
+INTERACTIVE_ROLES = {
+    "button", "link", "checkbox", "radio", "switch", "tab", "menuitem",
+    "menuitemcheckbox", "menuitemradio", "option", "combobox", "textbox",
+    "searchbox", "slider", "spinbutton", "treeitem",
+}
+
+COLUMNS = ["tag", "id", "name", "type", "role", "aria-label", "placeholder", "label", "text", "xpath"]
+
+TEXT_LIMIT = 80
+
+
+def _clean(text: str, limit: int = TEXT_LIMIT) -> str:
+    """Collapse whitespace and truncate a cell value."""
+    return " ".join((text or "").split())[:limit]
+
+
+def _is_interactive(tag: Tag) -> bool:
+    """Decide whether an element is a candidate target for click/fill/hover."""
+    if tag.name in INTERACTIVE_TAGS:
+        return not (tag.name == "input" and tag.get("type", "").lower() == "hidden")
+    if tag.get("role", "").lower() in INTERACTIVE_ROLES:
+        return True
+    if tag.has_attr("onclick"):
+        return True
+    if tag.has_attr("contenteditable") and tag["contenteditable"].lower() != "false":
+        return True
+    # tabindex="-1" only makes an element focusable from script
+    return tag.get("tabindex", "").strip().isdigit()
+
+
+def _visible_text(tag: Tag) -> str:
+    """Text a user would read on the element (value for input buttons)."""
+    if tag.name == "input":
+        if tag.get("type", "").lower() in ("submit", "button", "reset"):
+            return _clean(tag.get("value", ""))
+        return ""
+    return _clean(tag.get_text(" ", strip=True))
+
+
+def _walk(root: Tag):
+    """Yield (element, absolute xpath, enclosing <label>) in document order, skipping non-content subtrees."""
+    stack = [(root, "/" + root.name, None)]
+    while stack:
+        node, path, label = stack.pop()
+        yield node, path, label
+        if node.name == "label":
+            label = node
+
+        children = [c for c in node.children if isinstance(c, Tag) and c.name not in SKIP_TAGS]
+        totals = Counter(c.name for c in children)
+        seen = Counter()
+        entries = []
+        for child in children:
+            seen[child.name] += 1
+            step = child.name if totals[child.name] == 1 else f"{child.name}[{seen[child.name]}]"
+            entries.append((child, f"{path}/{step}", label))
+        stack.extend(reversed(entries))
+
+
+def _label_map(soup: BeautifulSoup) -> dict:
+    """Map input ids to the text of the <label for=...> that names them."""
+    labels = {}
+    for label in soup.find_all("label"):
+        target = label.get("for")
+        if target:
+            labels[target] = _clean(label.get_text(" ", strip=True))
+    return labels
+
+
+def extract_interactive_elements(html: str, skeleton: list = None) -> list:
+    """Parse the HTML once and return one row per candidate interactive element.
+
+    skeleton: if given, "tag#id@name/xpath" of every element walked is appended,
+    the page's structural skeleton (see xpath_cache.skeleton_fingerprint).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    root = soup.find("html") or next((c for c in soup.children if isinstance(c, Tag)), None)
+    if root is None:
+        return []
+
+    labels = _label_map(soup)
+    rows = []
+    for tag, path, parent_label in _walk(root):
+        if skeleton is not None:
+            skeleton.append(f"{tag.name}#{tag.get('id', '')}@{tag.get('name', '')}{path}")
+        if not _is_interactive(tag):
+            continue
+        element_id = tag.get("id", "")
+        label = labels.get(element_id, "")
+        if not label and parent_label is not None:
+            label = _clean(parent_label.get_text(" ", strip=True))
+        rows.append({
+            "tag": tag.name,
+            "id": element_id,
+            "name": tag.get("name", ""),
+            "type": tag.get("type", ""),
+            "role": tag.get("role", ""),
+            "aria-label": _clean(tag.get("aria-label", "")),
+            "placeholder": _clean(tag.get("placeholder", "")),
+            "label": label,
+            "text": _visible_text(tag),
+            # "//html/..." is what Playwright recognises as an XPath selector
+            "xpath": "/" + path,
+        })
+    return rows
+
+
+def render_element_table(rows: list) -> str:
+    """Render element rows as a compact pipe-separated table for the prompt."""
+    lines = [" | ".join(["#"] + COLUMNS)]
+    for i, row in enumerate(rows):
+        cells = [str(row.get(column, "")).replace("|", "\\|") for column in COLUMNS]
+        lines.append(" | ".join([str(i)] + cells))
+    return "\n".join(lines)
+
+
+def prune_html(html: str, model_name: str = "gpt-4o-mini", rows: list = None):
+    """Reduce a page to its interactive-element table.
+
+    Returns (table, stats) where stats holds the element count, the prompt
+    tokens of the raw HTML and of the table, and the pruning time in ms.
+    rows: the page's extract_interactive_elements() rows, if the caller already has them.
+    """
+    start = time.perf_counter()
+    if rows is None:
+        rows = extract_interactive_elements(html)
+    table = render_element_table(rows)
+    prune_ms = (time.perf_counter() - start) * 1000
+
+    stats = {
+        "elements": len(rows),
+        "raw_tokens": count_tokens(html, model_name),
+        "pruned_tokens": count_tokens(table, model_name),
+        "prune_ms": prune_ms,
+    }
+    return table, stats
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", ".cache", "embedding_cache.sqlite"),
+)
+DEFAULT_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def content_key(model_name: str, text: str) -> str:
+    """Content address of an embedding: hash(model_name, chunk_text)."""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed store of chunk embeddings in a sqlite file.
+
+    Vectors are stored as raw float32 blobs. When the stored bytes exceed
+    max_bytes the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.evictions = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+        self.bytes_cached = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_name: str, texts: list) -> list:
+        """Cached vectors (as float lists) for each text, None where missing."""
+        keys = [content_key(model_name, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update({key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows})
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                self._db.commit()
+        return [found.get(key) for key in keys]
+
+    def put_many(self, model_name: str, texts: list, vectors: list) -> None:
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((content_key(model_name, text), blob, len(blob), now))
+        with self._lock:
+            for key, blob, size, _ in rows:
+                previous = self._db.execute("SELECT size FROM embeddings WHERE key = ?", (key,)).fetchone()
+                self.bytes_cached += size - (previous[0] if previous else 0)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        while self.bytes_cached > self.max_bytes:
+            victims = self._db.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used ASC LIMIT 100"
+            ).fetchall()
+            if not victims:
+                break
+            freed = []
+            for key, size in victims:
+                if self.bytes_cached <= self.max_bytes:
+                    break
+                freed.append((key,))
+                self.bytes_cached -= size
+            self._db.executemany("DELETE FROM embeddings WHERE key = ?", freed)
+            self.evictions += len(freed)
+
+    def embed(self, texts: list, model_name: str, embed_batch) -> list:
+        """Embed texts, calling embed_batch(list_of_texts) only for uncached ones.
+
+        Identical texts in the same request are embedded once.
+        """
+        vectors = self.get_many(model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                self.api_calls += 1
+
+        if missing:
+            fresh = dict(zip(missing, embed_batch(missing)))
+            self.put_many(model_name, list(fresh), list(fresh.values()))
+            vectors = [vector if vector is not None else list(fresh[text]) for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def stats(self) -> dict:
+        """Embedding calls saved, bytes cached and eviction counters."""
+        with self._lock:
+            return {
+                "embeddings_saved": self.hits,
+                "embeddings_computed": self.misses,
+                "api_calls": self.api_calls,
+                "bytes_cached": self.bytes_cached,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
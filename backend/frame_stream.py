@@ -0,0 +1,134 @@
+import asyncio
+import io
+import os
+import time
+from PIL import Image
+
+# "jpeg" (default), "webp" or "png"
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg").lower()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", 70))
+# Frames wider than this are downscaled before sending; 0 keeps the captured size
+SCREENSHOT_MAX_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", 960))
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+def capture_options() -> dict:
+    """page.screenshot() options: let the browser encode JPEG, which is far cheaper than PNG.
+
+    WebP is not a Playwright screenshot type, so it is captured as high-quality
+    JPEG and re-encoded by encode_frame.
+    """
+    if SCREENSHOT_FORMAT == "png":
+        return {"type": "png", "scale": "css"}
+    quality = 90 if SCREENSHOT_FORMAT == "webp" else SCREENSHOT_QUALITY
+    return {"type": "jpeg", "quality": quality, "scale": "css"}
+
+
+def frame_mime() -> str:
+    """Mime type of the frames clients receive."""
+    return MIME_TYPES.get(SCREENSHOT_FORMAT, MIME_TYPES["jpeg"])
+
+
+def encode_frame(raw: bytes, fmt: str = None, quality: int = None, max_width: int = None) -> bytes:
+    """Downscale and re-encode a captured screenshot; passes it through when nothing changes."""
+    fmt = fmt or SCREENSHOT_FORMAT
+    quality = SCREENSHOT_QUALITY if quality is None else quality
+    max_width = SCREENSHOT_MAX_WIDTH if max_width is None else max_width
+
+    image = Image.open(io.BytesIO(raw))
+    resize = bool(max_width) and image.width > max_width
+    same_format = (image.format or "").lower() == ("jpeg" if fmt == "jpeg" else fmt)
+    if not resize and same_format:
+        return raw
+
+    if resize:
+        height = max(1, round(image.height * max_width / image.width))
+        image = image.resize((max_width, height), Image.BILINEAR)
+    if fmt in ("jpeg", "webp") and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    out = io.BytesIO()
+    if fmt == "png":
+        image.save(out, format="PNG", optimize=False)
+    else:
+        image.save(out, format=fmt.upper(), quality=quality)
+    return out.getvalue()
+
+
+class FrameSender:
+    """Send step updates as JSON and screenshots as binary WebSocket frames.
+
+    Step metadata goes out immediately and in order. Frames go through a
+    single "latest frame" slot that a background task encodes (off the event
+    loop) and sends: if the client is slower than the agent, a frame still
+    waiting when the next one arrives is dropped, so screenshots never queue
+    up behind a slow connection or hold up the agent.
+    """
+
+    def __init__(self, send_json, send_bytes):
+        self._send_json = send_json
+        self._send_bytes = send_bytes
+        self._latest = None
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._task = None
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.frames_failed = 0
+        self.bytes_sent = 0
+        self.encode_seconds = 0.0
+
+    def start(self) -> "FrameSender":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def publish(self, step_data: dict) -> None:
+        """Forward one agent update; step_data["frame"] holds the raw screenshot, if any."""
+        frame = step_data.get("frame")
+        metadata = {key: value for key, value in step_data.items() if key != "frame"}
+        if frame is not None:
+            metadata["mime"] = frame_mime()
+        await self._send_json(metadata)
+        if frame is not None:
+            if self._latest is not None:
+                self.frames_dropped += 1
+            self._latest = frame
+            self._ready.set()
+
+    async def _run(self) -> None:
+        while True:
+            if self._latest is None:
+                if self._closing:
+                    return
+                await self._ready.wait()
+                self._ready.clear()
+                continue
+            frame, self._latest = self._latest, None
+            try:
+                start = time.perf_counter()
+                encoded = await asyncio.to_thread(encode_frame, frame)
+                self.encode_seconds += time.perf_counter() - start
+                await self._send_bytes(encoded)
+            except Exception:
+                # A bad frame or a closed socket must not take the step updates down with it
+                self.frames_failed += 1
+                continue
+            self.frames_sent += 1
+            self.bytes_sent += len(encoded)
+
+    async def close(self) -> None:
+        """Send the last pending frame, then stop."""
+        self._closing = True
+        self._ready.set()
+        if self._task is not None:
+            await self._task
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "frames_failed": self.frames_failed,
+            "bytes_sent": self.bytes_sent,
+            "encode_ms_avg": round(self.encode_seconds * 1000 / self.frames_sent, 2) if self.frames_sent else 0.0,
+        }
@@ -0,0 +1,147 @@
+import re
+from dom_pruner import extract_interactive_elements
+
+# Element attributes a step can name its target by, in order of preference
+FIELDS = ("text", "label", "placeholder", "aria-label", "name", "id")
+
+NON_TEXT_INPUT_TYPES = {"submit", "button", "reset", "checkbox", "radio", "image", "file", "range", "color"}
+
+QUOTE = "'\"`‘’“”"
+QUOTED = rf"[{QUOTE}]([^{QUOTE}]+)[{QUOTE}]"
+VALUE = rf"[{QUOTE}](?P<value>[^{QUOTE}]*)[{QUOTE}]"
+
+FILL_PATTERNS = [
+    # enter 'pass1234' into the password field
+    re.compile(rf"(?:enter|type|input|write|put)\s+{VALUE}\s+(?:into|in|on)\s+(?P<target>.+)", re.I),
+    # fill the 'Title' field with 'Meeting Agenda'
+    re.compile(rf"(?:fill(?:\s+(?:in|out))?|set|populate)\s+(?P<target>.+?)\s+(?:with|to|as)\s+(?:the\s+(?:text|value)\s*:?\s*)?{VALUE}", re.I),
+    # find the username input field and enter 'mehdi.mirzapour@gmail.com'
+    re.compile(rf"(?P<target>.+?)\s+and\s+(?:enter|type|input|fill in)\s+{VALUE}", re.I),
+]
+
+CLICK_PATTERN = re.compile(r"(?:click|press|tap|select|hover|mouse)(?:\s+(?:on|over|onto))?\s+(?P<target>.+)", re.I)
+
+LEADING_WORDS = re.compile(r"^(?:find\s+(?:and\s+)?|locate\s+|the\s+|on\s+)+", re.I)
+TRAILING_WORDS = re.compile(
+    r"(?:\s+(?:input|text|field|box|textbox|area|button|link|tab|icon|option|item|menu|dropdown))+$", re.I
+)
+
+# A target longer than this is a description, not a name
+MAX_TARGET_WORDS = 4
+
+
+def _compact(value: str) -> str:
+    """Case-, space- and punctuation-insensitive key ("Log In" == "login" == "log-in")."""
+    return re.sub(r"[^0-9a-z]", "", (value or "").lower())
+
+
+def _action_for(instruction: str, classification: str = None) -> str:
+    if classification:
+        return classification.split(".")[-1]
+    lowered = instruction.lower()
+    if re.search(r"\b(?:hover|mouse over)\b", lowered):
+        return "hover"
+    if re.search(r"\b(?:enter|type|fill|input|write)\b", lowered):
+        return "fill"
+    return "click"
+
+
+def _clean_target(target: str) -> str:
+    target = target.strip().strip(".!,;:").strip()
+    quoted = re.fullmatch(rf"(?:the\s+)?{QUOTED}(?P<rest>.*)", target, re.I)
+    if quoted:
+        target = quoted.group(1) + quoted.group("rest")
+    target = LEADING_WORDS.sub("", target.strip(QUOTE + " "))
+    target = TRAILING_WORDS.sub("", target).strip(QUOTE + " ")
+    return target
+
+
+def parse_instruction(instruction: str, classification: str = None):
+    """Split a step into (action, target name, fill value), or None when it does not
+    follow one of the verbatim-quoting shapes the segmentor produces."""
+    action = _action_for(instruction, classification)
+    text = instruction.strip().rstrip(".")
+
+    if action == "fill":
+        for pattern in FILL_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                value = match.group("value")
+                target = _clean_target(match.group("target"))
+                break
+        else:
+            return None
+    else:
+        quoted = re.findall(QUOTED, text)
+        if quoted:
+            target = _clean_target(quoted[0])
+        else:
+            match = CLICK_PATTERN.search(text)
+            if not match:
+                return None
+            target = _clean_target(match.group("target"))
+        value = ""
+
+    if not target or len(target.split()) > MAX_TARGET_WORDS:
+        return None
+    return action, target, value
+
+
+def _accepts(row: dict, action: str) -> bool:
+    """Fill only targets editable elements; click/hover accept anything interactive."""
+    if action != "fill":
+        return True
+    if row["tag"] in ("textarea", "select"):
+        return True
+    return row["tag"] == "input" and row["type"].lower() not in NON_TEXT_INPUT_TYPES
+
+
+class ElementIndex:
+    """Interactive elements of one page indexed by text, label, placeholder, name, id and aria-label."""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self._by_key = {}
+        for i, row in enumerate(rows):
+            for field in FIELDS:
+                key = _compact(row.get(field, ""))
+                if key:
+                    self._by_key.setdefault(key, set()).add(i)
+
+    @classmethod
+    def from_html(cls, html: str, skeleton: list = None) -> "ElementIndex":
+        return cls(extract_interactive_elements(html, skeleton))
+
+    def lookup(self, target: str, action: str) -> list:
+        """Rows whose name matches the target and that can take the action."""
+        return [self.rows[i] for i in sorted(self._by_key.get(_compact(target), ())) if _accepts(self.rows[i], action)]
+
+    def xpath_for(self, row: dict) -> str:
+        """Shortest XPath that stays unique among the page's interactive elements."""
+        for attr in ("id", "name"):
+            value = row.get(attr, "")
+            # ids like ":r1:" are generated per render (React useId) and not stable
+            if attr == "id" and ":" in value:
+                continue
+            if value and "'" not in value and sum(1 for r in self.rows if r.get(attr) == value) == 1:
+                return f"//{row['tag']}[@{attr}='{value}']"
+        return row["xpath"]
+
+
+def resolve_locally(instruction: str, html: str = None, classification: str = None, index: ElementIndex = None):
+    """Resolve a step to {"action", "xpath", "fill"} without the LLM.
+
+    Returns None when the instruction cannot be parsed or the target matches
+    zero or several elements; the caller then falls back to extract_xpath_pattern.
+    """
+    parsed = parse_instruction(instruction, classification)
+    if parsed is None:
+        return None
+    action, target, value = parsed
+
+    if index is None:
+        index = ElementIndex.from_html(html)
+    matches = index.lookup(target, action)
+    if len(matches) != 1:
+        return None
+    return {"action": action, "xpath": index.xpath_for(matches[0]), "fill": value}
@@ -0,0 +1,176 @@
+from collections import Counter, deque
+from html.parser import HTMLParser
+from dom_pruner import SKIP_TAGS
+from utils import count_tokens, split_by_tokens
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+# Size of the slices fed to the parser when chunking an in-memory string
+FEED_SIZE = 64 * 1024
+
+
+class _ChunkingParser(HTMLParser):
+    """Re-serialise HTML into token-budgeted chunks that end on element boundaries.
+
+    Each chunk records the XPath of the deepest element that contains all of
+    its content, so retrieval results can be mapped back into the page.
+    """
+
+    def __init__(self, max_tokens: int, model_name: str):
+        super().__init__(convert_charrefs=False)
+        self.max_tokens = max_tokens
+        self.model_name = model_name
+        self.ready = deque()
+        # Open elements as (tag, xpath step, Counter of child tags seen so far)
+        self.stack = [("", "", Counter())]
+        self.skip_depth = 0
+        # Buffered pieces as (text, tokens, depth, container xpath)
+        self.parts = []
+        self.tokens = 0
+        # Positions in parts that sit between sibling elements, as (position, depth)
+        self.boundaries = []
+        self.count = 0
+        # Text arrives in pieces across feed() calls and entity refs
+        self.pending_text = []
+
+    # --- chunk buffer -------------------------------------------------
+
+    def _container(self) -> str:
+        return "".join(step for _, step, _ in self.stack[1:]) or "/"
+
+    def _emit(self, parts: list) -> None:
+        text = "".join(part[0] for part in parts)
+        if not text.strip():
+            return
+        shallowest = min(parts, key=lambda part: part[2])
+        self.ready.append({
+            "index": self.count,
+            "text": text,
+            "tokens": sum(part[1] for part in parts),
+            "xpath": shallowest[3],
+        })
+        self.count += 1
+
+    def _split_point(self) -> int:
+        """Where to cut the buffer: the shallowest sibling boundary once the chunk
+        is at least half full, else the latest boundary, else everything."""
+        running, cumulative = 0, {}
+        for position, part in enumerate(self.parts):
+            cumulative[position] = running
+            running += part[1]
+        cumulative[len(self.parts)] = running
+        candidates = [(pos, depth) for pos, depth in self.boundaries if pos > 0]
+        if not candidates:
+            return len(self.parts)
+        full_enough = [(pos, depth) for pos, depth in candidates if cumulative[pos] >= self.max_tokens // 2]
+        if full_enough:
+            return min(full_enough, key=lambda b: (b[1], -b[0]))[0]
+        return candidates[-1][0]
+
+    def _flush(self, position: int = None) -> None:
+        position = len(self.parts) if position is None else position
+        self._emit(self.parts[:position])
+        self.parts = self.parts[position:]
+        self.tokens = sum(part[1] for part in self.parts)
+        self.boundaries = [(pos - position, depth) for pos, depth in self.boundaries if pos >= position]
+
+    def _mark_boundary(self) -> None:
+        self.boundaries.append((len(self.parts), len(self.stack)))
+
+    def _append(self, piece: str) -> None:
+        tokens = count_tokens(piece, self.model_name)
+        while self.parts and self.tokens + tokens > self.max_tokens:
+            self._flush(self._split_point())
+        self.parts.append((piece, tokens, len(self.stack), self._container()))
+        self.tokens += tokens
+
+    def _append_text(self, text: str) -> None:
+        """Text is the only thing that may be split, at token boundaries of a single encoding pass."""
+        for piece in split_by_tokens(text, self.max_tokens, self.model_name):
+            self._append(piece)
+
+    # --- HTMLParser callbacks -----------------------------------------
+
+    def _flush_text(self) -> None:
+        text = " ".join("".join(self.pending_text).split())
+        self.pending_text = []
+        if text:
+            self._append_text(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if self.skip_depth or tag in SKIP_TAGS:
+            if tag not in VOID_TAGS:
+                self.skip_depth += 1
+            return
+        siblings = self.stack[-1][2]
+        siblings[tag] += 1
+        # The start tag belongs to the parent's content, so a cut can land before it
+        self._mark_boundary()
+        self._append(self.get_starttag_text())
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, f"/{tag}[{siblings[tag]}]", Counter()))
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        if self.skip_depth or tag in SKIP_TAGS:
+            return
+        self.stack[-1][2][tag] += 1
+        self._mark_boundary()
+        self._append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if self.skip_depth:
+            if tag not in VOID_TAGS:
+                self.skip_depth -= 1
+            return
+        if tag in VOID_TAGS or all(open_tag != tag for open_tag, _, _ in self.stack):
+            return
+        # Close any unclosed children first (lenient, like a browser would)
+        while self.stack[-1][0] != tag:
+            self.stack.pop()
+        self._append(f"</{tag}>")
+        self.stack.pop()
+        self._mark_boundary()
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.pending_text.append(data)
+
+    def handle_entityref(self, name):
+        self.handle_data(f"&{name};")
+
+    def handle_charref(self, name):
+        self.handle_data(f"&#{name};")
+
+
+def _slices(text: str):
+    for i in range(0, len(text), FEED_SIZE):
+        yield text[i:i + FEED_SIZE]
+
+
+def iter_html_chunks(html, max_tokens: int, model_name: str = "gpt-4o-mini"):
+    """Stream chunks of at most max_tokens tokens, split on element boundaries.
+
+    html may be a string or any iterable of string pieces (e.g. a file read in
+    blocks), so a large page never has to be held as a list of substrings.
+    Yields dicts with "index", "text", "tokens" and "xpath" (the XPath prefix
+    shared by everything in the chunk). Only a single tag larger than the
+    budget on its own can produce an oversized chunk.
+    """
+    pieces = _slices(html) if isinstance(html, str) else html
+
+    parser = _ChunkingParser(max_tokens, model_name)
+    for piece in pieces:
+        parser.feed(piece)
+        while parser.ready:
+            yield parser.ready.popleft()
+    parser.close()
+    parser._flush_text()
+    parser._flush()
+    while parser.ready:
+        yield parser.ready.popleft()
@@ -0,0 +1,199 @@
+import asyncio
+import time
+import uuid
+from collections import Counter, deque
+
+from token_usage import summarize as summarize_usage
+
+TERMINAL = {"done", "failed", "cancelled"}
+
+
+class Job:
+    """One agent run: its instruction text, status and update stream.
+
+    Updates are kept (without frames, plus the latest frame) so a WebSocket
+    that attaches late still sees the whole run. Each subscriber has its own
+    bounded queue; a slow one loses its oldest updates, never the others'.
+    """
+
+    def __init__(self, instruction_text: str, tenant: str, subscriber_queue_size: int = 64):
+        self.id = uuid.uuid4().hex[:12]
+        self.instruction_text = instruction_text
+        self.tenant = tenant
+        self.status = "queued"
+        self.position = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.script = None
+        self.token_usage = []
+        self.task = None
+        self._updates = []
+        self._last_frame = None
+        self._subscribers = set()
+        self._queue_size = subscriber_queue_size
+
+    def publish(self, update: dict) -> None:
+        """Record an update and fan it out; must be called on the event loop. Never blocks."""
+        if "frame" in update:
+            self._last_frame = update
+            self._updates.append({key: value for key, value in update.items() if key != "frame"})
+        else:
+            self._updates.append(update)
+        for queue in self._subscribers:
+            _offer(queue, update)
+
+    def _end_stream(self) -> None:
+        for queue in self._subscribers:
+            _offer(queue, None)
+
+    async def subscribe(self):
+        """Every update so far (with the latest frame), then live ones until the job ends."""
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        backlog = list(self._updates)
+        if self._last_frame is not None:
+            backlog.append(self._last_frame)
+        if self.status in TERMINAL:
+            for update in backlog:
+                yield update
+            return
+        self._subscribers.add(queue)
+        try:
+            for update in backlog:
+                yield update
+            while True:
+                update = await queue.get()
+                if update is None:
+                    return
+                yield update
+        finally:
+            self._subscribers.discard(queue)
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "tenant": self.tenant,
+            "status": self.status,
+            "position": self.position,
+            "steps": sum(1 for update in self._updates if "step" in update),
+            "queued_s": round((self.started or time.time()) - self.created, 3),
+            "run_s": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            "error": self.error,
+            "script": self.script,
+            "token_usage": summarize_usage(self.token_usage),
+        }
+
+
+def _offer(queue: asyncio.Queue, item) -> None:
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+class JobManager:
+    """Admission control for agent runs.
+
+    At most `workers` jobs run at once, and at most `per_tenant` of them for
+    any one tenant; the rest wait in FIFO order, skipping over tenants that
+    are at their limit. `runner(job)` is a coroutine that performs the run,
+    publishes updates through job.publish and returns the generated script
+    lines. Cancelling a running job cancels that coroutine, which tears down
+    its browser before returning; the job's slot is freed only then.
+    """
+
+    def __init__(self, runner, workers: int = 4, per_tenant: int = 2, keep_finished: int = 200):
+        self._runner = runner
+        self.workers = workers
+        self.per_tenant = per_tenant
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self._pending = deque()
+        self._finished = deque()
+        self._running = Counter()
+        self.counts = Counter()
+
+    def submit(self, instruction_text: str, tenant: str = "default") -> Job:
+        job = Job(instruction_text, tenant)
+        self.jobs[job.id] = job
+        self._pending.append(job)
+        self.counts["submitted"] += 1
+        self._dispatch()
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """False if the job is unknown or already over."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in TERMINAL:
+            return False
+        if job.status == "queued":
+            self._pending.remove(job)
+            self._finish(job, "cancelled")
+            self._dispatch()
+        else:
+            job.task.cancel()
+        return True
+
+    def _dispatch(self) -> None:
+        for job in list(self._pending):
+            if sum(self._running.values()) >= self.workers:
+                break
+            if self._running[job.tenant] >= self.per_tenant:
+                continue
+            self._pending.remove(job)
+            self._running[job.tenant] += 1
+            job.status, job.position, job.started = "running", None, time.time()
+            job.publish({"job": job.id, "status": "running"})
+            job.task = asyncio.create_task(self._runner(job))
+            job.task.add_done_callback(lambda task, job=job: self._on_done(job, task))
+
+        for position, job in enumerate(self._pending, start=1):
+            if job.position != position:
+                job.position = position
+                job.publish({"job": job.id, "status": "queued", "position": position})
+
+    def _on_done(self, job: Job, task: asyncio.Task) -> None:
+        # A done callback rather than try/except in a wrapper: it also runs for a task cancelled before it started
+        if task.cancelled():
+            status = "cancelled"
+        elif task.exception() is not None:
+            job.error = str(task.exception())
+            status = "failed"
+        else:
+            commands = task.result()
+            job.script = "\n".join(commands) if commands else None
+            status = "done"
+        self._running[job.tenant] -= 1
+        self._finish(job, status)
+        self._dispatch()
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status, job.position, job.finished = status, None, time.time()
+        self.counts[status] += 1
+        job.publish({"job": job.id, "status": status, "error": job.error})
+        job._end_stream()
+        self._finished.append(job.id)
+        while len(self._finished) > self.keep_finished:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    async def close(self) -> None:
+        pending, self._pending = list(self._pending), deque()
+        for job in pending:
+            self._finish(job, "cancelled")
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "per_tenant": self.per_tenant,
+            "running": sum(self._running.values()),
+            "queued": len(self._pending),
+            "running_by_tenant": {tenant: n for tenant, n in self._running.items() if n},
+            **{status: self.counts[status] for status in ("submitted", "done", "failed", "cancelled")},
+        }
@@ -0,0 +1,55 @@
+import json
+
+
+class IncrementalObjectParser:
+    """Yield JSON objects from a streamed array as soon as each one closes.
+
+    Feed raw text chunks from an LLM stream; every object whose parent is an
+    array (e.g. each entry of {"instructions": [...]}) is returned by feed()
+    once its closing brace arrives. Text around the JSON, such as markdown
+    code fences, is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.start = None
+        self.start_depth = None
+
+    def feed(self, chunk: str) -> list:
+        """Consume a chunk and return the objects it completed."""
+        self.buffer += chunk
+        completed = []
+        text = self.buffer
+        for position in range(self.position, len(text)):
+            char = text[position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.stack:
+                self.in_string = True
+            elif char in "{[":
+                if char == "{" and self.start is None and self.stack and self.stack[-1] == "[":
+                    self.start = position
+                    self.start_depth = len(self.stack)
+                self.stack.append(char)
+            elif char in "}]" and self.stack:
+                self.stack.pop()
+                if self.start is not None and len(self.stack) == self.start_depth:
+                    completed.append(json.loads(text[self.start:position + 1]))
+                    self.start = None
+
+        # Keep only the object still being read
+        keep = self.start if self.start is not None else len(text)
+        self.buffer = text[keep:]
+        self.position = len(text) - keep
+        if self.start is not None:
+            self.start = 0
+        return completed
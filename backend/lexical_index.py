@@ -0,0 +1,67 @@
+import math
+import re
+from collections import Counter
+
+STOPWORDS = {
+    "a", "an", "the", "to", "of", "and", "or", "on", "in", "into", "with",
+    "for", "as", "at", "by", "is", "it", "this", "that", "then",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens, splitting camelCase and dropping stopwords."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a small, per-page set of chunks, built on the fly."""
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = []
+        for doc_id, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> list:
+        """BM25 score of every document for the query."""
+        scores = [0.0] * len(self)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in postings:
+                norm = 1 - self.b + self.b * self.lengths[doc_id] / (self.average_length or 1)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def search(self, query: str, top_k: int = 1) -> list:
+        """Top-k (score, doc_id) pairs, best first."""
+        ranked = sorted(enumerate(self.scores(query)), key=lambda item: item[1], reverse=True)
+        return [(score, doc_id) for doc_id, score in ranked[:top_k]]
+
+
+def is_clear_winner(scores: list, margin: float) -> bool:
+    """True when the best score beats the runner-up by at least `margin` times.
+
+    The best score must be positive: a chunk with no lexical overlap with the
+    query is never a winner, even when it is the only candidate.
+    """
+    ranked = sorted(scores, reverse=True)
+    if not ranked or ranked[0] <= 0:
+        return False
+    return len(ranked) == 1 or ranked[1] <= 0 or ranked[0] / ranked[1] >= margin
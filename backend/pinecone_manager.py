@@ -0,0 +1,188 @@
+import threading
+import time
+import uuid
+from pinecone import Pinecone, ServerlessSpec
+
+
+class PineconeManager:
+    """Process-wide Pinecone client and index handles.
+
+    The client is created once, and each index is looked up (or created) and
+    its dimension/metric validated the first time it is requested. Later
+    calls return the same handle without any control-plane round-trips.
+    Safe to share between threads.
+    """
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._client = None
+        self._indexes = {}
+        self._registries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> Pinecone:
+        with self._lock:
+            return self._get_client()
+
+    def _get_client(self) -> Pinecone:
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("Pinecone API key is not provided.")
+            try:
+                self._client = Pinecone(api_key=self.api_key)
+            except Exception as e:
+                raise ConnectionError(f"Failed to initialize Pinecone client: {e}")
+        return self._client
+
+    def get_index(self, index_name, dimension=1024, metric="cosine", cloud="aws", region="us-east-1"):
+        """Return the validated handle for index_name, creating the index if needed."""
+        handle = self._indexes.get(index_name)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            # Another thread may have validated it while we waited
+            if index_name in self._indexes:
+                return self._indexes[index_name]
+
+            pc = self._get_client()
+            if index_name in pc.list_indexes().names():
+                index_desc = pc.describe_index(index_name)
+                if index_desc.dimension != dimension or index_desc.metric != metric:
+                    raise RuntimeError(
+                        f"Existing index '{index_name}' has dimension={index_desc.dimension} and metric={index_desc.metric}, "
+                        f"but requested dimension={dimension} and metric={metric}."
+                    )
+            else:
+                try:
+                    pc.create_index(
+                        name=index_name,
+                        dimension=dimension,
+                        metric=metric,
+                        spec=ServerlessSpec(cloud=cloud, region=region)
+                    )
+                    while not pc.describe_index(index_name).status['ready']:
+                        time.sleep(1)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to create index '{index_name}': {e}")
+
+            handle = pc.Index(index_name)
+            self._indexes[index_name] = handle
+            return handle
+
+    def namespaces(self, index_name, ttl: float = 3600, sweep_interval: float = 300) -> "NamespaceRegistry":
+        """The namespace registry for index_name, with its GC thread running.
+
+        Each registry gets its own prefix, so its GC never deletes a namespace
+        another process is still using.
+        """
+        registry = self._registries.get(index_name)
+        if registry is None:
+            index = self.get_index(index_name)
+            prefix = f"doc-{uuid.uuid4().hex[:8]}-"
+            with self._lock:
+                registry = self._registries.setdefault(
+                    index_name, NamespaceRegistry(index, ttl, sweep_interval, prefix=prefix)
+                )
+            registry.start()
+        return registry
+
+    def reset(self) -> None:
+        """Forget cached handles (e.g. after the index was deleted out of band)."""
+        with self._lock:
+            for registry in self._registries.values():
+                registry.stop()
+            self._registries.clear()
+            self._indexes.clear()
+            self._client = None
+
+
+class NamespaceRegistry:
+    """Per-document namespaces in one index, with background TTL garbage collection.
+
+    The first caller to claim a namespace upserts the document; concurrent
+    callers for the same document wait for it, and later callers skip the
+    upsert. Namespaces idle for longer than ttl seconds are deleted by a
+    daemon thread, never on the request path. Only namespaces claimed
+    through this registry are collected; others in the index are left alone.
+    """
+
+    def __init__(self, index, ttl: float, sweep_interval: float, prefix: str = "doc-"):
+        self.index = index
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.prefix = prefix
+        self._last_used = {}
+        self._ready = {}
+        self._deleting = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._janitor = None
+
+    def claim(self, namespace: str) -> bool:
+        """Record a use of namespace. True means the caller must upsert it and
+        then call mark_ready (or release on failure)."""
+        while True:
+            with self._lock:
+                pending = self._deleting.get(namespace)
+                if pending is None:
+                    self._last_used[namespace] = time.time()
+                    event = self._ready.get(namespace)
+                    if event is None:
+                        self._ready[namespace] = threading.Event()
+                        return True
+                    if event.is_set():
+                        return False
+                    pending = event
+            # Wait for the upsert (or a GC delete) in flight, then re-check
+            pending.wait()
+
+    def mark_ready(self, namespace: str) -> None:
+        with self._lock:
+            self._ready[namespace].set()
+
+    def release(self, namespace: str) -> None:
+        """Give up a claim after a failed upsert so the next caller retries it."""
+        with self._lock:
+            event = self._ready.pop(namespace, None)
+        if event is not None:
+            event.set()
+
+    def sweep(self, now: float = None) -> list:
+        """Delete namespaces claimed here and idle for longer than the TTL; returns their names."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stale = [
+                namespace for namespace, last_used in self._last_used.items()
+                if now - last_used > self.ttl
+                and (namespace not in self._ready or self._ready[namespace].is_set())
+            ]
+            for namespace in stale:
+                del self._last_used[namespace]
+                self._ready.pop(namespace, None)
+                self._deleting[namespace] = threading.Event()
+
+        for namespace in stale:
+            try:
+                self.index.delete(delete_all=True, namespace=namespace)
+            except Exception as e:
+                print(f"Namespace GC failed to delete '{namespace}': {e}")
+            finally:
+                with self._lock:
+                    self._deleting.pop(namespace).set()
+        return stale
+
+    def start(self) -> None:
+        with self._lock:
+            if self._janitor is not None:
+                return
+            self._janitor = threading.Thread(target=self._run, name="pinecone-namespace-gc", daemon=True)
+            self._janitor.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "PLAN_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", ".cache", "plan_cache.sqlite"),
+)
+
+# Bump when the stored layout changes; older files are wiped on open
+CACHE_FORMAT_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and blank lines. Case is kept: unquoted fill values are case-sensitive."""
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class PlanCache:
+    """Planner output for instruction texts, stored in a sqlite file.
+
+    Entries are keyed by a hash of the normalized text, the planner's prompt
+    version and the model name, so editing a prompt or switching models never
+    serves a stale plan. Old entries are evicted least-recently-used beyond
+    `capacity`; callers invalidate plans whose run failed.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, capacity: int = 1000):
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != CACHE_FORMAT_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS plan_cache")
+            self._db.execute(f"PRAGMA user_version = {CACHE_FORMAT_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plan_cache ("
+            "key TEXT PRIMARY KEY, prompt_version TEXT NOT NULL, model_name TEXT NOT NULL, "
+            "plan TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(text: str, prompt_version: str, model_name: str) -> str:
+        raw = f"{normalize_text(text)}\x00{prompt_version}\x00{model_name}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, prompt_version: str, model_name: str):
+        """The cached {"instructions": [...]} plan, or None."""
+        key = self.make_key(text, prompt_version, model_name)
+        with self._lock:
+            row = self._db.execute("SELECT plan FROM plan_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE plan_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return json.loads(row[0])
+
+    def put(self, text: str, prompt_version: str, model_name: str, plan: dict) -> None:
+        key = self.make_key(text, prompt_version, model_name)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO plan_cache (key, prompt_version, model_name, plan, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, prompt_version, model_name, json.dumps(plan), time.time()),
+            )
+            overflow = self._db.execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0] - self.capacity
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM plan_cache WHERE key IN "
+                    "(SELECT key FROM plan_cache ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._db.commit()
+
+    def invalidate(self, text: str, prompt_version: str, model_name: str) -> None:
+        key = self.make_key(text, prompt_version, model_name)
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM plan_cache WHERE key = ?", (key,)).rowcount
+            self._db.commit()
+            self.invalidations += deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": self._db.execute("SELECT COUNT(*) FROM plan_cache").fetchone()[0],
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,148 @@
+import json
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+from models import model
+from task_mapper import extract_json_from_codeblock
+from json_stream import IncrementalObjectParser
+from token_usage import record, stream_usage
+import time
+
+# Bump whenever the prompt or the step normalization changes; cached plans are keyed by it
+PROMPT_VERSION = "2"
+
+PLANNER_TEMPLATE = """
+You are a helpful assistant that takes a block of natural language describing a web-based task, converts it into a list of individual, precise, and executable web automation steps, and classifies each step.
+
+Each step should:
+- Contain exactly one action (logging in with a username and a password is two fill steps and one click step).
+- Be described clearly in imperative form, quoting the exact target text and any value to type (e.g., "Enter 'pass1234' into the password field").
+- Be computationally digestible, without extra fluff or explanation.
+
+Classify each step as one of the following actions:
+   - page.goto
+   - page.fill
+   - page.click
+   - page.hover
+   - page.wait
+   - browser.close
+
+For each step also give:
+   - "waiting_time": the number of seconds to wait for page.wait steps, otherwise 0
+   - "url": the URL for page.goto steps, otherwise ""
+   - "value": the text to type for page.fill steps, otherwise ""
+
+Output JSON format:
+{{
+  "instructions": [
+    {{ "original instruction": STRING, "classification": STRING, "waiting_time": Float, "url": STRING, "value": STRING }},
+    ...
+  ]
+}}
+
+--- Task ---
+{instructions}
+"""
+
+
+def normalize_step(item: dict) -> dict:
+    """Fill in defaults so a step has every key run_agent reads.
+
+    A missing waiting_time stays None so run_agent applies its default wait.
+    """
+    return {
+        "original instruction": item.get("original instruction", ""),
+        "classification": item.get("classification"),
+        "waiting_time": item.get("waiting_time"),
+        "url": item.get("url") or "",
+        "value": item.get("value") or "",
+    }
+
+
+def normalize_plan(parsed: dict) -> dict:
+    return {"instructions": [normalize_step(item) for item in parsed.get("instructions", [])]}
+
+
+def build_chain(instructions: str, model):
+    prompt = PromptTemplate.from_template(PLANNER_TEMPLATE)
+    return (
+        {"instructions": RunnableLambda(lambda _: instructions)}
+        | prompt
+        | model
+    )
+
+
+def plan(instructions: str, model) -> tuple:
+    """Segment and classify NL input in a single LLM call.
+
+    Returns ({"instructions": [...]}, [TokenUsage]): the same plan shape as
+    task_mapper.classify, with the extracted "url" and "value" added to each
+    step, and the call's token usage.
+    """
+    start = time.perf_counter()
+    raw_output = build_chain(instructions, model).invoke({})
+    usage = record("plan", model, raw_output.usage_metadata, time.perf_counter() - start)
+    return normalize_plan(extract_json_from_codeblock(raw_output.content.strip())), [usage]
+
+
+def plan_stream(instructions: str, model):
+    """Like plan(), but yield each step as soon as the model finishes writing it.
+
+    The call's TokenUsage is yielded last, after the final step.
+    """
+    parser = IncrementalObjectParser()
+    raw_output = ""
+    streamed = 0
+    chunks_usage = []
+    start = time.perf_counter()
+    for chunk in build_chain(instructions, model).stream({}):
+        raw_output += chunk.content
+        chunks_usage.append(chunk.usage_metadata)
+        for item in parser.feed(chunk.content):
+            streamed += 1
+            yield normalize_step(item)
+    # Latency covers the whole stream, including time the consumer spent between steps
+    usage = record("plan", model, stream_usage(chunks_usage), time.perf_counter() - start)
+
+    if not streamed:
+        # Nothing recognisable arrived incrementally; parse the whole reply
+        yield from normalize_plan(extract_json_from_codeblock(raw_output.strip()))["instructions"]
+    yield usage
+
+
+async def aplan(instructions: str, model) -> tuple:
+    """Async plan(): awaits the model with ainvoke."""
+    start = time.perf_counter()
+    raw_output = await build_chain(instructions, model).ainvoke({})
+    usage = record("plan", model, raw_output.usage_metadata, time.perf_counter() - start)
+    return normalize_plan(extract_json_from_codeblock(raw_output.content.strip())), [usage]
+
+
+async def aplan_stream(instructions: str, model):
+    """Async plan_stream(): yields each step as soon as it is complete, then the call's TokenUsage."""
+    parser = IncrementalObjectParser()
+    raw_output = ""
+    streamed = 0
+    chunks_usage = []
+    start = time.perf_counter()
+    async for chunk in build_chain(instructions, model).astream({}):
+        raw_output += chunk.content
+        chunks_usage.append(chunk.usage_metadata)
+        for item in parser.feed(chunk.content):
+            streamed += 1
+            yield normalize_step(item)
+    usage = record("plan", model, stream_usage(chunks_usage), time.perf_counter() - start)
+
+    if not streamed:
+        for item in normalize_plan(extract_json_from_codeblock(raw_output.strip()))["instructions"]:
+            yield item
+    yield usage
+
+
+if __name__ == "__main__":
+    instruction = """
+open localhost:5173 and then login with user name as `mehdi.mirzapour@gmail.com` and password  as `pass1234`
+open localhost:5173/items and click on add items.
+"""
+    output, _ = plan(instruction, model)
+    print("\nOriginal Instruction:\n", instruction.strip())
+    print("\nPlan:\n", json.dumps(output, indent=2))
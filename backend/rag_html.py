@@ -1,150 +1,277 @@
 import os
 from dotenv import load_dotenv
-from llama_index.core import Document, VectorStoreIndex, Settings
+from llama_index.core import Settings
+from llama_index.core.vector_stores import VectorStoreQuery
+from llama_index.core.schema import TextNode, MetadataMode
 from llama_index.embeddings.mistralai import MistralAIEmbedding
 from llama_index.vector_stores.pinecone import PineconeVectorStore
-from pinecone import Pinecone, ServerlessSpec
+from pinecone_manager import PineconeManager
+from html_chunker import iter_html_chunks
+from vector_index import NumpyVectorIndex
+from embedding_cache import EmbeddingCache
+from lexical_index import BM25Index, is_clear_winner
+import threading
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 load_dotenv()
 mistral_api_key = os.getenv("MISTRAL_API_KEY")
 pinecone_api_key = os.getenv("PINECONE_API_KEY")
 max_token_limitation = int(os.getenv("MAX_TOKEN_LIMITATION", 12000))  # Default to 12000 if not set
+vector_backend = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone" or "numpy"
+# "embedding", "lexical" (BM25 only, no API calls) or "auto" (BM25 first,
+# embeddings only when the lexical ranking is ambiguous)
+retrieval_mode = os.getenv("RETRIEVAL_MODE", "auto")
+lexical_margin = float(os.getenv("LEXICAL_MARGIN", 1.5))  # best/runner-up BM25 ratio that counts as clear
+namespace_ttl = float(os.getenv("PINECONE_NAMESPACE_TTL", 3600))  # seconds a page's namespace may sit idle
+namespace_sweep_interval = float(os.getenv("PINECONE_GC_INTERVAL", 300))
 
 # Validate environment variables
-if not mistral_api_key:
+if retrieval_mode != "lexical" and not mistral_api_key:
     raise ValueError("MISTRAL_API_KEY not set in environment.")
-if not pinecone_api_key:
+if retrieval_mode != "lexical" and vector_backend == "pinecone" and not pinecone_api_key:
     raise ValueError("PINECONE_API_KEY not set in environment.")
 
-def initialize_pinecone(index_name, dimension=1024, metric="cosine", cloud="aws", region="us-east-1", namespace="default"):
-    if not pinecone_api_key:
-        raise ValueError("Pinecone API key is not provided.")
-
-    try:
-        pc = Pinecone(api_key=pinecone_api_key)
-    except Exception as e:
-        raise ConnectionError(f"Failed to initialize Pinecone client: {e}")
-
-    if index_name in pc.list_indexes().names():
-        index = pc.Index(index_name)
-        
-        # Check index configuration
-        index_desc = pc.describe_index(index_name)
-        if index_desc.dimension != dimension or index_desc.metric != metric:
-            raise RuntimeError(
-                f"Existing index '{index_name}' has dimension={index_desc.dimension} and metric={index_desc.metric}, "
-                f"but requested dimension={dimension} and metric={metric}."
-            )
-
-        # Check if namespace is empty
-        try:
-            stats = index.describe_index_stats()
-            namespace_stats = stats.get("namespaces", {}).get(namespace, {})
-            vector_count = namespace_stats.get("vector_count", 0)
-
-            if vector_count > 0:
-                print(f"Namespace '{namespace}' has {vector_count} vectors — deleting...")
-                index.delete(delete_all=True, namespace=namespace)
-            else:
-                print(f"Namespace '{namespace}' is already empty. No delete needed.")
-        except Exception as e:
-            raise RuntimeError(f"Failed to check or clear vectors in index '{index_name}': {e}")
-    else:
-        try:
-            pc.create_index(
-                name=index_name,
-                dimension=dimension,
-                metric=metric,
-                spec=ServerlessSpec(cloud=cloud, region=region)
-            )
-            while not pc.describe_index(index_name).status['ready']:
-                time.sleep(1)
-        except Exception as e:
-            raise RuntimeError(f"Failed to create index '{index_name}': {e}")
-
-    return pc.Index(index_name)
-
-# Chunk HTML at character level
-def chunk_html(html_content, chunk_size):
-    chunks = []
-    for i in range(0, len(html_content), chunk_size):
-        chunk = html_content[i:i + chunk_size]
-        chunks.append(chunk)
-    return chunks
-
-# Find most similar chunk
-def find_similar_chunk(html_content, query, chunk_size= max_token_limitation, index_name="default-index"):
-    # Set Mistral AI embedding model (calls Mistral API)
-    Settings.embed_model = MistralAIEmbedding(
-        model_name="mistral-embed",
-        api_key=mistral_api_key
-    )
-    
-    # Disable LLM since it's not needed for similarity search
-    Settings.llm = None
-  
-    
-    # Initialize Pinecone
-    pinecone_index = initialize_pinecone(index_name)
-    
-    # Create vector store
-    vector_store = PineconeVectorStore(pinecone_index=pinecone_index)
-    
-    # Chunk the HTML
-    chunks = chunk_html(html_content, chunk_size)
+embedding_cache = EmbeddingCache()
+
+pinecone_manager = PineconeManager(pinecone_api_key)
+
+_embed_model = None
+_embed_model_lock = threading.Lock()
+
+# One Mistral embedding client for the whole process, installed into Settings once
+def get_embed_model():
+    global _embed_model
+    if _embed_model is None:
+        with _embed_model_lock:
+            if _embed_model is None:
+                _embed_model = MistralAIEmbedding(
+                    model_name="mistral-embed",
+                    api_key=mistral_api_key
+                )
+                Settings.embed_model = _embed_model
+                # Disable LLM since it's not needed for similarity search
+                Settings.llm = None
+    return _embed_model
+
+# Validate the Pinecone index and build the embedding client ahead of the first query
+def warm_up(index_name=os.getenv("PINECONE_INDEX_NAME")):
+    if retrieval_mode == "lexical":
+        return
+    get_embed_model()
+    if vector_backend == "pinecone":
+        pinecone_manager.get_index(index_name)
+
+# Chunk the HTML on element boundaries; nodes are built directly so the
+# index does not re-split them with its own sentence splitter
+def build_nodes(html_content, chunk_size):
+    return [
+        TextNode(
+            text=chunk["text"],
+            metadata={"chunk_index": chunk["index"], "xpath": chunk["xpath"], "tokens": chunk["tokens"]},
+            excluded_embed_metadata_keys=["chunk_index", "xpath", "tokens"],
+        )
+        for chunk in iter_html_chunks(html_content, chunk_size)
+    ]
+
+# Fill node.embedding, sending only chunks missing from the cache to the API.
+def embed_nodes(nodes, embed_model):
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    embeddings = embedding_cache.embed(texts, embed_model.model_name, embed_model.get_text_embedding_batch)
+    for node, embedding in zip(nodes, embeddings):
+        node.embedding = embedding
+    return nodes
+
+# Embed every query in one batched request (mistral-embed uses the same
+# embedding for queries and documents, so the chunk cache serves both)
+def embed_queries(queries, embed_model):
+    return embedding_cache.embed(list(queries), embed_model.model_name, embed_model.get_text_embedding_batch)
+
+# Identity of a chunked page: same HTML, chunking and embedding model -> same vectors
+def document_id(html_content, chunk_size, model_name="mistral-embed"):
+    return hashlib.sha256(f"{model_name}\x00{chunk_size}\x00{html_content}".encode("utf-8")).hexdigest()[:32]
+
+class PineconeBackend:
+    """Upserts each page into its own Pinecone namespace and queries it remotely.
+
+    Namespaces are derived from the page's content hash, so concurrent
+    requests never touch each other's vectors and a page that is already
+    indexed is queried without upserting again.
+    """
+    name = "pinecone"
+
+    def __init__(self, index_name):
+        self.index_name = index_name
+
+    def search(self, nodes, query_embeddings, top_k=1, document_id=None):
+        pinecone_index = pinecone_manager.get_index(self.index_name)
+        registry = pinecone_manager.namespaces(self.index_name, namespace_ttl, namespace_sweep_interval)
+        namespace = f"{registry.prefix}{document_id}"
+        vector_store = PineconeVectorStore(pinecone_index=pinecone_index, namespace=namespace)
+
+        if registry.claim(namespace):
+            try:
+                # Stable ids make a repeat upsert (e.g. after a restart) idempotent
+                for node in nodes:
+                    node.id_ = f"{namespace}-{node.metadata['chunk_index']}"
+                # Nodes already carry their embeddings, so upsert them as-is
+                if nodes:
+                    vector_store.add(nodes)
+            except Exception:
+                registry.release(namespace)
+                raise
+            registry.mark_ready(namespace)
+        else:
+            print(f"Namespace '{namespace}' already indexed. Skipping upsert.")
+
+        def query(embedding):
+            result = vector_store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=top_k))
+            return list(zip(result.similarities or [], result.nodes or []))
+
+        if len(query_embeddings) <= 1:
+            return [query(embedding) for embedding in query_embeddings]
+        # One round-trip per query, issued concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(query_embeddings))) as pool:
+            return list(pool.map(query, query_embeddings))
+
+class NumpyBackend:
+    """Ranks the page's embedded chunks in-process; no vector DB round-trips."""
+    name = "numpy"
+
+    def __init__(self, index_name=None):
+        self.index_name = index_name
+
+    def search(self, nodes, query_embeddings, top_k=1, document_id=None):
+        if not nodes:
+            return [[] for _ in query_embeddings]
+        embeddings = [node.embedding for node in nodes]
+        index = NumpyVectorIndex(len(embeddings[0]), capacity=len(nodes))
+        index.add(embeddings, nodes)
+        return index.query_many(query_embeddings, top_k)
+
+VECTOR_BACKENDS = {backend.name: backend for backend in (PineconeBackend, NumpyBackend)}
+
+def get_vector_backend(name=None, index_name=None):
+    name = name or vector_backend
+    if name not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{name}', expected one of {sorted(VECTOR_BACKENDS)}.")
+    return VECTOR_BACKENDS[name](index_name)
+
+def _match(node, score, retrieval):
+    return {
+        "chunk_index": node.metadata["chunk_index"],
+        "chunk_xpath": node.metadata["xpath"],
+        "chunk": node.text,
+        "similarity_score": score,
+        "retrieval": retrieval,
+    }
+
+# Find the most similar chunk(s) for each of several queries over one page.
+# The page is chunked once. In "lexical"/"auto" mode queries are ranked with
+# BM25 first; the page and the remaining queries are embedded (once, in one
+# batch) only for queries that still need the embedding path.
+def find_similar_chunks(html_content, queries, chunk_size= max_token_limitation, index_name="default-index", backend=None, top_k=1, mode=None):
+    mode = mode or retrieval_mode
+    if mode not in ("embedding", "lexical", "auto"):
+        raise ValueError(f"Unknown retrieval mode '{mode}', expected 'embedding', 'lexical' or 'auto'.")
+    nodes = build_nodes(html_content, chunk_size)
+    results = [{"query": query, "matches": []} for query in queries]
     
-    # Create documents from chunks
-    documents = [Document(text=chunk, metadata={"chunk_index": i}) for i, chunk in enumerate(chunks)]
+    pending = list(range(len(queries)))
+    if mode != "embedding" and nodes:
+        lexical = BM25Index([node.text for node in nodes])
+        pending = []
+        for i, query in enumerate(queries):
+            scores = lexical.scores(query)
+            if mode == "lexical" or is_clear_winner(scores, lexical_margin):
+                ranked = sorted(range(len(nodes)), key=lambda j: scores[j], reverse=True)[:top_k]
+                results[i]["matches"] = [_match(nodes[j], scores[j], "lexical") for j in ranked]
+            else:
+                pending.append(i)
     
-    # Create index
-    index = VectorStoreIndex.from_documents(
-        documents,
-        vector_store=vector_store,
-        show_progress=True
-    )
+    if pending and nodes:
+        # Mistral AI embedding model (calls Mistral API), shared across queries
+        embed_model = get_embed_model()
+        embed_nodes(nodes, embed_model)
+        query_embeddings = embed_queries([queries[i] for i in pending], embed_model)
+        per_query = get_vector_backend(backend, index_name).search(
+            nodes, query_embeddings, top_k=top_k, document_id=document_id(html_content, chunk_size, embed_model.model_name)
+        )
+        for i, matches in zip(pending, per_query):
+            results[i]["matches"] = [_match(node, score, "embedding") for score, node in matches]
     
-    # Query the index
-    query_engine = index.as_query_engine(similarity_top_k=1)
-    response = query_engine.query(query)
+    return {"total_chunks": len(nodes), "results": results}
+
+# Find most similar chunk (chunk_size is a token budget per chunk)
+def find_similar_chunk(html_content, query, chunk_size= max_token_limitation, index_name="default-index", backend=None, mode=None):
+    batch = find_similar_chunks(html_content, [query], chunk_size, index_name, backend, mode=mode)
+    matches = batch["results"][0]["matches"]
     
     # Get the most similar chunk
-    if response.source_nodes:
-        best_chunk = response.source_nodes[0].text
-        chunk_index = response.source_nodes[0].metadata["chunk_index"]
-        similarity_score = response.source_nodes[0].score
+    if matches:
+        best = matches[0]
+        best_chunk = best["chunk"]
+        chunk_index = best["chunk_index"]
+        chunk_xpath = best["chunk_xpath"]
+        similarity_score = best["similarity_score"]
+        retrieval = best["retrieval"]
     else: 
         best_chunk = ""
         chunk_index = -1
+        chunk_xpath = ""
         similarity_score = 0.0
+        retrieval = None
     
     return {
-        "total_chunks": len(chunks),
+        "total_chunks": batch["total_chunks"],
         "selected_chunk_index": chunk_index,
+        "selected_chunk_xpath": chunk_xpath,
         "selected_chunk": best_chunk,
-        "similarity_score": similarity_score
+        "similarity_score": similarity_score,
+        "retrieval": retrieval
     }
 
 # Main function to process HTML and query
-def process_html_query(html_content, query, chunk_size=max_token_limitation*3, index_name=os.getenv("PINECONE_INDEX_NAME")
+def process_html_query(html_content, query, chunk_size=max_token_limitation, index_name=os.getenv("PINECONE_INDEX_NAME"), backend=None, mode=None
 ):
     # if len(html_content) < (max_token_limitation*2.5) :
     #   return html_content
-    result = find_similar_chunk(html_content, query, chunk_size, index_name)
+    result = find_similar_chunk(html_content, query, chunk_size, index_name, backend, mode)
     
     output = f"""Number of chunks created: {result['total_chunks']}
 Selected chunk index: {result['selected_chunk_index']}
+Selected chunk XPath: {result['selected_chunk_xpath']}
 Similarity score: {result['similarity_score']:.4f}
+Retrieval: {result['retrieval']}
+Embedding cache: {embedding_cache.stats()}
 """
 
     print(output)
     return result['selected_chunk']
 
+# Batch variant: one page, many queries (e.g. consecutive page.fill steps on a form).
+# Returns the best chunk for each query, in order.
+def process_html_queries(html_content, queries, chunk_size=max_token_limitation, index_name=os.getenv("PINECONE_INDEX_NAME"), backend=None, top_k=1, mode=None
+):
+    batch = find_similar_chunks(html_content, queries, chunk_size, index_name, backend, top_k, mode)
+    
+    print(f"Number of chunks created: {batch['total_chunks']}")
+    for result in batch["results"]:
+        best = result["matches"][0] if result["matches"] else None
+        if best:
+            print(f"{result['query']!r} -> chunk {best['chunk_index']} ({best['chunk_xpath']}), {best['retrieval']} score {best['similarity_score']:.4f}")
+        else:
+            print(f"{result['query']!r} -> no match")
+    print(f"Embedding cache: {embedding_cache.stats()}")
+    
+    return [result["matches"][0]["chunk"] if result["matches"] else "" for result in batch["results"]]
+
 # Example usage
 if __name__ == "__main__":
     # Example inputs
     html_content = "<html><body><h1>Example HTML</h1><p>This is a very long HTML content...</p></body></html>"  # Replace with your HTML
-    chunk_size = 12000
+    chunk_size = 12000  # tokens
     query = "example query text"
 
     # Process and print results
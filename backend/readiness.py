@@ -0,0 +1,143 @@
+import inspect
+import os
+import time
+from collections import Counter
+
+# "adaptive": wait on real page signals; "fixed": the old fixed sleeps
+READINESS_MODE = os.getenv("READINESS_MODE", "adaptive")
+# Upper bound for one adaptive wait, in ms; callers' budgets are capped at it
+READINESS_CEILING_MS = int(os.getenv("READINESS_CEILING_MS", 5000))
+# How long the DOM must go without mutations to count as settled, in ms
+READINESS_QUIET_MS = int(os.getenv("READINESS_QUIET_MS", 300))
+
+# Resolves once the DOM has been mutation-free for quietMs, or after timeoutMs
+QUIET_DOM_JS = """([quietMs, timeoutMs]) => new Promise(resolve => {
+    const start = performance.now();
+    let timer = null, ceiling = null;
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(finish, quietMs); });
+    function finish() { observer.disconnect(); clearTimeout(timer); clearTimeout(ceiling); resolve(performance.now() - start); }
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(finish, quietMs);
+    ceiling = setTimeout(finish, timeoutMs);
+})"""
+
+# Emitted at the top of generated scripts so they settle the same way
+SCRIPT_HELPER = [
+    f"QUIET_DOM_JS = {QUIET_DOM_JS!r}",
+    "",
+    f"def settle(page, ceiling={READINESS_CEILING_MS}, quiet={READINESS_QUIET_MS}):",
+    "    try:",
+    "        page.wait_for_load_state('networkidle', timeout=ceiling)",
+    "        page.evaluate(QUIET_DOM_JS, [quiet, ceiling])",
+    "    except Exception:",
+    "        pass",
+    "",
+]
+
+
+class ReadinessReport:
+    """How long readiness waits took compared to the fixed sleeps they replace."""
+
+    def __init__(self):
+        self.waits = 0
+        self.budget_ms = 0.0
+        self.waited_ms = 0.0
+        self.signals = Counter()
+
+    def record(self, budget_ms: float, waited_ms: float, signal: str) -> None:
+        self.waits += 1
+        self.budget_ms += budget_ms
+        self.waited_ms += waited_ms
+        self.signals[signal] += 1
+
+    @property
+    def saved_ms(self) -> float:
+        return self.budget_ms - self.waited_ms
+
+    def summary(self) -> dict:
+        return {
+            "waits": self.waits,
+            "fixed_s": round(self.budget_ms / 1000, 2),
+            "waited_s": round(self.waited_ms / 1000, 2),
+            "saved_s": round(self.saved_ms / 1000, 2),
+            "signals": dict(self.signals),
+        }
+
+
+def _remaining(start: float, budget_ms: float) -> float:
+    return max(0.0, budget_ms - (time.perf_counter() - start) * 1000)
+
+
+def settle(page, budget_ms: float = None, report: ReadinessReport = None, xpath: str = None) -> float:
+    """Wait until the page is ready for the next step; returns the ms waited.
+
+    Waits, within budget_ms in total, for the load state, network idle and a
+    MutationObserver quiet window, then for xpath (if given) to be visible.
+    xpath may also be a callable, asked once the DOM is quiet, that returns
+    the next step's target or None (e.g. a finished look-ahead resolution).
+    The adaptive wait never exceeds READINESS_CEILING_MS; in "fixed" mode it
+    sleeps for the whole budget like before.
+    """
+    budget_ms = READINESS_CEILING_MS if budget_ms is None else budget_ms
+    start = time.perf_counter()
+    if READINESS_MODE == "fixed":
+        page.wait_for_timeout(budget_ms)
+        signal = "fixed"
+    else:
+        limit_ms = min(budget_ms, READINESS_CEILING_MS)
+        signal = "quiet"
+        try:
+            page.wait_for_load_state("load", timeout=_remaining(start, limit_ms) or 1)
+            page.wait_for_load_state("networkidle", timeout=_remaining(start, limit_ms) or 1)
+            page.evaluate(QUIET_DOM_JS, [READINESS_QUIET_MS, _remaining(start, limit_ms)])
+            target = xpath() if callable(xpath) else xpath
+            if target:
+                page.locator(target).first.wait_for(state="visible", timeout=_remaining(start, limit_ms) or 1)
+                signal = "actionable"
+        except Exception:
+            signal = "ceiling"
+            if _remaining(start, limit_ms):
+                # A navigation replaced the document mid-check: wait for the new one instead
+                signal = "navigation"
+                try:
+                    page.wait_for_load_state("load", timeout=_remaining(start, limit_ms) or 1)
+                except Exception:
+                    pass
+    waited_ms = (time.perf_counter() - start) * 1000
+    if report is not None:
+        report.record(budget_ms, waited_ms, signal)
+    return waited_ms
+
+
+async def asettle(page, budget_ms: float = None, report: ReadinessReport = None, xpath: str = None) -> float:
+    """settle() for an async Playwright page; a callable xpath may return an awaitable."""
+    budget_ms = READINESS_CEILING_MS if budget_ms is None else budget_ms
+    start = time.perf_counter()
+    if READINESS_MODE == "fixed":
+        await page.wait_for_timeout(budget_ms)
+        signal = "fixed"
+    else:
+        limit_ms = min(budget_ms, READINESS_CEILING_MS)
+        signal = "quiet"
+        try:
+            await page.wait_for_load_state("load", timeout=_remaining(start, limit_ms) or 1)
+            await page.wait_for_load_state("networkidle", timeout=_remaining(start, limit_ms) or 1)
+            await page.evaluate(QUIET_DOM_JS, [READINESS_QUIET_MS, _remaining(start, limit_ms)])
+            target = xpath() if callable(xpath) else xpath
+            if inspect.isawaitable(target):
+                target = await target
+            if target:
+                await page.locator(target).first.wait_for(state="visible", timeout=_remaining(start, limit_ms) or 1)
+                signal = "actionable"
+        except Exception:
+            signal = "ceiling"
+            if _remaining(start, limit_ms):
+                signal = "navigation"
+                try:
+                    await page.wait_for_load_state("load", timeout=_remaining(start, limit_ms) or 1)
+                except Exception:
+                    pass
+    waited_ms = (time.perf_counter() - start) * 1000
+    if report is not None:
+        report.record(budget_ms, waited_ms, signal)
+    return waited_ms
@@ -0,0 +1,180 @@
+"""Replay a compiled plan: run stored actions and XPaths directly, no planner and no LLM.
+
+A step whose XPath no longer matches exactly one element is re-resolved
+with extract_xpath_pattern against the live page; the compiled plan is then
+patched so the next replay is LLM-free again.
+
+    python backend/replay.py resources/test_cases/1.txt
+"""
+import argparse
+import time
+from collections import Counter
+from contextlib import ExitStack
+from playwright.sync_api import sync_playwright
+
+from agentic_app import (
+    hover_commands, log, model, matches_once, run_agent, save_artifacts, screenshot_update, script_header,
+    settle_command,
+)
+from frame_stream import capture_options
+from compiled_plan import compiled_path, load_compiled
+from readiness import ReadinessReport, settle
+from token_usage import summarize as summarize_usage
+from xpath_extractor import extract_xpath_pattern
+
+LOCATOR_STEPS = {"page.fill", "page.click", "page.hover"}
+
+
+def heal_step(step: dict, page, usage: list = None) -> dict:
+    """Re-resolve one step's locator with the LLM and patch it in place.
+
+    Raises RuntimeError, leaving the step as it was, when the new XPath does
+    not match exactly one element: acting on it could hit the wrong node.
+    """
+    result, calls = extract_xpath_pattern(step["original instruction"], page.content(), model)
+    if usage is not None:
+        usage.extend(calls)
+    if not matches_once(page, result["xpath"]):
+        raise RuntimeError(f"Could not heal '{step['original instruction']}': {result['xpath']} "
+                           "does not match exactly one element")
+    log.info(f"🩹 Healed '{step['original instruction']}': {step['xpath']} -> {result['xpath']}")
+    step["xpath"] = result["xpath"]
+    if step["classification"] == "page.fill" and not step["fill"]:
+        step["fill"] = result.get("fill") or ""
+    return step
+
+
+def wait_ms(step: dict) -> float:
+    """The wait run_agent did for this step: its waiting_time, or 5 s when it had none."""
+    waiting_time = step["waiting_time"]
+    return (5 if waiting_time is None else waiting_time) * 1000
+
+
+def perform(step: dict, page, readiness: ReadinessReport) -> None:
+    locator = page.locator(step["xpath"])
+    if step["classification"] == "page.fill":
+        locator.fill(step["fill"])
+    elif step["classification"] == "page.click":
+        locator.click()
+        settle(page, 5000, readiness)
+    elif step["classification"] == "page.hover":
+        # Same as run_agent: move the mouse to the element's centre, then click it
+        box = locator.bounding_box()
+        if box:
+            page.mouse.move(box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)
+            locator.click()
+            settle(page, 3000, readiness)
+
+
+def replay(steps: list, callback=None, headless: bool = False, context=None):
+    """Run compiled steps; returns (steps, stats). Healed steps are patched in the returned list.
+
+    context: a BrowserContext to use instead of launching a browser, as in run_agent
+    """
+    started = time.perf_counter()
+    readiness = ReadinessReport()
+    stats = Counter(steps=len(steps))
+    usage = []
+
+    with ExitStack() as stack:
+        if context is None:
+            p = stack.enter_context(sync_playwright())
+            browser = p.chromium.launch(headless=headless)
+        else:
+            browser = context
+        page = browser.new_page()
+
+        for i, step in enumerate(steps):
+            classification = step["classification"]
+            log.info(f"▶️ {classification}: {step['original instruction']}")
+
+            if classification == "page.goto":
+                page.goto(step["url"])
+
+            elif classification in LOCATOR_STEPS:
+                if not matches_once(page, step["xpath"]):
+                    # Give the target a moment to render before declaring the locator broken
+                    settle(page, 5000, readiness, xpath=step["xpath"])
+                if not matches_once(page, step["xpath"]):
+                    heal_step(step, page, usage)
+                    stats["healed"] += 1
+                try:
+                    perform(step, page, readiness)
+                except Exception as e:
+                    # Matched but not actionable (covered, detached, ...): heal once more and retry
+                    log.warning(f"Replayed action failed ({e}); re-resolving")
+                    heal_step(step, page, usage)
+                    stats["healed"] += 1
+                    perform(step, page, readiness)
+
+            elif classification == "page.wait":
+                page.wait_for_timeout(wait_ms(step))
+
+            elif classification == "browser.close":
+                try:
+                    screenshot_bytes = page.screenshot(timeout=5000, **capture_options())
+                    if callback:
+                        callback(screenshot_update(i, step["original instruction"], classification, screenshot_bytes))
+                except Exception as e:
+                    log.warning(f"Failed to capture screenshot: {e}")
+                browser.close()
+                continue
+
+            try:
+                screenshot_bytes = page.screenshot(timeout=5000, **capture_options())
+                if callback:
+                    callback(screenshot_update(i, step["original instruction"], classification, screenshot_bytes))
+            except Exception as e:
+                log.warning(f"Failed to capture screenshot: {e}")
+
+    stats["llm_calls"] = stats["healed"]
+    log.info(f"⏱️ Replay finished after {time.perf_counter() - started:.2f}s — {dict(stats)}")
+    log.info(f"⏳ Readiness: {readiness.summary()}")
+    if usage:
+        log.info(f"🪙 LLM usage by stage: {summarize_usage(usage)}")
+    return steps, dict(stats)
+
+
+def script_from_steps(steps: list) -> list:
+    """The Playwright script for compiled steps, in the same shape run_agent writes."""
+    page_commands = script_header()
+    for step in steps:
+        classification, xpath = step["classification"], step["xpath"]
+        if classification == "page.goto":
+            page_commands.append(f"    page.goto({repr(step['url'])})")
+        elif classification == "page.fill":
+            page_commands.append(f"    page.locator({repr(xpath)}).fill({repr(step['fill'])})")
+        elif classification == "page.click":
+            page_commands.append(f"    page.locator({repr(xpath)}).click()")
+            page_commands.append(settle_command(5000))
+        elif classification == "page.hover":
+            page_commands.extend(hover_commands(xpath))
+        elif classification == "page.wait":
+            page_commands.append(f"    page.wait_for_timeout({wait_ms(step)})")
+        elif classification == "browser.close":
+            page_commands.append("    browser.close()")
+    if not any("browser.close()" in cmd for cmd in page_commands):
+        page_commands.append("    browser.close()")
+    return page_commands
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the compiled plan of an instruction file.")
+    parser.add_argument("instruction_file", help="Path to the instruction text file.")
+    args = parser.parse_args()
+
+    plan_path = compiled_path(args.instruction_file)
+    steps = load_compiled(plan_path)
+    if steps is None:
+        # Nothing compiled yet: run the full pipeline once and keep what it resolved
+        log.info(f"📄 No compiled plan at {plan_path}; compiling from {args.instruction_file}")
+        with open(args.instruction_file, "r") as f:
+            instruction = f.read().strip()
+        steps = []
+        page_commands = run_agent(instruction, compiled_steps=steps)
+        save_artifacts(args.instruction_file, page_commands, steps)
+    else:
+        steps, stats = replay(steps)
+        if stats.get("healed"):
+            log.info(f"🩹 Patched {stats['healed']} step(s) of {plan_path}")
+            save_artifacts(args.instruction_file, script_from_steps(steps), steps)
@@ -0,0 +1,88 @@
+import re
+from utils import extract_url
+
+# Bump whenever a rule changes what a line classifies as; two-call plans are cached by it
+RULES_VERSION = "2"
+
+# Bullets and numbering in front of a step ("- ", "3. ", "2) ")
+LEADING_MARKERS = r"^[\s\-*•\d.)]*"
+
+GOTO_PATTERN = re.compile(LEADING_MARKERS + r"(?:\w+ly\s+)?(?:navigate|go|open|visit|load|browse)\b", re.I)
+WAIT_PATTERN = re.compile(LEADING_MARKERS + r"(?:wait|pause|sleep)\b", re.I)
+CLOSE_PATTERN = re.compile(
+    LEADING_MARKERS + r"(?:close|exit|quit)\s+(?:the\s+)?(?:browser|window)\W*$", re.I
+)
+
+# Any of these next to a URL means the line does more than navigate
+OTHER_ACTIONS = re.compile(
+    r"\b(?:and|then|click|press|tap|fill|enter|type|input|select|hover|log\s*in|sign\s*in|submit|wait)\b", re.I
+)
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+DURATION = re.compile(
+    rf"\b(\d+(?:\.\d+)?|{'|'.join(NUMBER_WORDS)})\s+(?:more\s+|extra\s+)?"
+    r"(ms|milliseconds?|s|secs?|seconds?|mins?|minutes?)\b",
+    re.I,
+)
+# "half a minute", "a quarter of an hour": the number word alone would misread these
+FRACTIONS = re.compile(r"\b(?:half|quarter|third|fifth|tenth)s?\b", re.I)
+UNIT_SECONDS = {"ms": 0.001, "millisecond": 0.001, "s": 1, "sec": 1, "second": 1, "min": 60, "minute": 60}
+
+
+def parse_waiting_time(text: str):
+    """Seconds named in a wait step ("Wait 1 more second" -> 1.0), or None.
+
+    Fractional amounts ("half a minute") are not parsed and give None.
+    """
+    match = DURATION.search(text)
+    if not match or FRACTIONS.search(text):
+        return None
+    amount, unit = match.group(1).lower(), match.group(2).lower()
+    amount = float(NUMBER_WORDS[amount]) if amount in NUMBER_WORDS else float(amount)
+    unit = unit if unit in UNIT_SECONDS else unit[:-1]
+    return amount * UNIT_SECONDS[unit]
+
+
+def classify_line(line: str):
+    """Classify an obvious goto/wait/close step without an LLM.
+
+    Returns {"original instruction", "classification", "waiting_time"} (plus
+    "url" for goto steps), or None when the line needs the LLM.
+    """
+    text = line.strip()
+    if not text:
+        return None
+
+    if CLOSE_PATTERN.match(text):
+        return {"original instruction": text, "classification": "browser.close", "waiting_time": 0.0}
+
+    wait = WAIT_PATTERN.match(text)
+    if wait:
+        waiting_time = parse_waiting_time(text)
+        if waiting_time is None:
+            # "Wait until the table loads" is a condition, not a duration
+            return None
+        if OTHER_ACTIONS.search(text[wait.end():]):
+            # "Wait 2 seconds then click Save" is more than one step
+            return None
+        return {"original instruction": text, "classification": "page.wait", "waiting_time": waiting_time}
+
+    if GOTO_PATTERN.match(text):
+        url = extract_url(text)
+        if url and not OTHER_ACTIONS.search(text.replace(url, " ")):
+            return {"original instruction": text, "classification": "page.goto", "waiting_time": 0.0, "url": url}
+
+    return None
+
+
+def split_instructions(instructions) -> list:
+    """Instruction lines from segment() output ({"instructions": [...]}) or raw text."""
+    if isinstance(instructions, dict):
+        return [str(line).strip() for line in instructions.get("instructions", []) if str(line).strip()]
+    if isinstance(instructions, (list, tuple)):
+        return [str(line).strip() for line in instructions if str(line).strip()]
+    return [line.strip() for line in str(instructions).splitlines() if line.strip()]
+
@@ -4,6 +4,11 @@ import os
 from models import model
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableLambda
+from token_usage import record
+import time
+
+# Bump whenever the prompt changes; cached plans are keyed by it
+PROMPT_VERSION = "1"
 
 
 def extract_json_from_codeblock(output: str) -> str:
@@ -16,8 +21,11 @@ def extract_json_from_codeblock(output: str) -> str:
     json_str = "\n".join(lines)
     return json.loads(json_str)
 
-def segment(instructions: str, model) -> str:
-    """Convert NL input into line-by-line web automation steps using OpenAI."""
+def segment(instructions: str, model) -> tuple:
+    """Convert NL input into line-by-line web automation steps using OpenAI.
+
+    Returns (steps, [TokenUsage]).
+    """
     load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -49,9 +57,11 @@ Output JSON format:
         | model
     )
 
+    start = time.perf_counter()
     result = chain.invoke({})
+    usage = record("segment", model, result.usage_metadata, time.perf_counter() - start)
     result = extract_json_from_codeblock(result.content.strip())
-    return result
+    return result, [usage]
 
 
 if __name__ == "__main__":
@@ -59,6 +69,6 @@ if __name__ == "__main__":
 open localhost:5173 and then login with user name as `mehdi.mirzapour@gmail.com` and password  as `pass1234`
 open localhost:5173/items and click on add items.
 """
-    output = segment(instruction, model)
+    output, _ = segment(instruction, model)
     print("\nOriginal Instruction:\n", instruction.strip())
     print("\nStep-by-step Output:\n", output)
@@ -1,20 +1,98 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import asyncio
 import json
+from contextlib import asynccontextmanager
 import sys
+import threading
 import os
 
 # Add src directory to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
 
-from agentic_app import run_agent
+from agentic_app import run_agent, run_agent_async
+from browser_pool import BrowserPool
+from frame_stream import FrameSender
+from jobs import JobManager
+from token_usage import usage_stats
+from ws_bridge import ThreadBridge
+import rag_html
 
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
-app = FastAPI()
+# "async": sessions run as tasks on the server's event loop; "thread": one OS thread per session
+AGENT_RUNNER = os.getenv("AGENT_RUNNER", "async")
+# Screenshots buffered per thread-runner job; beyond this the oldest frame is dropped, never a step update
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", 64))
+# How long a cancelled thread-runner job waits for its thread to stop, in seconds
+JOB_CANCEL_TIMEOUT_S = float(os.getenv("JOB_CANCEL_TIMEOUT_S", 10))
+
+# Warm browsers for the async runner; each session gets a fresh BrowserContext
+browser_pool = BrowserPool(
+    size=int(os.getenv("BROWSER_POOL_SIZE", 2)),
+    max_sessions=int(os.getenv("BROWSER_POOL_MAX_SESSIONS", 50)),
+    contexts_per_browser=int(os.getenv("BROWSER_POOL_CONTEXTS", 4)),
+    headless=os.getenv("BROWSER_HEADLESS", "false").lower() == "true",
+)
+
+async def run_job(job):
+    """JobManager runner: one agent run, streamed into job.publish."""
+    if AGENT_RUNNER == "async":
+        async with browser_pool.session() as context:
+            return await run_agent_async(job.instruction_text, job.publish, context=context,
+                                         token_usage=job.token_usage)
+
+    # The agent thread posts into the event loop; nothing here blocks or polls
+    bridge = ThreadBridge(asyncio.get_running_loop(), maxsize=WS_QUEUE_SIZE)
+    cancel_event = threading.Event()
+    outcome = {}
+
+    def run_in_thread():
+        try:
+            outcome["commands"] = run_agent(job.instruction_text, bridge.post, cancel_event=cancel_event,
+                                            token_usage=job.token_usage)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            bridge.close()
+
+    threading.Thread(target=run_in_thread, daemon=True).start()
+    try:
+        async for step_data in bridge:
+            job.publish(step_data)
+    except asyncio.CancelledError:
+        # The thread stops before its next step and closes its browser; keep the job's
+        # slot until it has (its finally closes the bridge), but not past the timeout
+        cancel_event.set()
+        if not await bridge.drain(JOB_CANCEL_TIMEOUT_S):
+            print(f"Job {job.id}: agent thread still running {JOB_CANCEL_TIMEOUT_S}s after cancel")
+        raise
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("commands")
+
+jobs = JobManager(
+    run_job,
+    workers=int(os.getenv("JOB_WORKERS", 4)),
+    per_tenant=int(os.getenv("JOB_TENANT_LIMIT", 2)),
+)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Validate the vector index and create the embedding client once, off the request path
+    try:
+        await asyncio.to_thread(rag_html.warm_up)
+    except Exception as e:
+        print(f"Retrieval warm-up failed: {e}")
+    if AGENT_RUNNER == "async":
+        await browser_pool.start()
+    yield
+    await jobs.close()
+    await browser_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +102,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.get("/pool")
+async def get_pool_stats():
+    return browser_pool.stats()
+
+@app.get("/usage")
+async def get_usage_stats():
+    # Per-stage p50/p95 latency and token histograms over this process's recent LLM calls
+    return usage_stats.summary()
+
 # Serve index.html at root
 @app.get("/")
 async def read_root():
@@ -40,6 +127,55 @@ async def get_instructions():
         content = f.read()
     return {"content": content}
 
+class JobRequest(BaseModel):
+    instructions: str
+    tenant: str = "default"
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    return jobs.submit(request.instructions, request.tenant).snapshot()
+
+@app.get("/jobs")
+async def get_job_stats():
+    return jobs.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.snapshot()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if jobs.cancel(job_id) and job.task is not None:
+        # Report the outcome once the run has torn down its browser
+        await asyncio.wait([job.task])
+    return job.snapshot()
+
+async def stream_job(websocket: WebSocket, job) -> None:
+    """Send a job's updates (queue position, steps, frames) until it ends."""
+    # Step updates go out as JSON, screenshots as binary frames (latest-wins for slow clients)
+    sender = FrameSender(websocket.send_json, websocket.send_bytes).start()
+    try:
+        async for update in job.subscribe():
+            await sender.publish(update)
+    finally:
+        await sender.close()
+    await websocket.send_json({"status": "complete", "job": job.id, "job_status": job.status})
+
+@app.websocket("/jobs/{job_id}/ws")
+async def job_websocket(websocket: WebSocket, job_id: str):
+    await websocket.accept()
+    job = jobs.get(job_id)
+    if job is None:
+        await websocket.close(code=4404)
+        return
+    await stream_job(websocket, job)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -52,41 +188,13 @@ async def websocket_endpoint(websocket: WebSocket):
             demo_path = os.path.join(os.path.dirname(__file__), "..", "resources", "test_cases", "demo.txt")
             with open(demo_path, "r") as f:
                 instruction_text = f.read().strip()
-            
-            # Use a queue to communicate between sync and async contexts
-            import queue
-            message_queue = queue.Queue()
-            
-            # Callback to send updates to WebSocket
-            def update_callback(step_data):
-                message_queue.put(step_data)
-
-            # Run agent in a separate thread
-            import threading
-            agent_thread = threading.Thread(
-                target=run_agent, 
-                args=(instruction_text, update_callback)
-            )
-            agent_thread.start()
-            
-            # Process messages from queue and send via WebSocket
-            while agent_thread.is_alive() or not message_queue.empty():
-                try:
-                    # Non-blocking get with timeout
-                    step_data = message_queue.get(timeout=0.1)
-                    await websocket.send_json(step_data)
-                except queue.Empty:
-                    # Allow other async tasks to run
-                    await asyncio.sleep(0.1)
-            
-            # Wait for thread to complete
-            agent_thread.join()
-            
-            await websocket.send_json({"status": "complete"})
+
+            # The demo goes through the same admission control as submitted jobs
+            tenant = websocket.query_params.get("tenant", "demo")
+            await stream_job(websocket, jobs.submit(instruction_text, tenant))
             
     except Exception as e:
         print(f"WebSocket error: {e}")
         import traceback
         traceback.print_exc()
         await websocket.close()
-
@@ -0,0 +1,39 @@
+import os
+from collections import Counter
+
+# Resolve the next step's locator while the current step's action settles
+SPECULATE = os.getenv("SPECULATE", "true").lower() == "true"
+
+LOCATOR_STEPS = {"page.fill", "page.click", "page.hover"}
+
+
+def should_speculate(upcoming) -> bool:
+    """Only steps that need a locator benefit; a navigation replaces the DOM anyway."""
+    return SPECULATE and upcoming is not None and upcoming.get("classification") in LOCATOR_STEPS
+
+
+class SpeculationStats:
+    """Hit and waste counters for speculative look-ahead resolution."""
+
+    def __init__(self):
+        self.launched = 0
+        self.hits = Counter()
+        self.wasted = Counter()
+
+    def record_hit(self, source: str) -> None:
+        self.hits[source] += 1
+
+    def record_waste(self, source: str) -> None:
+        self.wasted[source or "error"] += 1
+
+    def summary(self) -> dict:
+        hits = sum(self.hits.values())
+        wasted = sum(self.wasted.values())
+        return {
+            "launched": self.launched,
+            "hits": hits,
+            "wasted": wasted,
+            "hit_rate": round(hits / (hits + wasted), 3) if hits + wasted else 0.0,
+            # Speculative LLM calls whose answer was thrown away are the real cost
+            "wasted_llm_calls": self.wasted["llm"],
+        }
@@ -4,6 +4,9 @@ from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableLambda
 from models import model
+from rule_classifier import classify_line, split_instructions
+from token_usage import record
+import time
 
 
 def extract_json_from_codeblock(output: str) -> dict:
@@ -17,15 +20,10 @@ def extract_json_from_codeblock(output: str) -> dict:
     return json.loads(json_str)
 
 
-def classify(instructions: str, model) -> dict:
-    """Classify natural language instructions into web automation actions using MistralAI."""
-    load_dotenv()
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key:
-        raise ValueError("MISTRAL_API_KEY not set in environment.")
-    os.environ["MISTRAL_API_KEY"] = api_key
+# Bump whenever the prompt changes; cached plans are keyed by it
+PROMPT_VERSION = "2"
 
-    prompt_template = """
+CLASSIFY_TEMPLATE = """
 You are an intelligent instruction classifier.
 Your task is to read a long natural language input where each line represents an instruction to be executed in a web automation context.
 
@@ -37,6 +35,8 @@ For each line, classify it as one of the following actions:
    - page.wait
    - browser.close
 
+Return exactly one entry per line, in the same order as the input.
+
 Output in JSON format:
 
 {{
@@ -50,7 +50,17 @@ Output in JSON format:
 {instructions}
 """
 
-    prompt = PromptTemplate.from_template(prompt_template)
+
+def classify_with_llm(lines: list, model) -> tuple:
+    """Classify instruction lines with one batched LLM call; returns (entries, [TokenUsage])."""
+    load_dotenv()
+    api_key = os.getenv("MISTRAL_API_KEY")
+    if not api_key:
+        raise ValueError("MISTRAL_API_KEY not set in environment.")
+    os.environ["MISTRAL_API_KEY"] = api_key
+
+    prompt = PromptTemplate.from_template(CLASSIFY_TEMPLATE)
+    instructions = "\n".join(lines)
 
     chain = (
         {"instructions": RunnableLambda(lambda _: instructions)}
@@ -58,9 +68,36 @@ Output in JSON format:
         | model
     )
 
+    start = time.perf_counter()
     raw_output = chain.invoke({})
+    usage = record("classify", model, raw_output.usage_metadata, time.perf_counter() - start)
     parsed_output = extract_json_from_codeblock(raw_output.content.strip())
-    return parsed_output
+    return parsed_output.get("instructions", []), [usage]
+
+
+def classify(instructions, model) -> tuple:
+    """Classify natural language instructions into web automation actions.
+
+    Obvious goto/wait/close lines are labelled by rule_classifier; the rest
+    go to the LLM in a single call, and no call is made if nothing is left.
+    Accepts segment() output or plain text with one instruction per line.
+    Returns ({"instructions": [...]}, [TokenUsage of each LLM call]).
+    """
+    lines = split_instructions(instructions)
+    local = [classify_line(line) for line in lines]
+    pending = [line for line, result in zip(lines, local) if result is None]
+
+    if not pending:
+        return {"instructions": local}, []
+
+    remote, usage = classify_with_llm(pending, model)
+    if len(remote) != len(pending):
+        # The model merged or split lines, so results can't be slotted back in order
+        remote, retry_usage = classify_with_llm(lines, model)
+        return {"instructions": remote}, usage + retry_usage
+
+    remote = iter(remote)
+    return {"instructions": [result if result is not None else next(remote) for result in local]}, usage
 
 
 if __name__ == "__main__":
@@ -81,6 +118,6 @@ if __name__ == "__main__":
 - Close the browser.
     """
 
-    output = classify(instruction, model)
+    output, _ = classify(instruction, model)
     print("\nOriginal Instructions:\n", instruction.strip())
     print("\nStructured Output:\n", json.dumps(output, indent=2))
@@ -0,0 +1,114 @@
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+import numpy as np
+from langchain_core.messages.ai import add_usage
+from pydantic import BaseModel
+
+from utils import model_id
+
+# Upper bounds of the token histogram buckets; larger counts land in the last one
+TOKEN_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+class TokenUsage(BaseModel):
+    """One LLM call; the fields of common/core/schema.TokenUsage, so flows can hand these to bulk_insert_token_usage."""
+    input_token: int
+    model_name: str
+    output_token: int
+    image_token: Optional[int] = None
+    quality: Optional[str] = None
+    cached_token: Optional[int] = None
+    latency: Optional[float] = None
+    stage: Optional[str] = None
+
+
+def usage_entry(stage: str, model, usage_metadata: dict, latency: float) -> TokenUsage:
+    """TokenUsage for one LLM call from the response's usage_metadata."""
+    usage_metadata = usage_metadata or {}
+    details = usage_metadata.get("input_token_details") or {}
+    return TokenUsage(
+        stage=stage,
+        model_name=model_id(model),
+        input_token=usage_metadata.get("input_tokens", 0),
+        output_token=usage_metadata.get("output_tokens", 0),
+        cached_token=details.get("cache_read", 0) or 0,
+        latency=round(latency, 4),
+    )
+
+
+def stream_usage(chunks_usage: list):
+    """Sum the usage_metadata reported across streamed chunks (None if no chunk reported any)."""
+    total = None
+    for usage_metadata in chunks_usage:
+        if usage_metadata:
+            total = usage_metadata if total is None else add_usage(total, usage_metadata)
+    return total
+
+
+def record(stage: str, model, usage_metadata: dict, latency: float) -> TokenUsage:
+    """Store one call in the process-wide stats and return its TokenUsage for the caller to pass on."""
+    entry = usage_entry(stage, model, usage_metadata, latency)
+    usage_stats.record(entry)
+    return entry
+
+
+def histogram(values: list) -> dict:
+    counts = np.histogram(values, bins=(0,) + TOKEN_BUCKETS + (np.inf,))[0] if values else [0] * (len(TOKEN_BUCKETS) + 1)
+    labels = [f"<{bound}" for bound in TOKEN_BUCKETS] + [f">={TOKEN_BUCKETS[-1]}"]
+    return dict(zip(labels, (int(count) for count in counts)))
+
+
+def _percentiles(values: list, scale: float = 1.0) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0}
+    return {
+        "p50": round(float(np.percentile(values, 50)) * scale, 2),
+        "p95": round(float(np.percentile(values, 95)) * scale, 2),
+    }
+
+
+def summarize(entries: list, histograms: bool = False) -> dict:
+    """Per-stage call count, token totals and p50/p95 latency (ms) and tokens of TokenUsage entries."""
+    by_stage = defaultdict(list)
+    for entry in entries:
+        by_stage[entry.stage].append(entry)
+
+    summary = {}
+    for stage, calls in by_stage.items():
+        input_tokens = [call.input_token for call in calls]
+        output_tokens = [call.output_token for call in calls]
+        summary[stage] = {
+            "calls": len(calls),
+            "input_token": sum(input_tokens),
+            "output_token": sum(output_tokens),
+            "cached_token": sum(call.cached_token or 0 for call in calls),
+            "latency_ms": _percentiles([call.latency or 0.0 for call in calls], scale=1000),
+            "input_token_pct": _percentiles(input_tokens),
+            "output_token_pct": _percentiles(output_tokens),
+        }
+        if histograms:
+            summary[stage]["input_token_histogram"] = histogram(input_tokens)
+            summary[stage]["output_token_histogram"] = histogram(output_tokens)
+    return summary
+
+
+class UsageStats:
+    """Recent LLM calls of this process, for per-stage latency and token distributions."""
+
+    def __init__(self, window: int = 10000):
+        self._entries = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, entry: TokenUsage) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def summary(self) -> dict:
+        with self._lock:
+            entries = list(self._entries)
+        return summarize(entries, histograms=True)
+
+
+usage_stats = UsageStats()
@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 from pathlib import Path
 import json
 
@@ -10,6 +11,11 @@ def extract_url(text):
     return match.group(0) if match else None
 
 
+def model_id(model) -> str:
+    """A stable name for a chat model (ChatOpenAI.model_name, ChatMistralAI.model, ...)."""
+    return str(getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__)
+
+
 def load_instructions_from_file(json_path: str):
     """Load instruction data from a JSON file."""
     file_path = Path(json_path)
@@ -19,4 +25,46 @@ def load_instructions_from_file(json_path: str):
     with open(file_path, 'r', encoding='utf-8') as f:
         data = json.load(f) 
 
-    return data    
\ No newline at end of file
+    return data    
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    """Load the tiktoken encoding for a model, or None if it is unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken missing or its BPE files cannot be downloaded (offline)
+        return None
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o-mini") -> int:
+    """Count prompt tokens with tiktoken, falling back to ~4 chars per token."""
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int, model_name: str = "gpt-4o-mini") -> list:
+    """Split text into consecutive pieces of at most max_tokens tokens, encoding it only once."""
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        size = max_tokens * 4
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoding.encode(text, disallowed_special=())
+    pieces, carry = [], b""
+    for i in range(0, len(tokens), max_tokens):
+        data = carry + encoding.decode_bytes(tokens[i:i + max_tokens])
+        try:
+            piece, carry = data.decode("utf-8"), b""
+        except UnicodeDecodeError as e:
+            # The slice ends inside a multi-byte character; finish it in the next piece
+            piece, carry = data[:e.start].decode("utf-8", errors="replace"), data[e.start:]
+        pieces.append(piece)
+    if carry:
+        pieces.append(carry.decode("utf-8", errors="replace"))
+    return [piece for piece in pieces if piece]
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class NumpyVectorIndex:
+    """In-process cosine-similarity index over a contiguous float32 matrix.
+
+    Rows are L2-normalised on insert so a query is a single matrix-vector
+    product followed by an argpartition for the top-k.
+    """
+
+    def __init__(self, dimension: int, capacity: int = 64):
+        self.dimension = dimension
+        self._matrix = np.empty((capacity, dimension), dtype=np.float32)
+        self._payloads = []
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:len(self)]
+
+    def add(self, embeddings, payloads: list) -> None:
+        """Append embeddings (n x dimension) with one payload per row."""
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if len(vectors) != len(payloads):
+            raise ValueError(f"Got {len(vectors)} embeddings for {len(payloads)} payloads.")
+
+        size = len(self)
+        needed = size + len(vectors)
+        if needed > len(self._matrix):
+            grown = np.empty((max(needed, 2 * len(self._matrix)), self.dimension), dtype=np.float32)
+            grown[:size] = self._matrix[:size]
+            self._matrix = grown
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, np.where(norms == 0, 1, norms), out=self._matrix[size:needed])
+        self._payloads.extend(payloads)
+
+    def query_many(self, queries, top_k: int = 1) -> list:
+        """Top-k (score, payload) pairs for each row of a query matrix."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension)
+        if not len(self):
+            return [[] for _ in range(len(queries))]
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = (queries / np.where(norms == 0, 1, norms)) @ self.matrix.T
+
+        k = min(top_k, len(self))
+        if k < len(self):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(self)), (len(queries), len(self)))
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results.append([(float(row[i]), self._payloads[i]) for i in ordered])
+        return results
+
+    def query(self, vector, top_k: int = 1) -> list:
+        """Top-k (score, payload) pairs for one query vector, best first."""
+        return self.query_many(vector, top_k)[0]
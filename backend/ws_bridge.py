@@ -0,0 +1,90 @@
+import asyncio
+from collections import deque
+
+_DONE = object()
+
+
+def _has_frame(item) -> bool:
+    return isinstance(item, dict) and "frame" in item
+
+
+class ThreadBridge:
+    """Hand updates from a worker thread to the event loop without polling.
+
+    post() may be called from any thread: it schedules the put on the loop
+    with call_soon_threadsafe, so the producer never blocks and the loop only
+    wakes when there is something to send. At most `maxsize` screenshots are
+    held; when a slow consumer lets more pile up, the oldest one is cut from
+    its update (each frame supersedes the previous one in the UI) and the drop
+    is counted. Step, status and error fields are always delivered.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 64):
+        self._loop = loop
+        self.maxsize = maxsize
+        self._items = deque()
+        self._frames = 0
+        self._ready = asyncio.Event()
+        self.posted = 0
+        self.dropped = 0
+
+    def post(self, item) -> None:
+        """Thread-safe; never blocks the caller."""
+        self._loop.call_soon_threadsafe(self._put, item)
+
+    def close(self) -> None:
+        """Thread-safe; ends iteration once everything posted before it has been consumed."""
+        self._loop.call_soon_threadsafe(self._put, _DONE)
+
+    def _put(self, item) -> None:
+        if _has_frame(item):
+            if self._frames >= self.maxsize:
+                self._drop_oldest_frame()
+            self._frames += 1
+        self._items.append(item)
+        self._ready.set()
+        if item is not _DONE:
+            self.posted += 1
+
+    def _drop_oldest_frame(self) -> None:
+        for i, queued in enumerate(self._items):
+            if _has_frame(queued):
+                self._items[i] = {key: value for key, value in queued.items() if key != "frame"}
+                self._frames -= 1
+                self.dropped += 1
+                return
+
+    async def _get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        item = self._items.popleft()
+        if _has_frame(item):
+            self._frames -= 1
+        return item
+
+    async def drain(self, timeout: float) -> bool:
+        """Discard updates until the producer calls close(), for at most `timeout` seconds.
+
+        Used after a cancelled consumer so the caller returns once the
+        producing thread is done. Returns False if it was still running.
+        """
+        async def until_closed():
+            while await self._get() is not _DONE:
+                pass
+
+        try:
+            await asyncio.wait_for(until_closed(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def __aiter__(self):
+        while True:
+            item = await self._get()
+            if item is _DONE:
+                return
+            yield item
+
+    def stats(self) -> dict:
+        return {"posted": self.posted, "dropped": self.dropped, "queued": len(self._items)}
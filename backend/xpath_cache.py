@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "XPATH_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", ".cache", "xpath_cache.sqlite"),
+)
+
+
+class _SkeletonParser(HTMLParser):
+    """Collect the tag/id/name skeleton of a page, ignoring text and styling."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        self.parts.append(f"{tag}#{attrs.get('id') or ''}@{attrs.get('name') or ''}")
+
+    def handle_endtag(self, tag):
+        self.parts.append("/" + tag)
+
+
+def dom_fingerprint(html: str) -> str:
+    """Hash the structural skeleton of a page (tags, ids and names only)."""
+    parser = _SkeletonParser()
+    parser.feed(html)
+    parser.close()
+    return hashlib.sha1("|".join(parser.parts).encode("utf-8")).hexdigest()
+
+
+def skeleton_fingerprint(skeleton: list) -> str:
+    """Hash the tag/id/name skeleton collected by extract_interactive_elements(html, skeleton).
+
+    Same idea as dom_fingerprint, for callers that already parsed the page
+    with dom_pruner; every element counts, not only the interactive ones.
+    """
+    return hashlib.sha1("|".join(skeleton).encode("utf-8")).hexdigest()
+
+
+# Verbs and filler words whose case never matters; every other word may be a value ("with Bob")
+STRUCTURE_WORDS = {
+    "click", "press", "tap", "select", "choose", "hover", "fill", "enter", "type", "input", "write", "put", "set",
+    "check", "uncheck", "open", "go", "navigate", "submit", "on", "in", "into", "with", "as", "to", "at", "of",
+    "for", "and", "then", "the", "a", "an", "field", "button", "link", "box", "tab", "menu", "option",
+}
+
+
+def _normalize_words(text: str) -> str:
+    words = (word.lower() if word.lower().strip(".,!?:;") in STRUCTURE_WORDS else word for word in text.split(" "))
+    return " ".join(words)
+
+
+def normalize_instruction(instruction: str) -> str:
+    """Collapse whitespace and lowercase the verb and structure words.
+
+    Quoted text and any other word keep their case, so "fill the name with
+    Bob" and "... with bob" get different cache keys.
+    """
+    parts = re.split(r"""('[^']*'|"[^"]*"|`[^`]*`)""", instruction.strip())
+    normalized = "".join(
+        part if i % 2 else _normalize_words(re.sub(r"\s+", " ", part)) for i, part in enumerate(parts)
+    )
+    return normalized.strip().rstrip(" .!")
+
+
+class XPathCache:
+    """LRU cache of extract_xpath_pattern results backed by a sqlite file.
+
+    Entries are keyed by the normalized instruction, the page fingerprint, the
+    extractor's prompt version and the model name, so a prompt edit or a model
+    switch never serves an XPath from before it. The in-memory LRU holds up to `capacity` entries; the sqlite store keeps
+    up to `disk_capacity` and evicts the least recently used rows beyond that.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, capacity: int = 512, disk_capacity: int = 10000,
+                 prompt_version: str = "", model_name: str = ""):
+        self.path = path
+        self.prompt_version = prompt_version
+        self.model_name = model_name
+        self.capacity = capacity
+        self.disk_capacity = disk_capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS xpath_cache ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def make_key(self, instruction: str, fingerprint: str) -> str:
+        raw = f"{normalize_instruction(instruction)}\x00{fingerprint}\x00{self.prompt_version}\x00{self.model_name}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, instruction: str, fingerprint: str, validate=None):
+        """Return the cached result, or None.
+
+        validate(xpath) -> bool is called before a hit is returned; callers
+        pass a check that the XPath still matches exactly one element. Entries
+        that fail it are dropped.
+        """
+        key = self.make_key(instruction, fingerprint)
+        result = self._lookup(key)
+        if result is not None and validate is not None and not validate(result["xpath"]):
+            self.invalidate(instruction, fingerprint)
+            result = None
+        return self._record(key, result)
+
+    async def aget(self, instruction: str, fingerprint: str, validate=None):
+        """get() with an async validate(xpath), e.g. a check against an async Playwright page.
+
+        The sqlite reads and writes run on a worker thread, off the event loop.
+        """
+        key = self.make_key(instruction, fingerprint)
+        result = await asyncio.to_thread(self._lookup, key)
+        if result is not None and validate is not None and not await validate(result["xpath"]):
+            await asyncio.to_thread(self.invalidate, instruction, fingerprint)
+            result = None
+        return await asyncio.to_thread(self._record, key, result)
+
+    def _lookup(self, key: str):
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+            else:
+                row = self._db.execute("SELECT result FROM xpath_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+            return result
+
+    def _record(self, key: str, result):
+        """Count a hit or miss and return a copy of the hit."""
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE xpath_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return dict(result)
+
+    def put(self, instruction: str, fingerprint: str, result: dict) -> None:
+        key = self.make_key(instruction, fingerprint)
+        with self._lock:
+            self._remember(key, dict(result))
+            self._db.execute(
+                "INSERT OR REPLACE INTO xpath_cache (key, result, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+            overflow = self._db.execute("SELECT COUNT(*) FROM xpath_cache").fetchone()[0] - self.disk_capacity
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM xpath_cache WHERE key IN "
+                    "(SELECT key FROM xpath_cache ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._db.commit()
+
+    async def aput(self, instruction: str, fingerprint: str, result: dict) -> None:
+        """put() on a worker thread, off the event loop."""
+        await asyncio.to_thread(self.put, instruction, fingerprint, result)
+
+    def invalidate(self, instruction: str, fingerprint: str) -> None:
+        key = self.make_key(instruction, fingerprint)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM xpath_cache WHERE key = ?", (key,))
+            self._db.commit()
+            self.invalidations += 1
+
+    def _remember(self, key: str, result: dict) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Counters for hit rate, size and evictions."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_size": len(self._memory),
+                "disk_size": self._db.execute("SELECT COUNT(*) FROM xpath_cache").fetchone()[0],
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
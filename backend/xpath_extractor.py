@@ -1,4 +1,5 @@
 
+import asyncio
 import json
 from dotenv import load_dotenv
 import os
@@ -6,9 +7,15 @@ from langchain_mistralai import ChatMistralAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableLambda
 from models import model
+from dom_pruner import prune_html
+from token_usage import record
+import time
 
 import dirtyjson
 
+# Bump whenever a prompt changes; cached XPaths are keyed by it
+PROMPT_VERSION = "1"
+
 def extract_json_from_codeblock(output: str) -> str:
     """Remove code block markdown from model output."""
     # Try to find JSON object boundaries
@@ -25,8 +32,41 @@ def extract_json_from_codeblock(output: str) -> str:
         lines = lines[:-1]
     return "\n".join(lines)
 
-def extract_xpath_pattern(instruction: str, html: str, model) -> str:
-    """Run the instruction + HTML through Mistral and return JSON result."""
+ELEMENT_TABLE_TEMPLATE = """
+You are an expert UI assistant that converts natural language commands into web automation step.
+
+You will be given:
+- A table of the interactive elements on a web page, one row per element, with its tag, attributes, visible text and absolute XPath
+- A natural language instruction from the user
+
+Your job:
+- Translate the instruction into one step, each using an action from only three categories: "click", "hover", "fill" all lowercase.
+- Always use "click" for dropdown toggles.
+- Pick the row the instruction targets. Prefer a short XPath built from its id, name or text when that is unique, otherwise copy its value from the xpath column.
+- XPaths must be **valid XPath 1.0** and use `//` syntax where needed.
+- The output must be ONLY valid JSON (no text or explanation), following this format:
+
+Example 1:
+{{"action": "click", "xpath": "//input[@id='username']", "fill": "username/password"}}
+
+Example 2:
+{{"action": "click", "xpath": "//a[contains(text(), 'AI-Powered Widget')]", "fill": ""}}
+
+
+--- Interactive Elements ---
+{html}
+
+--- Command ---
+{instruction}
+"""
+
+def build_xpath_chain(instruction: str, html: str, model, prune: bool = True, rows: list = None):
+    """The prompt | model chain for one instruction against one page.
+
+    With prune=True the page is first reduced to a table of its interactive
+    elements and the model sees that table instead of the raw HTML. Pass the
+    page's element rows when they are already extracted to skip a second parse.
+    """
 
     # Prompt template
     template = """
@@ -55,15 +95,23 @@ Example 2:
 --- Command ---
 {instruction}
 """
+    if prune:
+        table, stats = prune_html(html, rows=rows)
+        # Nothing recognisable as interactive: let the model see the page itself
+        if stats["elements"]:
+            template = ELEMENT_TABLE_TEMPLATE
+            html = table
+
     prompt = PromptTemplate.from_template(template)    
-    chain = (
+    return (
         {"instruction": RunnableLambda(lambda _: instruction), "html": RunnableLambda(lambda _: html)}
         | prompt
         | model
     )
 
-    result = chain.invoke({})
-    result_text = extract_json_from_codeblock(result.content.strip())
+
+def parse_xpath_result(content: str) -> dict:
+    result_text = extract_json_from_codeblock(content.strip())
     print(f"DEBUG: Raw model output: {result_text}")
     
     if isinstance(result_text, str):
@@ -76,11 +124,38 @@ Example 2:
         
     return result
 
+
+def extract_xpath_pattern(instruction: str, html: str, model, prune: bool = True, rows: list = None) -> tuple:
+    """Run the instruction + HTML through the model; returns (JSON result, [TokenUsage]).
+
+    rows: the page's interactive-element rows, if already extracted.
+    """
+    chain = build_xpath_chain(instruction, html, model, prune, rows)
+
+    start = time.perf_counter()
+    result = chain.invoke({})
+    usage = record("extract_xpath", model, result.usage_metadata, time.perf_counter() - start)
+    return parse_xpath_result(result.content), [usage]
+
+
+async def aextract_xpath_pattern(instruction: str, html: str, model, prune: bool = True,
+                                 rows: list = None) -> tuple:
+    """Async extract_xpath_pattern: awaits the model with ainvoke.
+
+    Pruning (parsing and token counting) runs on a worker thread so the event loop only waits on I/O.
+    """
+    chain = await asyncio.to_thread(build_xpath_chain, instruction, html, model, prune, rows)
+
+    start = time.perf_counter()
+    result = await chain.ainvoke({})
+    usage = record("extract_xpath", model, result.usage_metadata, time.perf_counter() - start)
+    return parse_xpath_result(result.content), [usage]
+
 if __name__ == "__main__":
     instruction = "Click on the 'Login' button."
     with open("resources/unit_tests/unit_test.html", "r", encoding="utf-8") as f:
         html =f.read()
 
-    output = extract_xpath_pattern(instruction, html, model)
+    output, _ = extract_xpath_pattern(instruction, html, model)
     print("NL Instruction:", instruction)
     print("XPath Output:", output)
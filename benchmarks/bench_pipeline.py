@@ -0,0 +1,205 @@
+"""Offline end-to-end pipeline benchmark: fake LLM, fake embeddings, local fixture pages.
+
+Every fixture in benchmarks/fixtures is served from this process and driven
+through the same scenario. Each stage is timed separately:
+
+    plan        build_plan() with the fake chat model
+    retrieval   rag_html.find_similar_chunk() over the live page (NumPy backend)
+    locate      resolve_step() (heuristic -> cache -> LLM), or the LLM alone with --force-llm
+    act         the Playwright action plus the readiness wait, as run_agent performs it
+    screenshot  capture plus frame encoding
+    end_to_end  a full run_agent() of the scenario
+
+Results are written as JSON. With --check, p95 timings are compared against
+benchmarks/thresholds.json and the script exits non-zero on a regression.
+
+    python benchmarks/bench_pipeline.py --repeat 5 --llm-latency 0.2 --output bench_results.json --check
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Offline: no real keys, no shared on-disk caches
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("MISTRAL_API_KEY", "offline")
+os.environ["VECTOR_BACKEND"] = "numpy"
+os.environ["PLAN_CACHE"] = "false"
+os.environ["XPATH_CACHE_PATH"] = ":memory:"
+os.environ["PLAN_CACHE_PATH"] = ":memory:"
+os.environ["EMBEDDING_CACHE_PATH"] = ":memory:"
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from playwright.sync_api import sync_playwright
+
+from offline import FakeEmbedding, FakePipelineModel, FixtureServer, fixture_names
+import agentic_app
+import rag_html
+from embedding_cache import EmbeddingCache
+from frame_stream import capture_options, encode_frame
+from readiness import ReadinessReport
+from replay import perform
+from xpath_cache import XPathCache
+from xpath_extractor import extract_xpath_pattern
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "thresholds.json")
+STAGES = ("plan", "retrieval", "locate", "act", "screenshot", "end_to_end")
+
+SCENARIO = """open '{url}'
+fill the 'Title' field with 'Meeting Agenda'
+fill the 'Description' field with 'Weekly sync notes'
+hover over 'Menu'
+click on 'Save'
+close the browser"""
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def time(self, stage: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples[stage].append((time.perf_counter() - start) * 1000)
+        return result
+
+
+def act(page, classification: str, result: dict, readiness: ReadinessReport) -> None:
+    # The replay helper runs the same actions and waits as run_agent (hover is a mouse move plus click)
+    perform({"classification": classification, "xpath": result["xpath"], "fill": result.get("fill") or ""},
+            page, readiness)
+
+
+def capture_frame(page) -> bytes:
+    """What the live view pays per step: the capture and the frame encoding."""
+    return encode_frame(page.screenshot(timeout=5000, **capture_options()))
+
+
+def run_stages(page, text: str, args, timer: StageTimer, sources: Counter) -> None:
+    """One pass of the scenario with every stage timed on its own."""
+    readiness = ReadinessReport()
+    steps = timer.time("plan", agentic_app.build_plan, text, args.planner)[0]["instructions"]
+    for step in steps:
+        classification = step["classification"]
+        instruction = step["original instruction"]
+
+        if classification == "page.goto":
+            timer.time("act", page.goto, step.get("url") or agentic_app.extract_url(instruction))
+        elif classification in ("page.fill", "page.click", "page.hover"):
+            html = page.content()
+            timer.time("retrieval", rag_html.find_similar_chunk, html, instruction,
+                       chunk_size=args.chunk_size, backend="numpy", mode=args.retrieval)
+            if args.force_llm:
+                result, source = timer.time("locate", extract_xpath_pattern, instruction, html, agentic_app.model)[0], "llm"
+            else:
+                result, source = timer.time("locate", agentic_app.resolve_step, instruction, page, classification)
+            sources[source] += 1
+            timer.time("act", act, page, classification, result, readiness)
+        else:
+            continue
+
+        timer.time("screenshot", capture_frame, page)
+
+
+def summarize(samples: list) -> dict:
+    values = np.array(samples)
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "mean_ms": round(float(values.mean()), 2),
+    }
+
+
+def check(results: dict, thresholds: dict) -> list:
+    """Stages whose p95 exceeds the budget for their fixture (or the default budget)."""
+    regressions = []
+    for fixture, stages in results["fixtures"].items():
+        budgets = {**thresholds["p95_ms"]["default"], **thresholds["p95_ms"].get(fixture, {})}
+        for stage, summary in stages.items():
+            if stage in budgets and summary["p95_ms"] > budgets[stage]:
+                regressions.append({"fixture": fixture, "stage": stage,
+                                    "p95_ms": summary["p95_ms"], "budget_ms": budgets[stage]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", nargs="+", default=None, help="Fixture names (default: all).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Simulated seconds per LLM call.")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Simulated seconds per embedding batch.")
+    parser.add_argument("--planner", choices=["fused", "two-call"], default="fused")
+    parser.add_argument("--retrieval", choices=["auto", "lexical", "embedding"], default="auto")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Retrieval chunk size in tokens.")
+    parser.add_argument("--force-llm", action="store_true", help="Time the LLM locator instead of heuristic/cache.")
+    parser.add_argument("--skip-e2e", action="store_true", help="Skip the full run_agent() pass.")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--check", action="store_true", help="Fail if a p95 exceeds benchmarks/thresholds.json.")
+    args = parser.parse_args()
+
+    agentic_app.model = FakePipelineModel(latency=args.llm_latency)
+    rag_html._embed_model = FakeEmbedding(latency=args.embed_latency)
+    fixtures = args.fixtures or fixture_names()
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "check")},
+        "fixtures": {},
+        "locator_sources": {},
+    }
+    with FixtureServer() as server, sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        for fixture in fixtures:
+            text = SCENARIO.format(url=server.url(fixture))
+            timer, sources = StageTimer(), Counter()
+            for _ in range(args.repeat):
+                # Every pass starts cold: no cached XPaths or embeddings from the previous one
+                agentic_app.xpath_cache = XPathCache(":memory:")
+                rag_html.embedding_cache = EmbeddingCache(":memory:")
+                context = browser.new_context()
+                run_stages(context.new_page(), text, args, timer, sources)
+                context.close()
+
+                if not args.skip_e2e:
+                    agentic_app.xpath_cache = XPathCache(":memory:")
+                    context = browser.new_context()
+                    timer.time("end_to_end", agentic_app.run_agent, text, context=context)
+                    context.close()
+
+            results["fixtures"][fixture] = {
+                stage: summarize(timer.samples[stage]) for stage in STAGES if timer.samples[stage]
+            }
+            results["locator_sources"][fixture] = dict(sources)
+        browser.close()
+
+    print(f"{'fixture':<10}{'stage':<12}{'n':>5}{'p50 ms':>12}{'p95 ms':>12}")
+    for fixture, stages in results["fixtures"].items():
+        for stage, summary in stages.items():
+            print(f"{fixture:<10}{stage:<12}{summary['n']:>5}{summary['p50_ms']:>12}{summary['p95_ms']:>12}")
+
+    exit_code = 0
+    if args.check:
+        with open(THRESHOLDS_PATH, "r") as f:
+            thresholds = json.load(f)
+        calibrated = thresholds["calibrated_for"]
+        if (args.llm_latency, args.embed_latency) != (calibrated["llm_latency"], calibrated["embed_latency"]):
+            print(f"WARNING: thresholds are calibrated for {calibrated}; compare with the same latencies.")
+        results["regressions"] = check(results, thresholds)
+        for regression in results["regressions"]:
+            print(f"REGRESSION {regression['fixture']}/{regression['stage']}: "
+                  f"p95 {regression['p95_ms']} ms > budget {regression['budget_ms']} ms")
+        exit_code = 1 if results["regressions"] else 0
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    raise SystemExit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Sessions per core: thread-per-session run_agent vs run_agent_async on one loop.
+
+Both runners execute the same small plan against an inline HTML page, with a
+fake chat model standing in for the planner (every locator resolves through
+the heuristic path, so no other LLM calls are made). For each concurrency
+level the script reports wall time, CPU time of this process plus its
+Chromium children, peak thread count and sessions per busy core.
+
+    python benchmarks/bench_sessions.py --sessions 1 8 32 --latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import agentic_app
+
+PAGE = (
+    "<html><body><form>"
+    "<label for='title'>Title</label><input id='title' name='title'>"
+    "<button type='button'>Save</button>"
+    "</form></body></html>"
+)
+URL = "data:text/html," + quote(PAGE)
+
+PLAN = json.dumps({"instructions": [
+    {"original instruction": f"open '{URL}'", "classification": "page.goto", "waiting_time": 0, "url": URL},
+    {"original instruction": "fill the 'Title' field with 'Meeting Agenda'", "classification": "page.fill",
+     "waiting_time": 0, "value": "Meeting Agenda"},
+    {"original instruction": "click on 'Save'", "classification": "page.click", "waiting_time": 0},
+    {"original instruction": "close the browser", "classification": "browser.close", "waiting_time": 0},
+]})
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class ThreadSampler:
+    """Track the peak number of live threads while a run is in progress."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.05):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_threads(sessions: int):
+    threads = [
+        threading.Thread(target=agentic_app.run_agent, args=("benchmark",), kwargs={"headless": True})
+        for _ in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_async(sessions: int):
+    async def main():
+        await asyncio.gather(*(agentic_app.run_agent_async("benchmark", headless=True) for _ in range(sessions)))
+
+    asyncio.run(main())
+
+
+RUNNERS = {"thread": run_threads, "async": run_async}
+
+
+def measure(runner, sessions: int) -> dict:
+    cpu_before = cpu_seconds()
+    start = time.perf_counter()
+    with ThreadSampler() as sampler:
+        RUNNERS[runner](sessions)
+    wall = time.perf_counter() - start
+    cpu = cpu_seconds() - cpu_before
+    busy_cores = cpu / wall
+    return {
+        "runner": runner,
+        "sessions": sessions,
+        "wall_s": round(wall, 2),
+        "cpu_s": round(cpu, 2),
+        "peak_threads": sampler.peak,
+        "sessions_per_core": round(sessions / busy_cores, 1) if busy_cores else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=float, default=1.0, help="Simulated planner latency in seconds.")
+    args = parser.parse_args()
+
+    agentic_app.model = FakeListChatModel(responses=[PLAN], sleep=args.latency / len(PLAN))
+
+    print(f"{'runner':<8}{'sessions':>10}{'wall s':>10}{'cpu s':>10}{'threads':>10}{'per core':>10}")
+    for sessions in args.sessions:
+        for runner in RUNNERS:
+            row = measure(runner, sessions)
+            print(f"{row['runner']:<8}{row['sessions']:>10}{row['wall_s']:>10}{row['cpu_s']:>10}"
+                  f"{row['peak_threads']:>10}{row['sessions_per_core']:>10}")
+
+
+if __name__ == "__main__":
+    main()
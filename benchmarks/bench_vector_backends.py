@@ -0,0 +1,83 @@
+"""Compare the in-process NumPy index against Pinecone for per-page retrieval.
+
+Embeddings are random and precomputed, so only the vector-store cost is
+measured (index set-up, upsert and a top-1 query). The Pinecone run needs
+PINECONE_API_KEY / PINECONE_INDEX_NAME and is skipped without them.
+
+    python benchmarks/bench_vector_backends.py --chunks 8 32 128
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from vector_index import NumpyVectorIndex
+
+DIMENSION = 1024  # mistral-embed
+
+
+def bench_numpy(embeddings, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        index = NumpyVectorIndex(DIMENSION, capacity=len(embeddings))
+        index.add(embeddings, list(range(len(embeddings))))
+        index.query(query, top_k=1)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_pinecone(embeddings, query, repeat):
+    from pinecone_manager import NamespaceRegistry, PineconeManager
+
+    index = PineconeManager(os.getenv("PINECONE_API_KEY")).get_index(os.getenv("PINECONE_INDEX_NAME"), dimension=DIMENSION)
+    # A prefix of its own, so the final sweep only ever deletes this run's namespaces
+    registry = NamespaceRegistry(index, ttl=0, sweep_interval=60, prefix=f"bench-{uuid.uuid4().hex[:8]}-")
+    timings = []
+    try:
+        for i in range(repeat):
+            start = time.perf_counter()
+            namespace = f"{registry.prefix}{i}"
+            registry.claim(namespace)
+            index.upsert(vectors=[(str(uuid.uuid4()), vector.tolist()) for vector in embeddings], namespace=namespace)
+            registry.mark_ready(namespace)
+            index.query(vector=query.tolist(), top_k=1, namespace=namespace)
+            timings.append(time.perf_counter() - start)
+    finally:
+        registry.sweep(now=time.time() + 1)
+    return timings
+
+
+def summarize(name, chunks, timings):
+    timings_ms = np.array(timings) * 1000
+    print(f"{name:<10} {chunks:>7} {np.median(timings_ms):>10.2f} {np.percentile(timings_ms, 95):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector-store backends for rag_html.")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with_pinecone = bool(os.getenv("PINECONE_API_KEY") and os.getenv("PINECONE_INDEX_NAME"))
+
+    print(f"{'backend':<10} {'chunks':>7} {'p50 ms':>10} {'p95 ms':>10}")
+    for chunks in args.chunks:
+        embeddings = rng.standard_normal((chunks, DIMENSION)).astype(np.float32)
+        query = rng.standard_normal(DIMENSION).astype(np.float32)
+        summarize("numpy", chunks, bench_numpy(embeddings, query, args.repeat))
+        if with_pinecone:
+            # Remote round-trips dominate; a few runs are enough
+            summarize("pinecone", chunks, bench_pinecone(embeddings, query, min(args.repeat, 3)))
+    if not with_pinecone:
+        print("PINECONE_API_KEY / PINECONE_INDEX_NAME not set: Pinecone skipped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the fused planner with the two-call segment() + classify() path.
+
+Runs both planners over every resources/test_cases/*.txt and reports the
+wall-clock latency of each, plus how often the sequence of classifications
+matches the stored .json reference. Needs the LLM keys used by backend/models.py.
+
+    python benchmarks/compare_planners.py --repeat 3
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from models import model
+from planner import plan
+from sentence_segmentor import segment
+from task_mapper import classify
+
+CASES_DIR = os.path.join(os.path.dirname(__file__), "..", "resources", "test_cases")
+
+
+def two_call(instructions, model):
+    segmented, segment_usage = segment(instructions, model)
+    output, classify_usage = classify(segmented, model)
+    return output, segment_usage + classify_usage
+
+
+PLANNERS = {"fused": plan, "two-call": two_call}
+
+
+def classifications(output):
+    return [item.get("classification") for item in output.get("instructions", [])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    cases = sorted(glob.glob(os.path.join(CASES_DIR, "*.txt")))
+    print(f"{'case':<10}{'planner':<10}{'mean s':>10}{'matches':>10}")
+    totals = {name: [] for name in PLANNERS}
+    for path in cases:
+        with open(path) as f:
+            text = f.read().strip()
+        with open(path.rsplit(".", 1)[0] + ".json") as f:
+            expected = classifications(json.load(f))
+
+        for name, planner in PLANNERS.items():
+            timings, matches = [], 0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                output, _ = planner(text, model)
+                timings.append(time.perf_counter() - start)
+                matches += classifications(output) == expected
+            totals[name].extend(timings)
+            case = os.path.basename(path)
+            print(f"{case:<10}{name:<10}{statistics.mean(timings):>10.2f}{f'{matches}/{args.repeat}':>10}")
+
+    for name, timings in totals.items():
+        print(f"{name}: mean {statistics.mean(timings):.2f}s over {len(timings)} runs")
+
+
+if __name__ == "__main__":
+    main()
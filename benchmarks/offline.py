@@ -0,0 +1,174 @@
+"""Deterministic stand-ins for the LLM, the embedding model and the app under test.
+
+FakePipelineModel answers every prompt the pipeline sends (planner, segmentor,
+classifier, XPath extraction) from the prompt text alone, after a fixed
+simulated latency, and reports usage_metadata like a real provider.
+FakeEmbedding hashes words into fixed-size vectors. FixtureServer serves
+benchmarks/fixtures over HTTP from a thread of the current process.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from rule_classifier import classify_line
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+QUOTED = re.compile(r"'([^']+)'")
+
+
+def _task_lines(text: str) -> list:
+    return [line.strip() for line in text.strip().splitlines() if line.strip()]
+
+
+def _action(instruction: str) -> str:
+    lowered = instruction.lower()
+    return "fill" if "fill" in lowered or "enter" in lowered else "hover" if "hover" in lowered else "click"
+
+
+def _classified(line: str) -> dict:
+    # The rules cover goto / wait / close; the fixtures' other steps are named by their verb
+    return classify_line(line) or {
+        "original instruction": line, "classification": f"page.{_action(line)}", "waiting_time": 0,
+    }
+
+
+def _xpath_answer(instruction: str) -> dict:
+    """Fixture elements carry data-label; the first quoted text is the target, the second the value."""
+    quoted = QUOTED.findall(instruction)
+    target = quoted[0] if quoted else instruction
+    action = _action(instruction)
+    return {
+        "action": action,
+        "xpath": f"//*[@data-label='{target}']",
+        "fill": quoted[1] if action == "fill" and len(quoted) > 1 else "",
+    }
+
+
+def answer(prompt: str) -> str:
+    """The JSON a well-behaved model would return for one of the pipeline's prompts."""
+    if "--- Command ---" in prompt:
+        return json.dumps(_xpath_answer(prompt.rsplit("--- Command ---", 1)[1].strip()))
+    if "--- Task ---" in prompt:
+        steps = []
+        for line in _task_lines(prompt.rsplit("--- Task ---", 1)[1]):
+            step = _classified(line)
+            quoted = QUOTED.findall(line)
+            steps.append({
+                "original instruction": line,
+                "classification": step["classification"],
+                "waiting_time": step.get("waiting_time") or 0,
+                "url": step.get("url") or "",
+                "value": quoted[1] if step["classification"] == "page.fill" and len(quoted) > 1 else "",
+            })
+        return json.dumps({"instructions": steps})
+    if "--- Instructions ---" in prompt:
+        lines = _task_lines(prompt.rsplit("--- Instructions ---", 1)[1])
+        return json.dumps({"instructions": [
+            {key: value for key, value in _classified(line).items() if key != "url"} for line in lines
+        ]})
+    # Segmentor: the task text follows the output format block
+    return json.dumps({"instructions": _task_lines(prompt.rsplit("}\n", 1)[-1])})
+
+
+class FakePipelineModel(BaseChatModel):
+    """Chat model that answers from the prompt after `latency` seconds (plus `per_token_ms` per output token)."""
+
+    latency: float = 0.2
+    per_token_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-pipeline"
+
+    @property
+    def model_name(self) -> str:
+        return "fake-pipeline"
+
+    def _reply(self, messages) -> tuple:
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = answer(prompt)
+        usage = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": len(prompt) // 4 + len(content) // 4,
+        }
+        delay = self.latency + usage["output_tokens"] * self.per_token_ms / 1000
+        return content, usage, delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content, usage, delay = self._reply(messages)
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content, usage, delay = self._reply(messages)
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+
+class FakeEmbedding:
+    """Bag-of-words hashing embedder with the get_text_embedding_batch interface rag_html uses."""
+
+    model_name = "fake-embed"
+
+    def __init__(self, dimension: int = 1024, latency: float = 0.05):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def get_text_embedding_batch(self, texts: list, **kwargs) -> list:
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+
+class FixtureServer:
+    """benchmarks/fixtures over HTTP on a free localhost port, served from a daemon thread."""
+
+    def __init__(self, directory: str = FIXTURES_DIR):
+        handler = partial(_QuietHandler, directory=directory)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/{name}.html"
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+def fixture_names() -> list:
+    """Fixture names, smallest page first."""
+    files = [name for name in os.listdir(FIXTURES_DIR) if name.endswith(".html")]
+    return [name[:-5] for name in sorted(files, key=lambda name: os.path.getsize(os.path.join(FIXTURES_DIR, name)))]
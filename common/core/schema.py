@@ -18,4 +18,7 @@ class TokenUsage(BaseModel):
     output_token: int
     image_token: Optional[int] = None
     quality: Optional[str] = None
+    cached_token: Optional[int] = None
+    latency: Optional[float] = None
+    stage: Optional[str] = None
 
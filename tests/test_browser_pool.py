@@ -0,0 +1,148 @@
+import asyncio
+from browser_pool import BrowserPool, PooledBrowser
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    launched = 0
+
+    def __init__(self):
+        FakeBrowser.launched += 1
+        self.handlers = []
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def crash(self):
+        for handler in self.handlers:
+            handler(self)
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self):
+        return FakeContext()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserPool(BrowserPool):
+    async def start(self):
+        self._browsers = [await self._launch() for _ in range(self.size)]
+
+    async def _launch(self):
+        return PooledBrowser(FakeBrowser())
+
+
+def test_sessions_get_fresh_contexts_and_browsers_are_recycled():
+    async def scenario():
+        pool = FakeBrowserPool(size=1, max_sessions=2, contexts_per_browser=2)
+        await pool.start()
+        first_browser = pool._browsers[0].browser
+
+        async with pool.session() as first, pool.session() as second:
+            assert first is not second
+            assert pool.stats()["occupancy"] == 1.0
+        assert first.closed and second.closed
+        # Replacements run in the background
+        await asyncio.gather(*pool._tasks)
+
+        # The browser served its two sessions and was replaced after the last one ended
+        assert first_browser.closed
+        assert pool._browsers[0].browser is not first_browser
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["recycles"] == 1 and stats["sessions"] == 2 and stats["active_sessions"] == 0
+
+
+def test_callers_wait_for_a_free_slot():
+    async def scenario():
+        pool = FakeBrowserPool(size=1, contexts_per_browser=1)
+        await pool.start()
+        order = []
+
+        async def run(name, hold):
+            async with pool.session():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        await asyncio.gather(run("a", 0.05), run("b", 0))
+        return order, pool.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["a", "b"]
+    assert stats["wait_ms_max"] >= 40
+
+
+def test_crashed_browser_is_replaced():
+    async def scenario():
+        pool = FakeBrowserPool(size=1)
+        await pool.start()
+        crashed = pool._browsers[0].browser
+        async with pool.session():
+            crashed.crash()
+        async with pool.session():
+            pass
+        return crashed, pool
+
+    crashed, pool = asyncio.run(scenario())
+    assert pool.stats()["crashes"] == 1
+    assert pool._browsers[0].browser is not crashed
+
+
+class FlakyBrowserPool(FakeBrowserPool):
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.launches = 0
+
+    async def _launch(self):
+        self.launches += 1
+        # The initial launch succeeds, the relaunches fail `failures` times
+        if self.launches > self.size and self.failures:
+            self.failures -= 1
+            raise RuntimeError("chromium did not start")
+        return await super()._launch()
+
+
+def test_failed_relaunch_is_retried_with_backoff():
+    async def scenario():
+        pool = FlakyBrowserPool(failures=2, size=1, launch_backoff=0.01)
+        await pool.start()
+        async with pool.session():
+            pool._browsers[0].browser.crash()
+        await asyncio.gather(*pool._tasks)
+        async with pool.session():
+            pass
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["launch_failures"] == 2 and stats["browsers"] == 1 and stats["crashes"] == 1
+
+
+def test_waiters_get_the_launch_error_when_no_browser_is_left():
+    async def scenario():
+        pool = FlakyBrowserPool(failures=1000, size=1, launch_backoff=0.01)
+        await pool.start()
+        async with pool.session():
+            pool._browsers[0].browser.crash()
+        try:
+            await asyncio.wait_for(pool._acquire(), timeout=2)
+        except RuntimeError as e:
+            error = e
+        await pool.close()
+        return error, pool
+
+    error, pool = asyncio.run(scenario())
+    assert "relaunching failed" in str(error)
+    assert not pool._tasks
@@ -0,0 +1,26 @@
+import json
+from compiled_plan import compile_step, compiled_path, load_compiled, save_compiled
+
+
+def test_compile_step_keeps_only_what_replay_needs():
+    fill = compile_step("fill 'Title' with 'x'", "page.fill", result={"action": "fill", "xpath": "//input", "fill": "x"})
+    click = compile_step("click 'Save'", "page.click", result={"action": "click", "xpath": "//button", "fill": "n/a"})
+    goto = compile_step("open site", "page.goto", url="http://localhost:5173")
+
+    assert fill["xpath"] == "//input" and fill["fill"] == "x"
+    assert click["fill"] == ""
+    assert goto["url"] == "http://localhost:5173" and goto["xpath"] == ""
+
+
+def test_round_trip_and_format_version(tmp_path):
+    path = compiled_path(str(tmp_path / "1.txt"))
+    assert path.endswith("1.plan.json")
+    assert load_compiled(path) is None
+
+    steps = [compile_step("close the browser", "browser.close")]
+    save_compiled(path, steps)
+    assert load_compiled(path) == steps
+
+    with open(path, "w") as f:
+        json.dump({"version": 0, "instructions": steps}, f)
+    assert load_compiled(path) is None
@@ -0,0 +1,36 @@
+from dom_pruner import extract_interactive_elements, prune_html
+
+
+def test_extract_interactive_elements_login_form():
+    with open("resources/unit_tests/unit_test.html", "r", encoding="utf-8") as f:
+        html = f.read()
+
+    rows = extract_interactive_elements(html)
+    by_id = {row["id"]: row for row in rows if row["id"]}
+
+    assert by_id["username"]["placeholder"] == "Email"
+    assert by_id["username"]["xpath"].startswith("//form")
+    assert all(row["tag"] != "svg" for row in rows)
+
+
+def test_prune_html_skips_scripts_and_keeps_positions():
+    html = """
+    <html><head><script>var big = 1;</script></head>
+    <body>
+      <div><button>Cancel</button><button aria-label="save">Save</button></div>
+      <label for="title">Title</label><input id="title" name="title">
+      <input type="hidden" name="csrf" value="x">
+    </body></html>
+    """
+
+    table, stats = prune_html(html)
+    rows = extract_interactive_elements(html)
+
+    assert [row["text"] for row in rows if row["tag"] == "button"] == ["Cancel", "Save"]
+    assert rows[1]["xpath"] == "//html/body/div/button[2]"
+    assert rows[2]["label"] == "Title"
+    assert "csrf" not in table
+    assert "var big" not in table
+    assert stats["elements"] == 3
+    # Rows the caller already extracted give the same table without a second parse
+    assert prune_html(html, rows=rows)[0] == table
@@ -0,0 +1,35 @@
+from embedding_cache import EmbeddingCache
+
+
+def fake_embed(calls):
+    def embed_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+    return embed_batch
+
+
+def test_only_new_chunks_are_embedded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite"))
+    calls = []
+
+    first = cache.embed(["<p>a</p>", "<p>bb</p>", "<p>a</p>"], "mistral-embed", fake_embed(calls))
+    second = cache.embed(["<p>a</p>", "<p>ccc</p>"], "mistral-embed", fake_embed(calls))
+    other_model = cache.embed(["<p>a</p>"], "other-embed", fake_embed(calls))
+
+    assert calls == [["<p>a</p>", "<p>bb</p>"], ["<p>ccc</p>"], ["<p>a</p>"]]
+    assert first[0] == first[2] == second[0] == [8.0, 1.0]
+    assert other_model == [[8.0, 1.0]]
+    stats = cache.stats()
+    assert stats["embeddings_saved"] == 2
+    assert stats["bytes_cached"] == 4 * 8
+
+
+def test_size_bounded_eviction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite"), max_bytes=16)
+    calls = []
+
+    cache.embed(["one", "two", "three"], "m", fake_embed(calls))
+
+    assert cache.stats()["bytes_cached"] <= 16
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_many("m", ["one", "two", "three"]).count(None) == 1
@@ -0,0 +1,55 @@
+import asyncio
+import io
+from PIL import Image
+
+from frame_stream import FrameSender, encode_frame
+
+
+def make_png(width: int, height: int) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 30, 30, 255)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_encode_frame_downscales_and_converts():
+    encoded = encode_frame(make_png(1920, 1080), fmt="webp", quality=60, max_width=960)
+    image = Image.open(io.BytesIO(encoded))
+
+    assert image.format == "WEBP"
+    assert image.size == (960, 540)
+
+
+def test_encode_frame_passes_through_when_nothing_changes():
+    raw = make_png(800, 600)
+    assert encode_frame(raw, fmt="png", max_width=960) is raw
+
+
+def test_slow_client_gets_only_the_latest_frame():
+    async def run():
+        sent_json, sent_bytes = [], []
+        gate = asyncio.Event()
+
+        async def send_bytes(data):
+            await gate.wait()
+            sent_bytes.append(data)
+
+        async def send_json(data):
+            sent_json.append(data)
+
+        sender = FrameSender(send_json, send_bytes).start()
+        frames = [make_png(100 + i, 50) for i in range(4)]
+        await sender.publish({"step": 0, "frame": frames[0]})
+        await asyncio.sleep(0.05)  # first frame is now stuck in a slow send
+        for i in (1, 2, 3):
+            await sender.publish({"step": i, "frame": frames[i]})
+        gate.set()
+        await sender.close()
+        return sender, sent_json, sent_bytes
+
+    sender, sent_json, sent_bytes = asyncio.run(run())
+
+    assert [message["step"] for message in sent_json] == [0, 1, 2, 3]
+    assert all("frame" not in message and message["mime"] for message in sent_json)
+    assert len(sent_bytes) == 2
+    assert Image.open(io.BytesIO(sent_bytes[-1])).width == 103
+    assert sender.stats()["frames_dropped"] == 2
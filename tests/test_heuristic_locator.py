@@ -0,0 +1,28 @@
+from heuristic_locator import parse_instruction, resolve_locally
+
+with open("resources/unit_tests/unit_test.html", "r", encoding="utf-8") as f:
+    LOGIN_FORM = f.read()
+
+
+def test_parse_instruction_quoted_shapes():
+    assert parse_instruction("Find and click on the 'Login' button.") == ("click", "Login", "")
+    assert parse_instruction("enter 'pass1234' into the password field", "page.fill") == ("fill", "password", "pass1234")
+    assert parse_instruction("fill out the Title with 'Meeting Agenda'", "page.fill") == ("fill", "Title", "Meeting Agenda")
+    assert parse_instruction("login with username 'a' and password 'b'", "page.fill") is None
+
+
+def test_resolve_locally_on_login_form():
+    username = resolve_locally("Find the username input field and enter 'mehdi.mirzapour@gmail.com'.", LOGIN_FORM, "page.fill")
+    password = resolve_locally("enter 'pass1234' into the password field", LOGIN_FORM, "page.fill")
+    login = resolve_locally("Find and click on the 'Login' button.", LOGIN_FORM, "page.click")
+
+    assert username == {"action": "fill", "xpath": "//input[@id='username']", "fill": "mehdi.mirzapour@gmail.com"}
+    assert password["xpath"] == "//input[@name='password']"
+    assert login["xpath"] == "//form/button"
+
+
+def test_resolve_locally_defers_ambiguous_and_missing_targets():
+    html = "<html><body><button>Save</button><a href='#'>Save</a></body></html>"
+
+    assert resolve_locally("Click the 'Save' button", html, "page.click") is None
+    assert resolve_locally("Click the 'Delete' button", html, "page.click") is None
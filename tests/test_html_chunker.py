@@ -0,0 +1,45 @@
+from html_chunker import iter_html_chunks
+
+PAGE = (
+    "<html><head><script>var markup = '<div>';</script></head><body>"
+    "<div id='intro'><p>" + "hello world " * 30 + "</p></div>"
+    "<ul>" + "".join(f"<li><a href='/item/{i}'>item {i}</a></li>" for i in range(20)) + "</ul>"
+    "</body></html>"
+)
+
+
+def test_chunks_respect_budget_and_element_boundaries():
+    chunks = list(iter_html_chunks(PAGE, max_tokens=40))
+
+    assert len(chunks) > 1
+    assert all(chunk["tokens"] <= 40 for chunk in chunks)
+    for chunk in chunks:
+        # never cut through a tag or an attribute value
+        assert chunk["text"].count("<") == chunk["text"].count(">")
+    assert "var markup" not in "".join(chunk["text"] for chunk in chunks)
+
+
+def test_chunks_carry_xpath_prefix_of_their_subtree():
+    chunks = list(iter_html_chunks(PAGE, max_tokens=40))
+    list_chunks = [chunk for chunk in chunks if chunk["text"].startswith("<li>") and chunk["text"].endswith("</li>")]
+
+    assert list_chunks
+    assert all(chunk["xpath"] == "/html[1]/body[1]/ul[1]" for chunk in list_chunks)
+
+
+def test_streaming_input_matches_single_string():
+    pieces = (PAGE[i:i + 7] for i in range(0, len(PAGE), 7))
+
+    streamed = [chunk["text"] for chunk in iter_html_chunks(pieces, max_tokens=40)]
+    whole = [chunk["text"] for chunk in iter_html_chunks(PAGE, max_tokens=40)]
+
+    assert "".join(streamed) == "".join(whole)
+
+
+def test_long_text_node_is_split_within_budget_without_losing_text():
+    blob = "lorem ipsum dolor " * 2000
+    chunks = list(iter_html_chunks(f"<html><body><pre>{blob}</pre></body></html>", max_tokens=50))
+
+    assert len(chunks) > 100
+    assert all(chunk["tokens"] <= 50 for chunk in chunks)
+    assert " ".join(blob.split()) in "".join(chunk["text"] for chunk in chunks)
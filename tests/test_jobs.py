@@ -0,0 +1,93 @@
+import asyncio
+
+from jobs import JobManager
+
+
+class FakeRunner:
+    """Runs block until released; each publishes one step update."""
+
+    def __init__(self):
+        self.release = {}
+        self.started = []
+
+    async def __call__(self, job):
+        self.started.append(job.id)
+        self.release[job.id] = asyncio.Event()
+        job.publish({"step": 0, "instruction": job.instruction_text})
+        await self.release[job.id].wait()
+        return ["    browser.close()"]
+
+
+async def tick():
+    """Let tasks and their done callbacks run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_workers_and_tenant_limits_queue_extra_jobs():
+    async def run():
+        runner = FakeRunner()
+        manager = JobManager(runner, workers=2, per_tenant=1)
+        a1 = manager.submit("a1", "a")
+        a2 = manager.submit("a2", "a")
+        b1 = manager.submit("b1", "b")
+        c1 = manager.submit("c1", "c")
+        await tick()
+
+        # a2 waits for tenant a; b1 takes the second worker; c1 waits for a worker
+        assert [job.status for job in (a1, a2, b1, c1)] == ["running", "queued", "running", "queued"]
+        assert (a2.position, c1.position) == (1, 2)
+
+        runner.release[a1.id].set()
+        await tick()
+        assert a1.status == "done" and a1.script == "    browser.close()"
+        assert a2.status == "running" and c1.position == 1
+        await manager.close()
+        return manager
+
+    manager = asyncio.run(run())
+    assert manager.stats()["cancelled"] == 3  # c1 was still queued, a2 and b1 running
+
+
+def test_cancel_stops_running_and_queued_jobs():
+    async def run():
+        manager = JobManager(FakeRunner(), workers=1, per_tenant=1)
+        running = manager.submit("first")
+        queued = manager.submit("second")
+        await tick()
+
+        assert manager.cancel(queued.id)
+        assert manager.cancel(running.id)
+        await tick()
+        assert not manager.cancel(running.id)
+        return running, queued, manager
+
+    running, queued, manager = asyncio.run(run())
+    assert (running.status, queued.status) == ("cancelled", "cancelled")
+    assert manager.stats()["running"] == 0
+
+
+def test_late_subscriber_sees_the_whole_run():
+    async def run():
+        runner = FakeRunner()
+        manager = JobManager(runner, workers=1)
+        job = manager.submit("only")
+        await tick()
+        job.publish({"step": 1, "frame": b"jpeg"})
+
+        received = []
+
+        async def follow():
+            async for update in job.subscribe():
+                received.append(update)
+
+        follower = asyncio.create_task(follow())
+        await tick()
+        runner.release[job.id].set()
+        await follower
+        return received
+
+    received = asyncio.run(run())
+    assert received[0] == {"job": received[0]["job"], "status": "running"}
+    assert {"step": 1, "frame": b"jpeg"} in received
+    assert received[-1]["status"] == "done"
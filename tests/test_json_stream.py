@@ -0,0 +1,36 @@
+import json
+from json_stream import IncrementalObjectParser
+
+PLAN = {
+    "instructions": [
+        {"original instruction": "open 'localhost:5173'", "classification": "page.goto", "waiting_time": 0},
+        {"original instruction": "type \"a {b}\" into 'x'", "classification": "page.fill", "waiting_time": 0},
+        {"original instruction": "close", "classification": "browser.close", "waiting_time": 0},
+    ]
+}
+
+
+def test_objects_are_yielded_as_soon_as_they_close():
+    text = "```json\n" + json.dumps(PLAN, indent=2) + "\n```"
+    parser = IncrementalObjectParser()
+    first_close = text.index("}") + 1
+
+    assert parser.feed(text[:first_close - 1]) == []
+    assert parser.feed(text[first_close - 1:first_close]) == [PLAN["instructions"][0]]
+    assert parser.feed(text[first_close:]) == PLAN["instructions"][1:]
+
+
+def test_one_character_at_a_time_matches_full_parse():
+    text = json.dumps(PLAN)
+    parser = IncrementalObjectParser()
+    objects = [obj for char in text for obj in parser.feed(char)]
+
+    assert objects == PLAN["instructions"]
+    # Only the unfinished tail is kept between chunks
+    assert parser.buffer == ""
+
+
+def test_nested_objects_are_returned_with_their_parent():
+    parser = IncrementalObjectParser()
+
+    assert parser.feed('[{"a": {"b": [1, {"c": 2}]}}, {"d": 3}]') == [{"a": {"b": [1, {"c": 2}]}}, {"d": 3}]
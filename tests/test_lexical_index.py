@@ -0,0 +1,25 @@
+from lexical_index import BM25Index, is_clear_winner, tokenize
+
+
+def test_tokenize_splits_camel_case_and_drops_stopwords():
+    assert tokenize("Click the saveButton in <div class='form'>") == ["click", "save", "button", "div", "class", "form"]
+
+
+def test_bm25_ranks_rare_terms_higher():
+    index = BM25Index([
+        "<label>Title</label><input name='title'>",
+        "<label>Description</label><textarea name='description'></textarea>",
+        "<button>Save</button>",
+    ])
+
+    assert index.search("fill the description", top_k=1)[0][1] == 1
+    assert index.scores("unknown words") == [0.0, 0.0, 0.0]
+
+
+def test_is_clear_winner():
+    assert is_clear_winner([3.0, 1.0], margin=1.5)
+    assert not is_clear_winner([3.0, 2.5], margin=1.5)
+    assert not is_clear_winner([0.0, 0.0], margin=1.5)
+    assert is_clear_winner([2.0], margin=1.5)
+    assert not is_clear_winner([0.0], margin=1.5)
+    assert not is_clear_winner([], margin=1.5)
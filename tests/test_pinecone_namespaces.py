@@ -0,0 +1,52 @@
+import threading
+from pinecone_manager import NamespaceRegistry
+
+
+class FakeIndex:
+    def __init__(self, namespaces=()):
+        self.namespaces = {namespace: {"vector_count": 1} for namespace in namespaces}
+        self.deleted = []
+
+    def describe_index_stats(self):
+        return {"namespaces": dict(self.namespaces)}
+
+    def delete(self, delete_all, namespace):
+        self.deleted.append(namespace)
+        self.namespaces.pop(namespace, None)
+
+
+def test_first_claim_upserts_and_later_claims_skip():
+    registry = NamespaceRegistry(FakeIndex(), ttl=60, sweep_interval=60)
+
+    assert registry.claim("doc-a") is True
+    registry.mark_ready("doc-a")
+    assert registry.claim("doc-a") is False
+
+
+def test_concurrent_claim_waits_for_upsert_and_retries_after_failure():
+    registry = NamespaceRegistry(FakeIndex(), ttl=60, sweep_interval=60)
+    assert registry.claim("doc-a") is True
+
+    outcome = []
+    waiter = threading.Thread(target=lambda: outcome.append(registry.claim("doc-a")))
+    waiter.start()
+    registry.release("doc-a")
+    waiter.join(timeout=5)
+
+    # The failed upsert is handed over to the waiting caller
+    assert outcome == [True]
+
+
+def test_sweep_deletes_only_idle_namespaces_it_claimed():
+    # "doc-other" belongs to another process sharing the index
+    index = FakeIndex(["doc-other", "default"])
+    registry = NamespaceRegistry(index, ttl=10, sweep_interval=60)
+    registry.claim("doc-new")
+    registry.mark_ready("doc-new")
+
+    assert registry.sweep() == []
+    stale = registry.sweep(now=registry._last_used["doc-new"] + 5 + 10)
+
+    assert stale == ["doc-new"]
+    assert index.deleted == ["doc-new"]
+    assert registry.claim("doc-new") is True
@@ -0,0 +1,54 @@
+import sqlite3
+from plan_cache import PlanCache, normalize_text
+
+PLAN = {"instructions": [{"original instruction": "open 'localhost:5173'", "classification": "page.goto"}]}
+
+
+def test_normalize_text_keeps_case_but_not_spacing():
+    assert normalize_text("  open  localhost:5173\n\n login as Mehdi  \n") == "open localhost:5173\nlogin as Mehdi"
+    assert normalize_text("login as Mehdi") != normalize_text("login as mehdi")
+
+
+def test_hits_survive_reopening_and_depend_on_version_and_model(tmp_path):
+    path = str(tmp_path / "plans.sqlite")
+    cache = PlanCache(path)
+    cache.put("open localhost:5173", "fused-1", "gpt-4o-mini", PLAN)
+    cache.close()
+
+    cache = PlanCache(path)
+    assert cache.get("open   localhost:5173\n", "fused-1", "gpt-4o-mini") == PLAN
+    assert cache.get("open localhost:5173", "fused-2", "gpt-4o-mini") is None
+    assert cache.get("open localhost:5173", "fused-1", "mistral-large-latest") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_older_cache_format_is_discarded(tmp_path):
+    path = str(tmp_path / "plans.sqlite")
+    PlanCache(path).put("open localhost:5173", "fused-1", "m", PLAN)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA user_version = 0")
+    db.commit()
+    db.close()
+
+    assert PlanCache(path).get("open localhost:5173", "fused-1", "m") is None
+
+
+def test_least_recently_used_plans_are_evicted(tmp_path):
+    cache = PlanCache(str(tmp_path / "plans.sqlite"), capacity=1)
+    cache.put("first", "v", "m", PLAN)
+    cache.put("second", "v", "m", PLAN)
+
+    assert cache.get("first", "v", "m") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_only_that_plan(tmp_path):
+    cache = PlanCache(str(tmp_path / "plans.sqlite"))
+    cache.put("open localhost:5173", "v", "m", PLAN)
+    cache.put("open localhost:5173", "v2", "m", PLAN)
+
+    cache.invalidate("  open localhost:5173 ", "v", "m")
+
+    assert cache.get("open localhost:5173", "v", "m") is None
+    assert cache.get("open localhost:5173", "v2", "m") == PLAN
+    assert cache.stats()["invalidations"] == 1
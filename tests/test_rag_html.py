@@ -0,0 +1,84 @@
+import importlib
+import os
+
+import pytest
+
+from embedding_cache import EmbeddingCache
+
+FORM = (
+    "<html><body><form>"
+    "<div><label>title</label><input name='title'></div>"
+    "<div><label>description</label><textarea name='description'></textarea></div>"
+    "<button>save</button>"
+    "</form></body></html>"
+)
+
+
+class KeywordEmbedding:
+    """Deterministic stand-in for MistralAIEmbedding: one dimension per keyword."""
+    model_name = "keyword-embed"
+    keywords = ("title", "description", "save")
+
+    def __init__(self):
+        self.batches = []
+
+    def get_text_embedding_batch(self, texts):
+        self.batches.append(list(texts))
+        return [[text.count(word) + 0.01 for word in self.keywords] for text in texts]
+
+
+@pytest.fixture(scope="module")
+def rag_html():
+    # rag_html validates its settings on import; set them only for that import
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MISTRAL_API_KEY", os.getenv("MISTRAL_API_KEY") or "test-key")
+        mp.setenv("VECTOR_BACKEND", "numpy")
+        return importlib.import_module("rag_html")
+
+
+@pytest.fixture(autouse=True)
+def fresh_embedding_cache(rag_html, monkeypatch):
+    # The module-level cache persists on disk between runs; start each test empty
+    monkeypatch.setattr(rag_html, "embedding_cache", EmbeddingCache(":memory:"))
+
+
+def test_batch_queries_embed_page_and_queries_once(rag_html, monkeypatch):
+    embed_model = KeywordEmbedding()
+    monkeypatch.setattr(rag_html, "_embed_model", embed_model)
+
+    chunks = rag_html.process_html_queries(FORM, ["title", "description", "save"], chunk_size=12, backend="numpy", mode="embedding")
+
+    assert "title" in chunks[0]
+    assert "description" in chunks[1]
+    assert "save" in chunks[2]
+    # one request for the chunks, one for all the queries
+    assert len(embed_model.batches) == 2
+    assert embed_model.batches[1] == ["title", "description", "save"]
+
+    # The same page again only needs the new query embedded
+    rag_html.process_html_queries(FORM, ["title", "save button"], chunk_size=12, backend="numpy", mode="embedding")
+    assert embed_model.batches[2:] == [["save button"]]
+
+
+def test_auto_mode_answers_clear_queries_lexically(rag_html, monkeypatch):
+    embed_model = KeywordEmbedding()
+    monkeypatch.setattr(rag_html, "_embed_model", embed_model)
+
+    batch = rag_html.find_similar_chunks(FORM, ["description", "form"], chunk_size=25, backend="numpy", mode="auto")
+    description, ambiguous = batch["results"]
+
+    assert description["matches"][0]["retrieval"] == "lexical"
+    assert "description" in description["matches"][0]["chunk"]
+    # "form" appears in the first and last chunk equally often, so it escalates to embeddings
+    assert ambiguous["matches"][0]["retrieval"] == "embedding"
+    assert embed_model.batches[-1] == ["form"]
+
+
+def test_lexical_mode_makes_no_embedding_calls(rag_html, monkeypatch):
+    embed_model = KeywordEmbedding()
+    monkeypatch.setattr(rag_html, "_embed_model", embed_model)
+
+    chunk = rag_html.process_html_query(FORM, "click save", chunk_size=12, backend="numpy", mode="lexical")
+
+    assert "save" in chunk
+    assert embed_model.batches == []
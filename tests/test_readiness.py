@@ -0,0 +1,100 @@
+import readiness
+from readiness import SCRIPT_HELPER, ReadinessReport, settle
+
+
+class FakePage:
+    """Records the readiness calls; optionally fails at one of them."""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def wait_for_load_state(self, state, timeout):
+        self.calls.append(state)
+        if state == self.fail_on:
+            raise TimeoutError(state)
+
+    def evaluate(self, script, args):
+        self.calls.append("quiet")
+        self.quiet_args = args
+        return 0
+
+    def wait_for_timeout(self, ms):
+        self.calls.append(f"sleep {ms}")
+
+    def locator(self, xpath):
+        page = self
+
+        class Locator:
+            first = None
+
+            def wait_for(self, state, timeout):
+                page.calls.append(f"visible {xpath}")
+
+        locator = Locator()
+        locator.first = locator
+        return locator
+
+
+def test_settle_waits_on_page_signals_and_reports_savings():
+    report = ReadinessReport()
+    page = FakePage()
+
+    waited = settle(page, 5000, report)
+
+    assert page.calls == ["load", "networkidle", "quiet"]
+    assert waited < 5000
+    summary = report.summary()
+    assert summary["waits"] == 1 and summary["fixed_s"] == 5.0
+    assert summary["saved_s"] > 4.9 and summary["signals"] == {"quiet": 1}
+
+
+def test_settle_recovers_when_a_navigation_interrupts_the_checks():
+    report = ReadinessReport()
+    page = FakePage(fail_on="networkidle")
+
+    settle(page, 5000, report)
+
+    assert page.calls == ["load", "networkidle", "load"]
+    assert report.signals == {"navigation": 1}
+
+
+def test_settle_asks_for_the_next_target_once_the_dom_is_quiet():
+    report = ReadinessReport()
+    page = FakePage()
+
+    settle(page, 5000, report, xpath=lambda: page.calls.append("target?") or "//button")
+    settle(page, 5000, report, xpath=lambda: None)
+
+    assert page.calls[:5] == ["load", "networkidle", "quiet", "target?", "visible //button"]
+    assert report.signals == {"actionable": 1, "quiet": 1}
+
+
+def test_adaptive_wait_is_capped_at_the_ceiling(monkeypatch):
+    monkeypatch.setattr(readiness, "READINESS_CEILING_MS", 1000)
+    report = ReadinessReport()
+    page = FakePage()
+
+    settle(page, 5000, report)
+
+    assert page.quiet_args[1] <= 1000
+    assert report.summary()["fixed_s"] == 5.0  # savings are still counted against the old sleep
+
+
+def test_fixed_mode_keeps_the_old_sleep(monkeypatch):
+    monkeypatch.setattr(readiness, "READINESS_MODE", "fixed")
+    page = FakePage()
+
+    settle(page, 3000)
+
+    assert page.calls == ["sleep 3000"]
+
+
+def test_script_helper_is_valid_python():
+    namespace = {}
+    exec("\n".join(SCRIPT_HELPER), namespace)
+    page = FakePage()
+
+    namespace["settle"](page)
+
+    assert page.calls == ["networkidle", "quiet"]
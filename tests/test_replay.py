@@ -0,0 +1,143 @@
+import pytest
+
+import replay
+from replay import replay as run_replay
+
+
+class FakeLocator:
+    def __init__(self, page, xpath):
+        self.page = page
+        self.xpath = xpath
+        self.first = self
+
+    def count(self):
+        return self.page.elements.get(self.xpath, 0)
+
+    def fill(self, value):
+        self.page.actions.append(f"fill {self.xpath} {value}")
+
+    def click(self):
+        self.page.actions.append(f"click {self.xpath}")
+
+    def bounding_box(self):
+        return {"x": 10, "y": 20, "width": 100, "height": 40}
+
+    def wait_for(self, state, timeout):
+        pass
+
+
+class FakeMouse:
+    def __init__(self, page):
+        self.page = page
+
+    def move(self, x, y):
+        self.page.actions.append(f"move {x} {y}")
+
+
+class FakePage:
+    """Elements are an xpath -> match count map; actions are recorded in order."""
+
+    def __init__(self, elements):
+        self.elements = elements
+        self.actions = []
+        self.mouse = FakeMouse(self)
+
+    def locator(self, xpath):
+        return FakeLocator(self, xpath)
+
+    def goto(self, url):
+        self.actions.append(f"goto {url}")
+
+    def content(self):
+        return "<html></html>"
+
+    def wait_for_timeout(self, ms):
+        self.actions.append(f"sleep {ms}")
+
+    def wait_for_load_state(self, state, timeout):
+        pass
+
+    def evaluate(self, script, args):
+        return 0
+
+    def screenshot(self, **options):
+        return b"jpeg"
+
+
+class FakeContext:
+    def __init__(self, page):
+        self.page = page
+        self.closed = False
+
+    def new_page(self):
+        return self.page
+
+    def close(self):
+        self.closed = True
+
+
+def step(classification, xpath=None, **fields):
+    return {"original instruction": f"{classification} {xpath or ''}".strip(), "classification": classification,
+            "xpath": xpath, "url": fields.get("url", ""), "fill": fields.get("fill", ""),
+            "waiting_time": fields.get("waiting_time", 0)}
+
+
+@pytest.fixture
+def healer(monkeypatch):
+    """Stands in for the LLM re-resolution; returns the queued XPaths in order."""
+    calls = []
+
+    def extract(instruction, html, model):
+        calls.append(instruction)
+        return {"xpath": healer.results.pop(0), "fill": ""}, []
+
+    healer = type("Healer", (), {"calls": calls, "results": []})
+    monkeypatch.setattr(replay, "extract_xpath_pattern", extract)
+    return healer
+
+
+def test_replay_runs_compiled_steps_without_the_llm(healer):
+    page = FakePage({"//input": 1, "//button": 1, "//th": 1})
+    context = FakeContext(page)
+    steps = [
+        step("page.goto", url="localhost:5173"),
+        step("page.fill", "//input", fill="bob"),
+        step("page.click", "//button"),
+        step("page.hover", "//th"),
+        step("page.wait", waiting_time=None),
+        step("browser.close"),
+    ]
+
+    _, stats = run_replay(steps, context=context)
+
+    assert page.actions == [
+        "goto localhost:5173", "fill //input bob", "click //button",
+        "move 60.0 40.0", "click //th", "sleep 5000",
+    ]
+    assert context.closed
+    assert healer.calls == [] and stats["llm_calls"] == 0
+
+
+def test_broken_locator_is_healed_and_patched(healer):
+    page = FakePage({"//button[@id='new']": 1})
+    healer.results = ["//button[@id='new']"]
+    steps = [step("page.click", "//button[@id='old']"), step("browser.close")]
+
+    steps, stats = run_replay(steps, context=FakeContext(page))
+
+    assert steps[0]["xpath"] == "//button[@id='new']"
+    assert page.actions == ["click //button[@id='new']"]
+    assert stats["healed"] == 1 and stats["llm_calls"] == 1
+
+
+@pytest.mark.parametrize("matches", [0, 2])
+def test_heal_that_does_not_match_once_is_not_acted_on(healer, matches):
+    page = FakePage({"//button": matches})
+    healer.results = ["//button"]
+    steps = [step("page.click", "//button[@id='old']"), step("browser.close")]
+
+    with pytest.raises(RuntimeError):
+        run_replay(steps, context=FakeContext(page))
+
+    assert steps[0]["xpath"] == "//button[@id='old']"
+    assert page.actions == []
@@ -0,0 +1,58 @@
+import pytest
+from rule_classifier import classify_line, parse_waiting_time, split_instructions
+
+
+@pytest.mark.parametrize("line, url", [
+    ("- Navigate to the website: https://app.thundercode.ai", "https://app.thundercode.ai"),
+    ("Navigate to the URL 'localhost:5173/items'", "localhost:5173/items"),
+    ("open localhost:5173/items .", "localhost:5173/items"),
+    ("Manually go to the section by changing the URL to: https://example.com/#/overview", "https://example.com/#/overview"),
+])
+def test_goto_lines_are_classified_locally(line, url):
+    result = classify_line(line)
+    assert result["classification"] == "page.goto"
+    assert result["url"] == url
+
+
+@pytest.mark.parametrize("line, seconds", [
+    ("Wait for 5 seconds", 5.0),
+    ("- Wait 1 more second, likely to observe the saved result.", 1.0),
+    ("wait 500 ms", 0.5),
+    ("pause for two minutes", 120.0),
+])
+def test_wait_lines_parse_waiting_time(line, seconds):
+    result = classify_line(line)
+    assert result["classification"] == "page.wait"
+    assert result["waiting_time"] == seconds
+
+
+@pytest.mark.parametrize("line", ["Close the browser.", "exit the browser", "quit browser"])
+def test_close_lines_are_classified_locally(line):
+    assert classify_line(line)["classification"] == "browser.close"
+
+
+@pytest.mark.parametrize("line", [
+    "open localhost:5173 and then login with user name as 'a@b.com'",
+    "Click the 'Save' button",
+    "Wait until the table loads",
+    "Enter 'pass1234' into the password field",
+    "Close the cookie banner",
+    "Wait 2 seconds then click Save",
+    "Wait for half a minute",
+])
+def test_ambiguous_lines_are_left_for_the_llm(line):
+    assert classify_line(line) is None
+
+
+def test_parse_waiting_time_without_duration():
+    assert parse_waiting_time("wait for the page") is None
+
+
+def test_parse_waiting_time_rejects_fractions():
+    assert parse_waiting_time("Wait for half a minute") is None
+    assert parse_waiting_time("wait a quarter of a minute") is None
+
+
+def test_split_instructions_accepts_segment_output_and_text():
+    assert split_instructions({"instructions": ["a", " ", "b"]}) == ["a", "b"]
+    assert split_instructions("a\n\n  b  \n") == ["a", "b"]
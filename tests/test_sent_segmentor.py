@@ -20,7 +20,7 @@ def test_segment_basic_instruction():
         ]
     }
 
-    result = segment(instruction, model)
+    result, _ = segment(instruction, model)
 
     assert isinstance(result, dict)
     assert "instructions" in result
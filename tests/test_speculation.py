@@ -0,0 +1,23 @@
+import speculation
+from speculation import SpeculationStats, should_speculate
+
+
+def test_only_locator_steps_are_speculated(monkeypatch):
+    monkeypatch.setattr(speculation, "SPECULATE", True)
+
+    assert should_speculate({"classification": "page.click"})
+    assert not should_speculate({"classification": "page.goto"})
+    assert not should_speculate(None)
+
+    monkeypatch.setattr(speculation, "SPECULATE", False)
+    assert not should_speculate({"classification": "page.click"})
+
+
+def test_stats_track_hits_and_wasted_llm_calls():
+    stats = SpeculationStats()
+    stats.launched = 3
+    stats.record_hit("heuristic")
+    stats.record_waste("llm")
+    stats.record_waste(None)
+
+    assert stats.summary() == {"launched": 3, "hits": 1, "wasted": 2, "hit_rate": 0.333, "wasted_llm_calls": 1}
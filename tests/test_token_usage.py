@@ -0,0 +1,52 @@
+from token_usage import TokenUsage, histogram, record, stream_usage, summarize, usage_entry
+from utils import model_id
+
+
+class Model:
+    model_name = "gpt-4o-mini"
+
+
+def test_usage_entry_maps_usage_metadata_to_token_usage_fields():
+    entry = usage_entry("plan", Model(), {
+        "input_tokens": 1200, "output_tokens": 80, "total_tokens": 1280,
+        "input_token_details": {"cache_read": 1024},
+    }, 0.41237)
+
+    assert entry == TokenUsage(stage="plan", model_name="gpt-4o-mini", input_token=1200,
+                               output_token=80, cached_token=1024, latency=0.4124)
+    assert usage_entry("plan", Model(), None, 0.1).input_token == 0
+
+
+def test_stream_usage_sums_chunks_and_skips_empty_ones():
+    chunks = [None, {"input_tokens": 100, "output_tokens": 0, "total_tokens": 100},
+              {"input_tokens": 0, "output_tokens": 30, "total_tokens": 30}]
+
+    assert stream_usage(chunks)["input_tokens"] == 100
+    assert stream_usage(chunks)["output_tokens"] == 30
+    assert stream_usage([None, None]) is None
+
+
+def test_record_returns_token_usage_and_summarize_reports_percentiles_per_stage():
+    usage = [record("extract_xpath", Model(), {"input_tokens": tokens, "output_tokens": 20}, latency)
+             for latency, tokens in [(0.1, 300), (0.2, 600), (0.3, 5000)]]
+    usage.append(record("plan", Model(), {"input_tokens": 900, "output_tokens": 150}, 0.5))
+
+    assert all(isinstance(entry, TokenUsage) for entry in usage)
+
+    summary = summarize(usage, histograms=True)
+
+    assert summary["extract_xpath"]["calls"] == 3
+    assert summary["extract_xpath"]["input_token"] == 5900
+    assert summary["extract_xpath"]["latency_ms"]["p50"] == 200.0
+    assert summary["extract_xpath"]["input_token_histogram"]["<512"] == 1
+    assert summary["extract_xpath"]["input_token_histogram"]["<8192"] == 1
+    assert summary["plan"]["output_token"] == 150
+    assert sum(histogram([]).values()) == 0
+
+
+def test_model_id():
+    class Named:
+        model_name = "gpt-4o-mini"
+
+    assert model_id(Named()) == "gpt-4o-mini"
+    assert model_id(object()) == "object"
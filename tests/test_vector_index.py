@@ -0,0 +1,23 @@
+import numpy as np
+from vector_index import NumpyVectorIndex
+
+
+def test_query_ranks_by_cosine_similarity():
+    index = NumpyVectorIndex(dimension=3, capacity=1)
+    index.add([[1, 0, 0], [0, 10, 0], [1, 1, 0]], ["x", "y", "xy"])
+
+    results = index.query([0, 2, 0], top_k=2)
+
+    assert [payload for _, payload in results] == ["y", "xy"]
+    assert np.isclose(results[0][0], 1.0)
+    assert len(index) == 3
+
+
+def test_query_many_and_empty_index():
+    index = NumpyVectorIndex(dimension=2)
+    assert index.query([1, 0]) == []
+
+    index.add([[1, 0], [0, 1]], ["a", "b"])
+    results = index.query_many([[0, 1], [1, 0]], top_k=5)
+
+    assert [[payload for _, payload in row] for row in results] == [["b", "a"], ["a", "b"]]
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+from ws_bridge import ThreadBridge
+
+
+def test_thread_updates_arrive_in_order_and_end_on_close():
+    async def run():
+        bridge = ThreadBridge(asyncio.get_running_loop(), maxsize=64)
+
+        def produce():
+            for i in range(10):
+                bridge.post({"step": i})
+            bridge.close()
+
+        threading.Thread(target=produce).start()
+        return [item["step"] async for item in bridge], bridge
+
+    steps, bridge = asyncio.run(run())
+
+    assert steps == list(range(10))
+    assert bridge.stats() == {"posted": 10, "dropped": 0, "queued": 0}
+
+
+def test_full_queue_drops_the_oldest_frames_but_keeps_every_update():
+    async def run():
+        bridge = ThreadBridge(asyncio.get_running_loop(), maxsize=3)
+
+        def produce():
+            for i in range(8):
+                bridge.post({"step": i, "frame": b"jpeg"})
+            bridge.post({"status": "error", "error": "boom"})
+            bridge.close()
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        producer.join()  # everything is posted before the consumer reads anything
+        return [item async for item in bridge], bridge
+
+    items, bridge = asyncio.run(run())
+
+    assert [item.get("step") for item in items[:8]] == list(range(8))
+    assert [i for i, item in enumerate(items) if "frame" in item] == [5, 6, 7]
+    assert items[-1] == {"status": "error", "error": "boom"}
+    assert bridge.dropped == 5
+
+def test_drain_waits_for_the_producer_to_close():
+    async def run():
+        bridge = ThreadBridge(asyncio.get_running_loop(), maxsize=3)
+        stop = threading.Event()
+        closed = []
+
+        def produce():
+            while not stop.is_set():
+                bridge.post("update")
+                stop.wait(0.01)
+            time.sleep(0.05)  # closing the browser
+            closed.append(True)
+            bridge.close()
+
+        async def consume():
+            try:
+                async for _ in bridge:
+                    pass
+            except asyncio.CancelledError:
+                stop.set()
+                drained.append(await bridge.drain(5))
+                raise
+
+        drained = []
+        threading.Thread(target=produce).start()
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        return consumer, closed, drained
+
+    consumer, closed, drained = asyncio.run(run())
+
+    assert consumer.cancelled()
+    assert closed == [True] and drained == [True]
+
+
+def test_drain_gives_up_after_the_timeout():
+    async def run():
+        bridge = ThreadBridge(asyncio.get_running_loop())
+        bridge.post("update")  # the producer never closes
+        return await bridge.drain(0.05)
+
+    assert asyncio.run(run()) is False
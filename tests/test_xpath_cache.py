@@ -0,0 +1,95 @@
+import asyncio
+from dom_pruner import extract_interactive_elements
+from xpath_cache import XPathCache, dom_fingerprint, normalize_instruction, skeleton_fingerprint
+
+LOGIN_PAGE = "<html><body><input id='user' name='user'><button id='login'>Login</button></body></html>"
+
+
+def test_fingerprint_ignores_text_but_not_structure():
+    relabelled = LOGIN_PAGE.replace(">Login<", ">Sign in<")
+    restructured = LOGIN_PAGE.replace("id='login'", "id='submit'")
+
+    assert dom_fingerprint(LOGIN_PAGE) == dom_fingerprint(relabelled)
+    assert dom_fingerprint(LOGIN_PAGE) != dom_fingerprint(restructured)
+
+    assert skeleton(LOGIN_PAGE) == skeleton(relabelled)
+    assert skeleton(LOGIN_PAGE) != skeleton(restructured)
+
+
+def skeleton(html):
+    parts = []
+    extract_interactive_elements(html, parts)
+    return skeleton_fingerprint(parts)
+
+
+def test_skeleton_fingerprint_covers_non_interactive_elements():
+    article = "<html><body><div id='intro'><p>Hi</p></div></body></html>"
+    table = "<html><body><table id='report'><tr><td>1</td></tr></table></body></html>"
+
+    assert skeleton(article) != skeleton(table)
+
+
+def test_normalize_instruction_keeps_values():
+    assert normalize_instruction("  Enter 'Pass1234' into   The Password field. ") == "enter 'Pass1234' into the Password field"
+    assert normalize_instruction("Fill the name with Bob") != normalize_instruction("fill the name with bob")
+    assert normalize_instruction("Fill the name with Bob") == normalize_instruction("fill  THE name with Bob.")
+
+
+def test_prompt_version_and_model_are_part_of_the_key(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    fingerprint = dom_fingerprint(LOGIN_PAGE)
+    XPathCache(path, prompt_version="1", model_name="m").put("Click login", fingerprint, {"xpath": "//button"})
+
+    assert XPathCache(path, prompt_version="1", model_name="m").get("Click login", fingerprint) is not None
+    assert XPathCache(path, prompt_version="2", model_name="m").get("Click login", fingerprint) is None
+    assert XPathCache(path, prompt_version="1", model_name="other").get("Click login", fingerprint) is None
+
+
+def test_cache_hit_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    fingerprint = dom_fingerprint(LOGIN_PAGE)
+    result = {"action": "click", "xpath": "//button[@id='login']", "fill": ""}
+
+    cache = XPathCache(path, capacity=1)
+    assert cache.get("Click the 'Login' button", fingerprint) is None
+    cache.put("Click the 'Login' button", fingerprint, result)
+    cache.put("Fill the user field", fingerprint, {"action": "fill", "xpath": "//input[@id='user']", "fill": "x"})
+
+    assert cache.get("click the 'Login' Button.", fingerprint) == result
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["evictions"] >= 1
+    assert stats["disk_size"] == 2
+    cache.close()
+
+    reopened = XPathCache(path)
+    assert reopened.get("Click the 'Login' button", fingerprint) == result
+
+
+def test_cache_drops_entries_that_fail_validation(tmp_path):
+    cache = XPathCache(str(tmp_path / "cache.sqlite"))
+    fingerprint = dom_fingerprint(LOGIN_PAGE)
+    cache.put("Click login", fingerprint, {"action": "click", "xpath": "//button", "fill": ""})
+
+    assert cache.get("Click login", fingerprint, validate=lambda xpath: False) is None
+    assert cache.get("Click login", fingerprint) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_async_get_awaits_validation(tmp_path):
+    cache = XPathCache(str(tmp_path / "cache.sqlite"))
+    fingerprint = dom_fingerprint(LOGIN_PAGE)
+    cache.put("Click login", fingerprint, {"action": "click", "xpath": "//button", "fill": ""})
+
+    async def matches(xpath):
+        return xpath == "//button"
+
+    async def never(xpath):
+        return False
+
+    assert asyncio.run(cache.aget("Click login", fingerprint, validate=matches))["xpath"] == "//button"
+    assert asyncio.run(cache.aget("Click login", fingerprint, validate=never)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["invalidations"] == 1
+
+    asyncio.run(cache.aput("Click login", fingerprint, {"action": "click", "xpath": "//a", "fill": ""}))
+    assert cache.get("Click login", fingerprint)["xpath"] == "//a"
@@ -7,7 +7,7 @@ def test_extract_xpath_pattern_login_button():
     with open("resources/unit_tests/unit_test.html", "r", encoding="utf-8") as f:
         html = f.read()
 
-    result = extract_xpath_pattern(instruction, html, model)
+    result, _ = extract_xpath_pattern(instruction, html, model)
 
     assert isinstance(result, dict)
     assert result["action"] == "click"